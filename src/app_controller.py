@@ -1,15 +1,45 @@
 # app_controller.py
 import time
+import asyncio
 from config_manager import config_manager
 from netutils import sync_time, get_local_time
-from weather import fetch_current_weather, fetch_weather_forecast
+from weather import fetch_current_weather, fetch_weather_forecast, fetch_weather_combined, close_connection
 from display_manager import update_page_weather, update_page_time_image, update_page_birthday
+from display_service import display_service
+from icon_atlas import icon_atlas
+from weather_cache import weather_cache
 from file_manager import get_image_path, get_date_event_images, shuffle_files
 from wifi_manager import reset_wifi_and_reboot
 from chime import Chime
 
+WEATHER_CHECK_INTERVAL_MS = 30 * 1000
+SENSOR_INTERVAL_MS = 30 * 1000
+# Poll period in the last second of each minute, bounding how late a tick is drawn
+TICK_POLL_MS = 50
+CURRENT_WEATHER_REFRESH_MS = 3 * 60 * 1000
+CURRENT_WEATHER_EXPIRE_MS = 30 * 60 * 1000
+FORECAST_EXPIRE_MS = 4 * 60 * 60 * 1000
+
+# Weather provider modes (profile setting "weather.mode")
+WEATHER_MODE_COMBINED = "combined"  # Current conditions derived from the forecast
+WEATHER_MODE_SEPARATE = "separate"  # Current and forecast endpoints polled separately
+
+def _forecast_from_today(forecast, t):
+    """Returns the forecast days from today on, or None if today is not in it."""
+    today = "{:02d}-{:02d}".format(t[1], t[2])
+    for i in range(len(forecast)):
+        if forecast[i][0] == today:
+            return forecast[i:] if i else forecast
+    return None
+
 class AppController:
-    """Manages the application's main logic, including hardware interaction, display updates, and data fetching."""
+    """Manages the application's main logic, including hardware interaction, display updates, and data fetching.
+
+    ``run`` drives everything as cooperative asyncio tasks: a minute-tick
+    renderer, a weather refresher, a sensor sampler, an input handler and a
+    chime player. Slow work in one task (a network fetch, a beep) does not
+    hold up the clock or input.
+    """
     def __init__(self, state, hardware):
         """Initializes the AppController.
 
@@ -19,11 +49,31 @@ class AppController:
         """
         self.state = state
         self.hw = hardware
-        self.chime = Chime(20) if config_manager.get('chime.enabled') else None
-        self.location = config_manager.get("weather.location", "Taipei")
-        self.api_key = config_manager.get("weather.api_key")
-        self.time_zone_offset = config_manager.get("user.timezone_offset", 8)
+        settings = config_manager.settings
+        self.chime = Chime(20) if settings.chime_enabled else None
+        self.location = settings.location
+        self.api_key = settings.api_key
+        self.time_zone_offset = settings.timezone_offset
+        # Forecasts older than this are refetched in the background
+        self.weather_max_age_ms = settings.weather_max_age_min * 60 * 1000
+        self.weather_mode = settings.weather_mode
+        if self.weather_mode == WEATHER_MODE_SEPARATE:
+            self.current_refresh_ms = CURRENT_WEATHER_REFRESH_MS
+            self.current_expire_ms = CURRENT_WEATHER_EXPIRE_MS
+        else:
+            # Derived conditions are as fresh as the forecast; the current
+            # endpoint is only polled if an interval is configured (0 = never)
+            self.current_refresh_ms = settings.weather_current_refresh_min * 60 * 1000
+            self.current_expire_ms = FORECAST_EXPIRE_MS
 
+        self.screen_on = False
+        self._touch_state = None
+        # Set when new data should be drawn before the next minute tick
+        self._data_changed = False
+        self._wake = asyncio.Event()
+        self._weather_due = asyncio.Event()
+        self._weather_force = False
+        self._chime_due = asyncio.Event()
 
     def handle_touch(self, touch_state):
         # Handle touch events and switch images
@@ -35,60 +85,158 @@ class AppController:
                 self.state.image_offset = (self.state.image_offset + 1) % len(self.state.image_name_list)
                 print(f"Image changed, offset: {self.state.image_offset}")
 
-    def handle_buttons(self):
-        """Handles button long press detection using unified hardware manager approach."""
+    def handle_input(self):
+        """Consumes queued touch and button events.
+
+        Returns:
+            The touch state if the panel was touched, otherwise None.
+        """
         def reset_callback(button_index):
             """Callback function for button long press reset."""
             print(f"Button {button_index+1} long pressed in normal mode. Resetting WiFi and AP settings...")
             reset_wifi_and_reboot()
         
-        # Use hardware manager's unified button handling
-        self.hw.handle_button_long_press(reset_callback)
+        # Button long presses are timed from the interrupt-queued events
+        return self.hw.poll_input(reset_callback)
+
+    async def run(self):
+        """Runs the application tasks forever."""
+        # Let panel refreshes finish in the background while tasks run
+        display_service.async_refresh = True
+        # Read the sensor and cached weather up front so the first frame can show them
+        self._update_sensor_data()
+        self._restore_weather_cache()
+        asyncio.create_task(self._input_task())
+        asyncio.create_task(self._weather_task())
+        asyncio.create_task(self._sensor_task())
+        if self.chime:
+            asyncio.create_task(self._chime_task())
+        await self._render_task()
+
+    async def _render_task(self):
+        """Runs the main loop on every minute boundary, or earlier when woken."""
+        while True:
+            self.run_main_loop()
+            # localtime() has whole seconds only, so a wait computed from it
+            # can overshoot the boundary by up to a second. Sleep into the
+            # minute's last second instead, then poll for the boundary.
+            second = time.localtime()[5]
+            timeout = (59 - second) * 1000 if second < 59 else TICK_POLL_MS
+            try:
+                await asyncio.wait_for_ms(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _input_task(self):
+        """Handles touch and button interrupts as they arrive."""
+        while True:
+            await self.hw.wait_for_input(self.hw.next_input_deadline_ms())
+            touch_state = self.handle_input()
+            if touch_state:
+                self.state.last_touch_time = time.time()
+                self._touch_state = touch_state
+                self._wake.set()
+
+    async def _weather_task(self):
+        """Refreshes weather data in the background.
+
+        Checks every ``WEATHER_CHECK_INTERVAL_MS``, or straight away when the
+        main loop signals a first run or a new day. Only a new day forces a
+        fetch; otherwise data is refetched once it is older than its
+        refresh interval. A failing endpoint is retried on its breaker's
+        backoff schedule, which may wake the task before the next check.
+        """
+        while True:
+            timeout = WEATHER_CHECK_INTERVAL_MS
+            for breaker in (self.state.current_weather_breaker, self.state.weather_forecast_breaker):
+                wait = breaker.wait_ms()
+                if 0 < wait < timeout:
+                    timeout = wait
+            try:
+                await asyncio.wait_for_ms(self._weather_due.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._weather_due.clear()
+            force = self._weather_force
+            self._weather_force = False
+            if self.screen_on and await self._update_weather(force):
+                self._data_changed = True
+                self._wake.set()
+
+    async def _sensor_task(self):
+        """Samples the DHT22 sensor periodically."""
+        while True:
+            await asyncio.sleep_ms(SENSOR_INTERVAL_MS)
+            self._update_sensor_data()
+
+    async def _chime_task(self):
+        """Plays the chime whenever the main loop asks for it."""
+        while True:
+            await self._chime_due.wait()
+            self._chime_due.clear()
+            settings = config_manager.settings
+            await self.chime.do_chime_async(pitch=settings.chime_pitch, volume=settings.chime_volume)
 
     def run_main_loop(self):
-        """Executes the main application loop, handling sensor readings, time updates, and display logic."""
+        """Executes one pass of the main loop: screen power, time updates and display logic."""
         adc_value = self.hw.get_adc_value()
-        touch_state = self.hw.get_touch_state()
+        touch_state = self._touch_state
+        self._touch_state = None
         t = get_local_time(offset=self.time_zone_offset*3600)
 
-        if touch_state:
-            self.state.last_touch_time = time.time()
-
-        self.handle_buttons()
-
-        light_threshold = config_manager.get("user.light_threshold", 55000)
+        light_threshold = config_manager.settings.light_threshold
         time_since_touch = time.time() - self.state.last_touch_time if self.state.last_touch_time != -1 else 3601
 
         # If ambient light is below threshold (screen should be off) or time since last touch is less than 1 hour
         if adc_value <= light_threshold or time_since_touch < 3600:         
+            self.screen_on = True
             # If date has changed
             if t[2] != self.state.last_day:
+                # A new day needs a fresh forecast; at boot the cached one may do
+                if self.state.last_day != -1:
+                    self._weather_force = True
                 self.state.last_day = t[2]
-                self.state.weather_forecast = None
-                self.state.current_weather = None
+                # Keep showing today's part of the old forecast until the new one arrives
+                if self.state.weather_forecast:
+                    self.state.weather_forecast = _forecast_from_today(self.state.weather_forecast, t)
                 sync_time()
+                icon_atlas.refresh()
+                self._weather_due.set()
 
-            # If minute has changed, or touch occurred, or first run
-            if t[4] != self.state.last_minute or touch_state is not None or self.state.is_first_run:
+            if self.state.is_first_run:
+                self._weather_due.set()
+
+            # If minute has changed, touch occurred, new data arrived, or first run
+            if t[4] != self.state.last_minute or touch_state is not None or self._data_changed or self.state.is_first_run:
                 self.handle_touch(touch_state)
-                self._perform_chime(t)
-                self._update_weather()
-                self._update_sensor_data()
-                self._update_display(t)
+                if t[4] != self.state.last_minute:
+                    self._perform_chime(t)
+                self._data_changed = False
+                rendered = self._update_display(t)
 
                 self.state.is_first_run = False
-                self.state.partial_update = not self.state.partial_update
+                # Alternate full/partial refreshes only over frames actually sent
+                if rendered:
+                    self.state.partial_update = not self.state.partial_update
                 self.state.last_minute = t[4]
+                if t[4] == 0:
+                    print(f"Info: Display stats: {display_service.stats()}")
         else:
+            self.screen_on = False
             # Reset flags when screen is off to ensure full update on wake-up
             self.state.is_first_run = True
             self.state.partial_update = False
+            display_service.sleep()
 
     def _update_display(self, t):
         """Updates the display content based on current state and time.
 
         Args:
             t (tuple): Current time tuple.
+
+        Returns:
+            bool: True if a new frame was sent, False if it was unchanged.
         """
         image_directory = "/image/custom"
         self.state.display_image_path = get_image_path(image_directory, self.state.image_name_list, self.state.image_offset)
@@ -104,10 +252,10 @@ class AppController:
                 print(f"Date event found for {current_date}, loaded {len(self.state.event_image_list)} images.")
 
         # Page rendering logic
-        if config_manager.get("user.birthday") == current_date:
-            update_page_birthday(self.state.partial_update, t)
+        if config_manager.settings.birthday == current_date:
+            return update_page_birthday(self.state.partial_update, t)
         elif self.state.current_weather and self.state.weather_forecast:
-            update_page_weather(
+            return update_page_weather(
                 self.state.current_weather, 
                 self.state.weather_forecast, 
                 self.state.display_image_path, 
@@ -117,46 +265,109 @@ class AppController:
                 dht22_humidity=self.state.current_humidity
             )
         else:
-            update_page_time_image(self.state.display_image_path, self.state.partial_update, t)
+            return update_page_time_image(self.state.display_image_path, self.state.partial_update, t)
 
     def _perform_chime(self, t):
-        """Plays chime sound based on configured interval."""
-        if self.chime and config_manager.get('chime.enabled'):
-            is_hourly = config_manager.get('chime.interval') == 'hourly'
-            is_half_hourly = config_manager.get('chime.interval') == 'half_hourly'
+        """Asks the chime task to play if a chime is due at this minute."""
+        settings = config_manager.settings
+        if self.chime and settings.chime_enabled:
+            is_hourly = settings.chime_interval == 'hourly'
+            is_half_hourly = settings.chime_interval == 'half_hourly'
 
             if t[4] == 0 and (is_hourly or is_half_hourly):
-                self.chime.do_chime(
-                    pitch=config_manager.get('chime.pitch', 880),
-                    volume=config_manager.get('chime.volume', 80)
-                )
+                self._chime_due.set()
             if t[4] == 30 and is_half_hourly:
-                self.chime.do_chime(
-                    pitch=config_manager.get('chime.pitch', 880),
-                    volume=config_manager.get('chime.volume', 80)
-                )
-
-    def _update_weather(self):
-        """Fetches and updates current weather and forecast data if needed."""
-        if time.ticks_diff(time.ticks_ms(), self.state.current_weather_last_updated) > 3 * 60 * 1000 or self.state.is_first_run or not self.state.current_weather:
-            current_weather = fetch_current_weather(self.api_key, self.location)
+                self._chime_due.set()
+
+    async def _update_weather(self, force=False):
+        """Fetches and updates current weather and forecast data if needed.
+
+        Returns:
+            bool: True if the weather state changed.
+        """
+        changed = False
+        fetched = forecast_fetched = False
+        combined = self.weather_mode != WEATHER_MODE_SEPARATE
+        # Polled on its own schedule; derived conditions never postpone it
+        last_fetch = self.state.current_weather_fetched
+        if self.current_refresh_ms and (last_fetch is None or time.ticks_diff(time.ticks_ms(), last_fetch) > self.current_refresh_ms or (force and not combined) or not self.state.current_weather):
+            current_weather = await fetch_current_weather(self.api_key, self.location, breaker=self.state.current_weather_breaker)
             if current_weather:
+                changed = changed or current_weather != self.state.current_weather
                 self.state.current_weather = current_weather
-                self.state.current_weather_last_updated = time.ticks_ms()
+                self.state.current_weather_last_updated = self.state.current_weather_fetched = time.ticks_ms()
+                fetched = True
         
-        if time.ticks_diff(time.ticks_ms(), self.state.weather_forecast_last_updated) > 30 * 60 * 1000 or self.state.is_first_run or not self.state.weather_forecast:
-            weather_forecast = fetch_weather_forecast(self.api_key, self.location, days_limit=4, timezone_offset=self.time_zone_offset)
+        if time.ticks_diff(time.ticks_ms(), self.state.weather_forecast_last_updated) > self.weather_max_age_ms or force or not self.state.weather_forecast:
+            if combined:
+                current_weather, weather_forecast = await fetch_weather_combined(self.api_key, self.location, days_limit=4, timezone_offset=self.time_zone_offset, breaker=self.state.weather_forecast_breaker)
+            else:
+                current_weather = None
+                weather_forecast = await fetch_weather_forecast(self.api_key, self.location, days_limit=4, timezone_offset=self.time_zone_offset, breaker=self.state.weather_forecast_breaker)
             if weather_forecast:
+                changed = changed or weather_forecast != self.state.weather_forecast
                 self.state.weather_forecast = weather_forecast
                 self.state.weather_forecast_last_updated = time.ticks_ms()
+                fetched = forecast_fetched = True
+            # Derived conditions do not displace real ones fetched within the forecast interval
+            if current_weather and (not self.state.current_weather or time.ticks_diff(time.ticks_ms(), self.state.current_weather_last_updated) > self.weather_max_age_ms):
+                changed = changed or current_weather != self.state.current_weather
+                self.state.current_weather = current_weather
+                self.state.current_weather_last_updated = time.ticks_ms()
 
-        # Clear current weather data if older than 30 minutes
-        if time.ticks_diff(time.ticks_ms(), self.state.current_weather_last_updated) > 30 * 60 * 1000:
+        # Both fetches above share one kept-alive connection; free it until the next round
+        await close_connection()
+        if fetched:
+            self._save_weather_cache(force=forecast_fetched)
+
+        # Clear current weather data once expired (30 minutes, or with the forecast when derived from it)
+        if self.state.current_weather and time.ticks_diff(time.ticks_ms(), self.state.current_weather_last_updated) > self.current_expire_ms:
             self.state.current_weather = None
+            changed = True
 
         # Clear weather forecast data if older than 4 hours
-        if time.ticks_diff(time.ticks_ms(), self.state.weather_forecast_last_updated) > 4 * 60 * 60 * 1000 :
+        if self.state.weather_forecast and time.ticks_diff(time.ticks_ms(), self.state.weather_forecast_last_updated) > FORECAST_EXPIRE_MS:
             self.state.weather_forecast = None
+            changed = True
+        return changed
+
+    def _restore_weather_cache(self):
+        """Seeds the weather state from the flash cache.
+
+        Restored data keeps its real age: anything past its refresh interval
+        is still shown while the weather task refetches it, and anything
+        past its expiry is not restored at all.
+        """
+        cached = weather_cache.load(self.location)
+        if not cached:
+            return
+        current, current_age, forecast, forecast_age = cached
+        now = time.ticks_ms()
+        if current and current_age * 1000 <= self.current_expire_ms:
+            self.state.current_weather = current
+            self.state.current_weather_last_updated = time.ticks_add(now, -current_age * 1000)
+            if self.weather_mode == WEATHER_MODE_SEPARATE:
+                # Only then is the cached entry known to come from the current endpoint
+                self.state.current_weather_fetched = self.state.current_weather_last_updated
+        if forecast and forecast_age * 1000 <= FORECAST_EXPIRE_MS:
+            forecast = _forecast_from_today(forecast, get_local_time(offset=self.time_zone_offset*3600))
+            if forecast:
+                self.state.weather_forecast = forecast
+                self.state.weather_forecast_last_updated = time.ticks_add(now, -forecast_age * 1000)
+        if self.state.current_weather or self.state.weather_forecast:
+            print(f"Info: Restored cached weather for {self.location} (current {current_age}s, forecast {forecast_age}s old).")
+
+    def _save_weather_cache(self, force=False):
+        """Writes the weather state to the flash cache."""
+        now = time.ticks_ms()
+        weather_cache.save(
+            self.location,
+            self.state.current_weather,
+            time.ticks_diff(now, self.state.current_weather_last_updated) // 1000,
+            self.state.weather_forecast,
+            time.ticks_diff(now, self.state.weather_forecast_last_updated) // 1000,
+            force=force
+        )
     
     def _update_sensor_data(self):
         """Reads DHT22 sensor data and updates application state.
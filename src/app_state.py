@@ -1,4 +1,5 @@
 # app_state.py
+from circuit_breaker import CircuitBreaker
 
 class AppState:
     """Manages the application's current state, including display, weather, and touch information."""
@@ -11,9 +12,16 @@ class AppState:
 
         self.current_weather = None
         self.current_weather_last_updated = -1
+        # ticks_ms of the last fetch from the current-weather endpoint (None = never);
+        # conditions derived from the forecast do not move it
+        self.current_weather_fetched = None
 
         self.weather_forecast = None
         self.weather_forecast_last_updated = -1
+
+        # Per-endpoint failure tracking for the weather API
+        self.current_weather_breaker = CircuitBreaker("Current weather API")
+        self.weather_forecast_breaker = CircuitBreaker("Weather forecast API")
         
         # DHT22 local sensor data
         self.current_temperature = None
@@ -1,4 +1,5 @@
 import time
+import asyncio
 from machine import Pin, PWM
 
 class Chime:
@@ -24,6 +25,21 @@ class Chime:
         time.sleep_ms(200)
         self.play(pitch, 100, volume)
 
+    async def play_async(self, frequency, duration_ms, volume):
+        """Plays a tone like ``play`` but yields to other tasks while it sounds."""
+        if volume > 0:
+            self.pwm.freq(frequency)
+            duty_cycle = int((volume / 100 / 2) * 65535)
+            self.pwm.duty_u16(duty_cycle)
+            await asyncio.sleep_ms(duration_ms)
+        self.pwm.duty_u16(0)
+
+    async def do_chime_async(self, pitch=880, volume=80):
+        """Plays two short beeps without blocking the event loop."""
+        await self.play_async(pitch, 100, volume)
+        await asyncio.sleep_ms(200)
+        await self.play_async(pitch, 100, volume)
+
     def deinit(self):
         """Deinitializes the PWM to release the pin."""
         self.pwm.deinit()
@@ -0,0 +1,65 @@
+# circuit_breaker.py
+import time
+import random
+
+BACKOFF_BASE_MS = 5 * 1000
+BACKOFF_MAX_MS = 15 * 60 * 1000
+FAILURE_THRESHOLD = 3
+
+# Circuit states
+CLOSED = 0     # Requests flow normally
+OPEN = 1       # Requests are refused until the backoff delay expires
+HALF_OPEN = 2  # One trial request is allowed through
+
+class CircuitBreaker:
+    """Failure tracker for one remote endpoint.
+
+    Each consecutive failure schedules the next attempt after an
+    exponentially growing delay (``base_ms`` doubling up to ``max_ms``)
+    with equal jitter, so devices that failed together do not retry
+    together. After ``threshold`` consecutive failures the circuit opens;
+    once the delay expires a single half-open trial decides whether it
+    closes again or reopens with a longer delay. ``allow`` never blocks.
+    """
+    def __init__(self, name, base_ms=BACKOFF_BASE_MS, max_ms=BACKOFF_MAX_MS, threshold=FAILURE_THRESHOLD):
+        self.name = name
+        self.base_ms = base_ms
+        self.max_ms = max_ms
+        self.threshold = threshold
+        self.state = CLOSED
+        self.failures = 0
+        self.retry_at = 0
+
+    def wait_ms(self):
+        """Returns how long until the next attempt is allowed (0 if now)."""
+        if not self.failures:
+            return 0
+        return max(0, time.ticks_diff(self.retry_at, time.ticks_ms()))
+
+    def allow(self):
+        """Returns True if a request may be made now."""
+        if self.wait_ms():
+            return False
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+            print(f"Info: {self.name} circuit half-open, trying one request.")
+        return True
+
+    def success(self):
+        """Records a successful request and closes the circuit."""
+        if self.failures:
+            print(f"Info: {self.name} recovered after {self.failures} failure(s).")
+        self.state = CLOSED
+        self.failures = 0
+
+    def failure(self):
+        """Records a failed request and schedules the next attempt."""
+        self.failures += 1
+        delay = min(self.max_ms, self.base_ms << min(self.failures - 1, 16))
+        delay = delay // 2 + random.randint(0, delay // 2)
+        self.retry_at = time.ticks_add(time.ticks_ms(), delay)
+        if self.state == HALF_OPEN or self.failures >= self.threshold:
+            if self.state != OPEN:
+                print(f"Warning: {self.name} circuit open after {self.failures} failures.")
+            self.state = OPEN
+        print(f"Warning: {self.name} request failed; next attempt in {delay // 1000} s.")
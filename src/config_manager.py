@@ -1,23 +1,124 @@
 import ujson
 import os
+import config_store
 
 CONFIG_FILE = 'config.json'
+CONFIG_TMP_FILE = CONFIG_FILE + '.tmp'
+
+# (attribute, config key, default) for ResolvedConfig
+_SETTINGS = (
+    ("location", "weather.location", "Taipei"),
+    ("api_key", "weather.api_key", None),
+    ("weather_mode", "weather.mode", "combined"),
+    ("weather_max_age_min", "weather.max_age_min", 30),
+    ("weather_current_refresh_min", "weather.current_refresh_min", 0),
+    ("timezone_offset", "user.timezone_offset", 8),
+    ("light_threshold", "user.light_threshold", 55000),
+    ("birthday", "user.birthday", None),
+    ("image_interval_min", "user.image_interval_min", 2),
+    ("chime_enabled", "chime.enabled", False),
+    ("chime_interval", "chime.interval", None),
+    ("chime_pitch", "chime.pitch", 880),
+    ("chime_volume", "chime.volume", 80),
+)
+
+class ResolvedConfig:
+    """Snapshot of the active settings as plain attributes.
+
+    Built once per configuration change, so hot-path reads such as
+    ``config_manager.settings.light_threshold`` are a single attribute
+    access instead of a key parse and profile lookup.
+    """
+    __slots__ = tuple(name for name, _, _ in _SETTINGS)
+
+    def __init__(self, resolved):
+        for name, key, default in _SETTINGS:
+            setattr(self, name, resolved.get(key, default))
+
+_MISSING = object()
+
+class _Transaction:
+    """Context manager returned by ``ConfigManager.transaction``."""
+
+    def __init__(self, manager):
+        self._manager = manager
+
+    def __enter__(self):
+        self._manager._batch_depth += 1
+        return self._manager
+
+    def __exit__(self, exc_type, exc, tb):
+        manager = self._manager
+        manager._batch_depth -= 1
+        if manager._batch_depth == 0:
+            # Changes already applied in memory are written even on error
+            manager.flush()
+        return False
 
 class ConfigManager:
     """Manages application configuration with multi-profile support."""
 
     def __init__(self):
+        self._generation = 0
+        self._dirty = False
+        self._batch_depth = 0
+        self._resolved = None
+        self._settings = None
+        self._profiles_by_name = {}
+        self._profiles_by_ssid = {}
+        self._profile_names = []
+        self._stored_as = None
         self.config = self._load_config()
+        self._index_profiles()
         self._migrate_legacy_config()
+        if self._stored_as and self.config.get("storage", "json") != self._stored_as:
+            # Imported JSON asks for the binary store, or the reverse
+            self._save_config()
 
     def _load_config(self):
-        """Loads configuration from the CONFIG_FILE."""
+        """Loads configuration from the CONFIG_FILE.
+
+        A save writes CONFIG_TMP_FILE and renames it over CONFIG_FILE, so a
+        power cut can leave either file newer than the other, or a truncated
+        temporary file. Both are read and the valid copy with the highest
+        ``generation`` wins, except that a CONFIG_FILE without one was put
+        there by hand and always wins. A leftover temporary file is then
+        renamed into place or removed, so it cannot shadow a later upload.
+
+        With ``"storage": "binary"`` the configuration lives in
+        ``config_store.CONFIG_BIN_FILE`` instead and CONFIG_FILE is removed,
+        so a CONFIG_FILE found on flash is an import and takes precedence.
+        """
+        best = best_path = None
+        for path in (CONFIG_FILE, CONFIG_TMP_FILE):
+            try:
+                with open(path, 'r') as f:
+                    config = ujson.load(f)
+            except (OSError, ValueError):
+                continue
+            if not isinstance(config, dict):
+                continue
+            if best is None or ("generation" in best and config.get("generation", 0) > best["generation"]):
+                best, best_path = config, path
         try:
-            with open(CONFIG_FILE, 'r') as f:
-                return ujson.load(f)
-        except (OSError, ValueError):
-            # Return new format default config
-            return self._get_default_config()
+            if best_path == CONFIG_TMP_FILE:
+                # Finish the interrupted save
+                os.rename(CONFIG_TMP_FILE, CONFIG_FILE)
+            else:
+                os.remove(CONFIG_TMP_FILE)
+        except OSError:
+            pass
+        if best is not None:
+            self._stored_as = "json"
+        else:
+            stored = config_store.load()
+            if stored is None:
+                # Return new format default config
+                return self._get_default_config()
+            self._stored_as = "binary"
+            best = stored[1]
+        self._generation = best.get("generation", 0)
+        return best
 
     def _get_default_config(self):
         """Returns a default configuration in new format."""
@@ -37,6 +138,11 @@ class ConfigManager:
                         "password": ""
                     },
                     "weather_location": "Taipei",
+                    "weather": {
+                        "mode": "combined",
+                        "max_age_min": 30,
+                        "current_refresh_min": 0
+                    },
                     "user": {
                         "birthday": "0101",
                         "light_threshold": 56000,
@@ -101,22 +207,73 @@ class ConfigManager:
             print("Success: Config migrated to multi-profile format.")
 
     def _save_config(self):
-        """Saves the current configuration to the CONFIG_FILE."""
-        with open(CONFIG_FILE, 'w') as f:
-            ujson.dump(self.config, f)
+        """Saves the current configuration to the CONFIG_FILE.
+
+        Every mutation ends here, so this also drops the resolved snapshot.
+        Inside a ``transaction`` the write is deferred to its end.
+        """
+        self._invalidate()
+        self._dirty = True
+        if self._batch_depth == 0:
+            self.flush()
+
+    def flush(self):
+        """Writes pending changes to flash, if there are any.
+
+        The file is written under a temporary name and renamed over the old
+        one with an incremented ``generation``, so an interrupted write
+        leaves the previous configuration loadable.
+        """
+        if not self._dirty:
+            return
+        self._generation += 1
+        self.config["generation"] = self._generation
+        storage = self.config.get("storage", "json")
+        if storage == "binary":
+            self.config["profiles"] = config_store.save(self.config)
+            stale = (CONFIG_FILE, CONFIG_TMP_FILE)
+        else:
+            if isinstance(self.config.get("profiles"), config_store.ProfileList):
+                self.config["profiles"] = list(self.config["profiles"])
+            with open(CONFIG_TMP_FILE, 'w') as f:
+                ujson.dump(self.config, f)
+            os.rename(CONFIG_TMP_FILE, CONFIG_FILE)
+            stale = (config_store.CONFIG_BIN_FILE,)
+        if self._stored_as != storage:
+            # Removed only once the new copy is in place, so a power cut
+            # in between leaves a loadable configuration
+            for path in stale:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._stored_as = storage
+        self._dirty = False
+
+    def transaction(self):
+        """Groups several changes into a single write.
+
+        Usage::
+
+            with config_manager.transaction():
+                config_manager.set_active_profile(name)
+                config_manager.set_last_connected_profile(name)
+
+        Transactions nest; the configuration is written once when the
+        outermost one exits.
+        """
+        return _Transaction(self)
 
     # ========== Profile Management Methods ==========
 
     def list_profiles(self):
         """Returns a list of all profile names."""
-        return [p["name"] for p in self.config.get("profiles", [])]
+        return list(self._profile_names)
 
     def get_profile(self, profile_name):
         """Returns the complete profile data for a given profile name."""
-        for profile in self.config.get("profiles", []):
-            if profile["name"] == profile_name:
-                return profile
-        return None
+        position = self._profiles_by_name.get(profile_name)
+        return None if position is None else self.config["profiles"][position]
 
     def add_profile(self, profile_data):
         """
@@ -136,24 +293,29 @@ class ConfigManager:
 
     def update_profile(self, profile_name, profile_data):
         """Updates an existing profile with new data."""
-        for i, profile in enumerate(self.config.get("profiles", [])):
-            if profile["name"] == profile_name:
-                # If name is being changed, check for conflicts
-                if profile_data["name"] != profile_name:
-                    if self.get_profile(profile_data["name"]) is not None:
-                        raise ValueError(f"Profile name '{profile_data['name']}' already exists.")
-
-                self.config["profiles"][i] = profile_data
-
-                # Update active_profile and last_connected_profile if necessary
-                if self.config.get("active_profile") == profile_name:
-                    self.config["active_profile"] = profile_data["name"]
-                if self.config.get("last_connected_profile") == profile_name:
-                    self.config["last_connected_profile"] = profile_data["name"]
-
-                self._save_config()
-                return True
-        return False
+        profile = self.get_profile(profile_name)
+        if profile is None:
+            return False
+        if profile_data == profile and profile_data["name"] == profile_name:
+            # Nothing changed; skip the flash write
+            return True
+
+        # If name is being changed, check for conflicts
+        if profile_data["name"] != profile_name:
+            if self.get_profile(profile_data["name"]) is not None:
+                raise ValueError(f"Profile name '{profile_data['name']}' already exists.")
+
+        profiles = self.config["profiles"]
+        profiles[self._profiles_by_name[profile_name]] = profile_data
+
+        # Update active_profile and last_connected_profile if necessary
+        if self.config.get("active_profile") == profile_name:
+            self.config["active_profile"] = profile_data["name"]
+        if self.config.get("last_connected_profile") == profile_name:
+            self.config["last_connected_profile"] = profile_data["name"]
+
+        self._save_config()
+        return True
 
     def delete_profile(self, profile_name):
         """Deletes a profile from the configuration."""
@@ -161,23 +323,26 @@ class ConfigManager:
         if len(self.config.get("profiles", [])) <= 1:
             raise ValueError("Cannot delete the last profile.")
 
-        for i, profile in enumerate(self.config.get("profiles", [])):
-            if profile["name"] == profile_name:
-                del self.config["profiles"][i]
+        profile = self.get_profile(profile_name)
+        if profile is None:
+            return False
 
-                # If deleted profile was active, switch to first available
-                if self.config.get("active_profile") == profile_name:
-                    self.config["active_profile"] = self.config["profiles"][0]["name"]
-                if self.config.get("last_connected_profile") == profile_name:
-                    self.config["last_connected_profile"] = None
+        del self.config["profiles"][self._profiles_by_name[profile_name]]
 
-                self._save_config()
-                return True
-        return False
+        # If deleted profile was active, switch to first available
+        if self.config.get("active_profile") == profile_name:
+            self.config["active_profile"] = self.config["profiles"][0]["name"]
+        if self.config.get("last_connected_profile") == profile_name:
+            self.config["last_connected_profile"] = None
+
+        self._save_config()
+        return True
 
     def get_active_profile_name(self):
         """Returns the name of the currently active profile."""
-        return self.config.get("active_profile", self.list_profiles()[0] if self.list_profiles() else None)
+        if "active_profile" in self.config:
+            return self.config["active_profile"]
+        return self._profile_names[0] if self._profile_names else None
 
     def get_active_profile(self):
         """Returns the complete data of the currently active profile."""
@@ -188,6 +353,8 @@ class ConfigManager:
         """Sets the active profile."""
         if self.get_profile(profile_name) is None:
             raise ValueError(f"Profile '{profile_name}' does not exist.")
+        if self.config.get("active_profile") == profile_name:
+            return
 
         self.config["active_profile"] = profile_name
         self._save_config()
@@ -196,6 +363,8 @@ class ConfigManager:
         """Records the last successfully connected profile."""
         if profile_name is not None and self.get_profile(profile_name) is None:
             raise ValueError(f"Profile '{profile_name}' does not exist.")
+        if "last_connected_profile" in self.config and self.config["last_connected_profile"] == profile_name:
+            return
 
         self.config["last_connected_profile"] = profile_name
         self._save_config()
@@ -204,69 +373,116 @@ class ConfigManager:
         """Returns the name of the last successfully connected profile."""
         return self.config.get("last_connected_profile")
 
+    def get_last_connection(self):
+        """Returns the {"ssid", "bssid", "channel"} of the last joined access point, or None."""
+        return self.config.get("last_connection")
+
+    def set_last_connection(self, ssid, bssid, channel):
+        """Records the access point of the last successful connection.
+
+        Args:
+            ssid: Network name.
+            bssid: Access point MAC address as a hex string.
+            channel: WiFi channel the access point was seen on.
+        """
+        connection = {"ssid": ssid, "bssid": bssid, "channel": channel}
+        if self.config.get("last_connection") == connection:
+            return
+
+        self.config["last_connection"] = connection
+        self._save_config()
+
     def find_profile_by_ssid(self, ssid):
         """Finds and returns the first profile that matches the given WiFi SSID."""
-        for profile in self.config.get("profiles", []):
-            if profile.get("wifi", {}).get("ssid") == ssid:
-                return profile
-        return None
+        position = self._profiles_by_ssid.get(ssid)
+        return None if position is None else self.config["profiles"][position]
 
     # ========== Backward Compatible Methods ==========
 
+    def _invalidate(self):
+        """Drops the resolved snapshot and reindexes the profiles after a change."""
+        self._resolved = None
+        self._settings = None
+        self._index_profiles()
+
+    def _index_profiles(self):
+        """Rebuilds the name -> position and SSID -> position indexes.
+
+        Both keep the first profile for each key, matching what a linear
+        scan of the profiles list would find. Profiles of the binary store
+        are indexed from its offset table without being paged in.
+        """
+        by_name = {}
+        by_ssid = {}
+        names = []
+        profiles = self.config.get("profiles", [])
+        paged = isinstance(profiles, config_store.ProfileList)
+        for i in range(len(profiles)):
+            name, ssid = profiles.key(i) if paged else config_store.profile_key(profiles[i])
+            names.append(name)
+            if name not in by_name:
+                by_name[name] = i
+            if ssid not in by_ssid:
+                by_ssid[ssid] = i
+        self._profiles_by_name = by_name
+        self._profiles_by_ssid = by_ssid
+        self._profile_names = names
+
+    def _resolve(self):
+        """Flattens global and active-profile settings into a dot-key dict."""
+        resolved = {}
+        global_config = self.config.get("global", {})
+        for sub_key, value in global_config.get("ap_mode", {}).items():
+            resolved["ap_mode." + sub_key] = value
+
+        active_profile = self.get_active_profile()
+        if active_profile:
+            for section in ("wifi", "user", "chime", "weather"):
+                for sub_key, value in active_profile.get(section, {}).items():
+                    resolved[section + "." + sub_key] = value
+            # These map to dedicated fields, not the "weather" section
+            resolved.pop("weather.location", None)
+            if "weather_location" in active_profile:
+                resolved["weather.location"] = active_profile["weather_location"]
+
+        resolved.pop("weather.api_key", None)
+        if "weather_api_key" in global_config:
+            resolved["weather.api_key"] = global_config["weather_api_key"]
+
+        self._resolved = resolved
+        return resolved
+
     def get(self, key, default=None):
         """
         Retrieves a configuration value using a dot-separated key.
         Supports both legacy and new format.
         For new format, reads from active profile or global settings.
+        Values come from a flat snapshot rebuilt only after a change.
         """
-        # Handle global settings
-        if key.startswith("ap_mode."):
-            sub_key = key[8:]  # Remove "ap_mode."
-            val = self.config.get("global", {}).get("ap_mode", {})
-            if sub_key in val:
-                return val[sub_key]
-            return default
-
-        if key == "weather.api_key":
-            return self.config.get("global", {}).get("weather_api_key", default)
-
-        # Handle profile-specific settings from active profile
-        active_profile = self.get_active_profile()
-        if not active_profile:
-            return default
-
-        # Map legacy keys to new profile structure
-        if key.startswith("wifi."):
-            sub_key = key[5:]  # Remove "wifi."
-            val = active_profile.get("wifi", {})
-            if sub_key in val:
-                return val[sub_key]
-            return default
-
-        if key == "weather.location":
-            return active_profile.get("weather_location", default)
-
-        if key.startswith("user."):
-            sub_key = key[5:]  # Remove "user."
-            val = active_profile.get("user", {})
-            if sub_key in val:
-                return val[sub_key]
-            return default
-
-        if key.startswith("chime."):
-            sub_key = key[6:]  # Remove "chime."
-            val = active_profile.get("chime", {})
-            if sub_key in val:
-                return val[sub_key]
-            return default
-
-        return default
+        resolved = self._resolved
+        if resolved is None:
+            resolved = self._resolve()
+        return resolved.get(key, default)
+
+    @property
+    def settings(self):
+        """The active settings as a ``ResolvedConfig`` snapshot."""
+        if self._settings is None:
+            resolved = self._resolved
+            if resolved is None:
+                resolved = self._resolve()
+            self._settings = ResolvedConfig(resolved)
+        return self._settings
 
     def set(self, key, value):
         """
         Sets a configuration value using a dot-separated key.
         Automatically determines whether to set in global or active profile.
+        Setting a key to the value it already has does not write the file.
         """
+        if self.get(key, _MISSING) == value:
+            return
+
         # Handle global settings
         if key.startswith("ap_mode."):
             sub_key = key[8:]
@@ -297,6 +513,11 @@ class ConfigManager:
             active_profile["wifi"][sub_key] = value
         elif key == "weather.location":
             active_profile["weather_location"] = value
+        elif key.startswith("weather."):
+            sub_key = key[8:]
+            if "weather" not in active_profile:
+                active_profile["weather"] = {}
+            active_profile["weather"][sub_key] = value
         elif key.startswith("user."):
             sub_key = key[5:]
             if "user" not in active_profile:
@@ -308,8 +529,8 @@ class ConfigManager:
                 active_profile["chime"] = {}
             active_profile["chime"][sub_key] = value
 
-        # Update the profile in the config
-        self.update_profile(active_profile["name"], active_profile)
+        # The active profile was changed in place
+        self._save_config()
 
     def get_global(self, key, default=None):
         """Gets a value from global settings."""
@@ -330,6 +551,8 @@ class ConfigManager:
         val = self.config["global"]
         for i, k in enumerate(keys):
             if i == len(keys) - 1:
+                if k in val and val[k] == value:
+                    return
                 val[k] = value
             else:
                 if k not in val or not isinstance(val[k], dict):
@@ -0,0 +1,216 @@
+# config_store.py
+import os
+import struct
+import ujson
+
+CONFIG_BIN_FILE = 'config.bin'
+CONFIG_BIN_MAGIC = b'PCFG'
+CONFIG_BIN_VERSION = 1
+
+# magic, version, profile count, generation, root length, table length, file length
+_HEADER = '<4sBHIIII'
+_HEADER_SIZE = struct.calcsize(_HEADER)
+# Per profile: record offset, record length, name length (name bytes, SSID
+# length and SSID bytes follow)
+_ENTRY = '<IIH'
+_ENTRY_SIZE = struct.calcsize(_ENTRY)
+_NO_SSID = 0xFFFF
+
+def profile_key(profile):
+    """Returns the (name, SSID) pair a profile is indexed by."""
+    return profile["name"], profile.get("wifi", {}).get("ssid")
+
+class ProfileList:
+    """Profiles of a binary config file, decoded on first access.
+
+    Behaves like the plain profiles list for indexing, assignment,
+    deletion, ``append`` and iteration, but each profile is only read from
+    flash and decoded when it is first indexed. ``key`` answers name and
+    SSID lookups from the offset table without decoding anything.
+    """
+    def __init__(self, path, entries, items=None):
+        self._path = path
+        # (offset, length, name, ssid) per profile; None once replaced in memory
+        self._entries = entries
+        self._items = items if items is not None else [None] * len(entries)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, i):
+        item = self._items[i]
+        if item is None:
+            offset, length = self._entries[i][0], self._entries[i][1]
+            with open(self._path, 'rb') as f:
+                f.seek(offset)
+                item = ujson.loads(f.read(length))
+            self._items[i] = item
+        return item
+
+    def __setitem__(self, i, profile):
+        self._items[i] = profile
+
+    def __delitem__(self, i):
+        del self._items[i]
+        del self._entries[i]
+
+    def __iter__(self):
+        for i in range(len(self._items)):
+            yield self[i]
+
+    def append(self, profile):
+        self._items.append(profile)
+        self._entries.append(None)
+
+    def loaded(self, i):
+        """Returns True if profile ``i`` is decoded in memory."""
+        return self._items[i] is not None
+
+    def key(self, i):
+        """Returns the (name, SSID) of profile ``i`` without paging it in."""
+        item = self._items[i]
+        if item is not None:
+            return profile_key(item)
+        return self._entries[i][2], self._entries[i][3]
+
+def _read(path):
+    """Reads the header, root record, offset table and active profile of ``path``.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If it is not a complete config file.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER_SIZE)
+        if len(header) != _HEADER_SIZE:
+            raise ValueError("Config file header truncated")
+        magic, version, count, generation, root_len, table_len, size = struct.unpack(_HEADER, header)
+        if magic != CONFIG_BIN_MAGIC or version != CONFIG_BIN_VERSION:
+            raise ValueError("Not a config file of this version")
+        if os.stat(path)[6] != size:
+            raise ValueError("Config file truncated")
+        config = ujson.loads(f.read(root_len))
+
+        table = f.read(table_len)
+        entries = []
+        pos = 0
+        for _ in range(count):
+            offset, length, name_len = struct.unpack_from(_ENTRY, table, pos)
+            pos += _ENTRY_SIZE
+            name = table[pos:pos + name_len].decode()
+            pos += name_len
+            ssid_len = struct.unpack_from('<H', table, pos)[0]
+            pos += 2
+            ssid = None
+            if ssid_len != _NO_SSID:
+                ssid = table[pos:pos + ssid_len].decode()
+                pos += ssid_len
+            entries.append((offset, length, name, ssid))
+
+        # The active profile is needed right away; read it while the file is open
+        items = [None] * count
+        active = config.get("active_profile")
+        for i in range(count):
+            if entries[i][2] == active or (active is None and i == 0):
+                f.seek(entries[i][0])
+                items[i] = ujson.loads(f.read(entries[i][1]))
+                break
+    config["profiles"] = ProfileList(path, entries, items)
+    return generation, config
+
+def load(path=CONFIG_BIN_FILE):
+    """Loads a binary config file.
+
+    Only the global settings, the offset table and the active profile are
+    decoded; other profiles are paged in by the returned ``ProfileList``.
+    If an interrupted ``save`` left a complete, newer temporary file, it is
+    renamed into place first.
+
+    Returns:
+        tuple: (generation, config dict), or None if there is no valid file.
+    """
+    tmp_path = path + '.tmp'
+    best = None
+    for candidate in (path, tmp_path):
+        try:
+            generation, config = _read(candidate)
+        except (OSError, ValueError):
+            continue
+        if best is None or generation > best[0]:
+            best = generation, config
+    if best is None:
+        return None
+    if best[1]["profiles"]._path == tmp_path:
+        os.rename(tmp_path, path)
+        best[1]["profiles"]._path = path
+    return best
+
+def save(config, path=CONFIG_BIN_FILE):
+    """Writes ``config`` as a binary config file.
+
+    Profiles that were never paged in are copied from the current file as
+    raw bytes, without being decoded. The file is written under a
+    temporary name and renamed into place.
+
+    Returns:
+        ProfileList: The profiles, now backed by the new file. Profiles
+        already in memory stay decoded.
+    """
+    profiles = config.get("profiles", [])
+    paged = isinstance(profiles, ProfileList)
+    root = {}
+    for key, value in config.items():
+        if key != "profiles":
+            root[key] = value
+    root_data = ujson.dumps(root).encode()
+
+    # Encoded record (or None to copy from the old file), length and key per profile
+    records = []
+    table_len = 0
+    for i in range(len(profiles)):
+        if paged and not profiles.loaded(i):
+            old = profiles._entries[i]
+            records.append((None, old[1], old[2], old[3]))
+        else:
+            data = ujson.dumps(profiles[i]).encode()
+            name, ssid = profile_key(profiles[i])
+            records.append((data, len(data), name, ssid))
+        name, ssid = records[-1][2], records[-1][3]
+        table_len += _ENTRY_SIZE + len(name.encode()) + 2 + (len(ssid.encode()) if ssid is not None else 0)
+
+    offset = _HEADER_SIZE + len(root_data) + table_len
+    table = bytearray()
+    entries = []
+    for data, length, name, ssid in records:
+        name_bytes = name.encode()
+        table += struct.pack(_ENTRY, offset, length, len(name_bytes))
+        table += name_bytes
+        if ssid is None:
+            table += struct.pack('<H', _NO_SSID)
+        else:
+            ssid_bytes = ssid.encode()
+            table += struct.pack('<H', len(ssid_bytes))
+            table += ssid_bytes
+        entries.append((offset, length, name, ssid))
+        offset += length
+
+    tmp_path = path + '.tmp'
+    source = open(profiles._path, 'rb') if paged else None
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(struct.pack(_HEADER, CONFIG_BIN_MAGIC, CONFIG_BIN_VERSION, len(records),
+                                config.get("generation", 0), len(root_data), len(table), offset))
+            f.write(root_data)
+            f.write(table)
+            for i, (data, length, _, _) in enumerate(records):
+                if data is None:
+                    source.seek(profiles._entries[i][0])
+                    data = source.read(length)
+                f.write(data)
+    finally:
+        if source:
+            source.close()
+    os.rename(tmp_path, path)
+
+    items = profiles._items if paged else list(profiles)
+    return ProfileList(path, entries, items)
@@ -1,10 +1,19 @@
 # display_manager.py
-from display_utils import draw_scaled_text, draw_image, display_rotated_screen
+from display_utils import draw_scaled_text, draw_image, display_rotated_screen, image_pool
 from netutils import get_local_time
 from file_manager import list_files, get_image_path, shuffle_files
+from icon_atlas import icon_atlas
 import random
 import time
 
+def draw_weather_icon(canvas, condition, x, y):
+    """Draws a 32x32 weather icon from the in-RAM icon atlas."""
+    icon = icon_atlas.get(condition)
+    if icon is None:
+        print(f"Warning: No weather icon for '{condition}'.")
+        return
+    canvas.blit(icon, x, y)
+
 def update_page_weather(current_weather, weather_forecast, display_image_path, partial_update, t, dht22_temp=None, dht22_humidity=None):
     """Updates the display to show weather and time information with DHT22 sensor data and custom image.
     
@@ -16,7 +25,17 @@ def update_page_weather(current_weather, weather_forecast, display_image_path, p
         t: Current time tuple
         dht22_temp: DHT22 local temperature (optional)
         dht22_humidity: DHT22 local humidity (optional)
+
+    Returns:
+        bool: True if a new frame was sent to the display.
     """
+    key = (
+        "weather", t[1], t[2], t[3], t[4],
+        current_weather, tuple(weather_forecast[:4]), display_image_path,
+        int(dht22_temp) if dht22_temp is not None else None,
+        int(dht22_humidity) if dht22_humidity is not None else None,
+    )
+
     def draw(canvas):
         date_str = "{:02d}/{:02d}".format(t[1], t[2])
         time_str = "{:02d}:{:02d}".format(t[3], t[4])
@@ -28,8 +47,7 @@ def update_page_weather(current_weather, weather_forecast, display_image_path, p
         draw_scaled_text(canvas, time_str, 3, 40, 3, 0)
         
         if current_weather and current_weather[1] != "Unknown":
-            weather_icon_path = "/image/weather_icons/{}.bin".format(current_weather[1])
-            draw_image(canvas, weather_icon_path, 32, 32, 130, 0)
+            draw_weather_icon(canvas, current_weather[1], 130, 0)
         # Display DHT22 local sensor data (replacing original current weather position)
         if dht22_temp is not None:
             draw_scaled_text(canvas, "{:02d}".format(int(dht22_temp)), 130, 32, 2, 0)
@@ -44,8 +62,7 @@ def update_page_weather(current_weather, weather_forecast, display_image_path, p
             
             # First slot: OpenWeather current weather
             if current_weather and current_weather[1] != "Unknown":
-                weather_icon_path = "/image/weather_icons/{}.bin".format(current_weather[1])
-                draw_image(canvas, weather_icon_path, 32, 32, 8 + offset, 80)
+                draw_weather_icon(canvas, current_weather[1], 8 + offset, 80)
                 draw_scaled_text(canvas, "{:02d}".format(int(current_weather[0])), 15 + offset, 72, 1, 0)
                 draw_scaled_text(canvas, "o", 30 + offset, 67, 1, 0)
                 # Show current rain probability if available
@@ -55,8 +72,7 @@ def update_page_weather(current_weather, weather_forecast, display_image_path, p
             
             # Next 3 slots: Future 3-day forecast (skip first day, show next 3)
             for weather in weather_forecast[1:4]:
-                icon_path = "/image/weather_icons/{}.bin".format(weather[2])
-                draw_image(canvas, icon_path, 32, 32, 8 + offset, 80)
+                draw_weather_icon(canvas, weather[2], 8 + offset, 80)
                 draw_scaled_text(canvas, "{:02d}".format(int(weather[1])), 15 + offset, 72, 1, 0)
                 draw_scaled_text(canvas, "o", 30 + offset, 67, 1, 0)
                 draw_scaled_text(canvas, "{}%".format(int(weather[3])), 15 + offset, 115, 1, 0)
@@ -64,20 +80,32 @@ def update_page_weather(current_weather, weather_forecast, display_image_path, p
                 
         draw_image(canvas, display_image_path, 128, 128, 168, 0)
         
-    display_rotated_screen(draw, angle=90, partial_update=partial_update)
+    return display_rotated_screen(draw, angle=90, partial_update=partial_update, key=key)
 
 def update_page_time_image(display_image_path, partial_update, t):
-    """Updates the display to show time and a custom image."""
+    """Updates the display to show time and a custom image.
+
+    Returns:
+        bool: True if a new frame was sent to the display.
+    """
+    key = ("time_image", t[1], t[2], t[3], t[4], display_image_path)
+
     def draw(canvas):
         date_str = "{:02d}/{:02d}".format(t[1], t[2])
         time_str = "{:02d}:{:02d}".format(t[3], t[4])
         draw_scaled_text(canvas, date_str, 3, 20, 4, 0)
         draw_scaled_text(canvas, time_str, 3, 70, 4, 0)
         draw_image(canvas, display_image_path, 128, 128, 168, 0)
-    display_rotated_screen(draw, angle=90, partial_update=partial_update)
+    return display_rotated_screen(draw, angle=90, partial_update=partial_update, key=key)
 
 def update_page_birthday(partial_update, t):
-    """Updates the display to show a birthday message and image."""
+    """Updates the display to show a birthday message and image.
+
+    Returns:
+        bool: True if a new frame was sent to the display.
+    """
+    key = ("birthday", t[1], t[2], t[3], t[4])
+
     def draw(canvas):
         date_str = "{:02d}/{:02d}".format(t[1], t[2])
         time_str = "{:02d}:{:02d}".format(t[3], t[4])
@@ -94,7 +122,7 @@ def update_page_birthday(partial_update, t):
         else:
             draw_scaled_text(canvas, "No image", 20, 140, 2, 0)
             
-    display_rotated_screen(draw, angle=90, partial_update=partial_update)
+    return display_rotated_screen(draw, angle=90, partial_update=partial_update, key=key)
 
 def update_page_loading(partial_update):
     """Updates the display to show a loading screen with a random image."""
@@ -108,6 +136,8 @@ def update_page_loading(partial_update):
         else:
             draw_scaled_text(canvas, "No image", 20, 20, 2, 0)
     display_rotated_screen(draw, angle=90, partial_update=partial_update)
+    # The splash is only shown at boot; don't keep its buffers around
+    image_pool.release(296, 128)
 
 def update_display_Restart():
     """Updates the display to show a reboot message."""
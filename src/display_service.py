@@ -0,0 +1,236 @@
+# display_service.py
+import framebuf
+import gc
+import time
+import asyncio
+from epaper import EPD_2in9, EPD_WIDTH, EPD_HEIGHT
+from display_utils import RotatedCanvas, find_dirty_regions, expand_mono_to_gray
+
+FRAME_SIZE = EPD_WIDTH * EPD_HEIGHT // 8
+BUSY_POLL_MS = 20
+
+# Controller states
+STATE_RESET = 0      # Power-on or unknown; needs a hardware reset and init
+STATE_READY = 1      # Initialised for full refreshes (OTP waveform)
+STATE_PARTIAL = 2    # Partial-refresh LUT loaded
+STATE_SLEEP = 3      # Deep sleep; RAM retained, needs a reset to wake
+STATE_GRAY = 4       # 4-gray LUT loaded; RAM holds gray planes, not a mono frame
+
+# Palette for drawing GS2 images in mono: levels 0-1 black, 2-3 white
+_GRAY_TO_MONO = framebuf.FrameBuffer(bytearray([0x30]), 4, 1, framebuf.MONO_HLSB)
+
+class DisplayService:
+    """Owns the e-paper driver and frame buffers for the lifetime of the app.
+
+    The driver (and its SPI/pin setup) is created once, and the controller
+    state is tracked so reset, init and LUT uploads only happen when the
+    refresh mode actually changes. Frames whose inputs or pixels match the
+    one on the panel are not sent at all.
+
+    With ``async_refresh`` set, a refresh returns as soon as the panel
+    starts its waveform; a background task waits for BUSY to drop while
+    other tasks run. Anything that needs the panel next waits for the rest
+    of the refresh first.
+
+    4-gray images are only sent on full refreshes. Partial updates draw
+    them in mono instead, so the clock keeps ticking without a flashing
+    4-gray waveform every minute.
+    """
+    def __init__(self):
+        self.epd = None
+        self.state = STATE_RESET
+        # front_buf mirrors the panel RAM; back_buf is drawn into next
+        self.front_buf = None
+        self.back_buf = None
+        # Key describing the inputs of the frame on the panel
+        self.last_key = None
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+        self.async_refresh = False
+        # ticks_ms when the refresh still running on the panel was started
+        self._busy_since = None
+        self._watching = False
+        self.refresh_ms = 0
+        self.reclaimed_ms = 0
+
+    def _driver(self):
+        if self.epd is None:
+            self.epd = EPD_2in9()
+        return self.epd
+
+    @property
+    def bytes_sent(self):
+        """Total bytes written to the panel over SPI."""
+        return self.epd.config.bytes_sent if self.epd is not None else 0
+
+    def stats(self):
+        """Returns the frame counters as a dict."""
+        return {
+            "frames_rendered": self.frames_rendered,
+            "frames_skipped": self.frames_skipped,
+            "bytes_sent": self.bytes_sent,
+            "refresh_ms": self.refresh_ms,
+            "reclaimed_ms": self.reclaimed_ms,
+        }
+
+    def show(self, draw_callback, angle=90, partial_update=False, key=None):
+        """Draws a frame and sends it to the panel.
+
+        Args:
+            draw_callback: Called with a ``RotatedCanvas`` to draw the frame.
+            angle: Rotation between the drawing canvas and the panel.
+            partial_update: Whether to use a partial refresh. Gray images
+                are drawn in mono on partial refreshes.
+            key: Optional tuple of everything the frame depends on. If it
+                equals the key of the frame on the panel, nothing is drawn.
+
+        Returns:
+            bool: False if the frame was skipped because it did not change,
+            True if it was sent to the panel.
+        """
+        if key is not None and key == self.last_key and self.front_buf is not None:
+            self.frames_skipped += 1
+            return False
+
+        if self.back_buf is None:
+            self.back_buf = bytearray(FRAME_SIZE)
+        canvas = RotatedCanvas(self.back_buf, EPD_WIDTH, EPD_HEIGHT, angle)
+        canvas.fill(1)
+        draw_callback(canvas)
+        gray_layers = canvas.gray_layers
+        # The mono frame always carries the gray images too, thresholded, so
+        # it matches the panel closely enough to partially update from
+        for buf, width, height, x, y in gray_layers:
+            canvas.fb.blit((buf, width, height, framebuf.GS2_HMSB), x, y, -1, _GRAY_TO_MONO)
+        canvas = None
+
+        if gray_layers and not partial_update:
+            self._refresh_gray(gray_layers)
+            return self._frame_sent(key)
+
+        if (self.front_buf is not None and self.back_buf == self.front_buf
+                and (partial_update or self.state != STATE_GRAY)):
+            print("Info: Frame unchanged. Skipping refresh.")
+            self.frames_skipped += 1
+            self.last_key = key
+            return False
+
+        if partial_update:
+            regions = None
+            if self.front_buf is not None:
+                regions = find_dirty_regions(self.front_buf, self.back_buf, EPD_WIDTH // 8)
+            self._refresh_partial(regions)
+        else:
+            self._refresh_full()
+        return self._frame_sent(key)
+
+    def _frame_sent(self, key):
+        self.last_key = key
+        self.frames_rendered += 1
+        # The frame just sent becomes the reference; reuse the old one for drawing
+        if self.front_buf is None:
+            self.front_buf = bytearray(FRAME_SIZE)
+        self.front_buf, self.back_buf = self.back_buf, self.front_buf
+        gc.collect()
+        return True
+
+    def _start_refresh(self):
+        self._busy_since = time.ticks_ms()
+        if not self.async_refresh:
+            self._wait_pending()
+        elif not self._watching:
+            self._watching = True
+            asyncio.create_task(self.wait_idle())
+
+    def _wait_pending(self):
+        # Blocks for whatever is left of a refresh still running on the panel
+        if self._busy_since is None:
+            return
+        start = time.ticks_ms()
+        self.epd.ReadBusy()
+        self._refresh_done(time.ticks_diff(time.ticks_ms(), start))
+
+    def wait_refresh(self):
+        """Blocks until a refresh still running on the panel has finished.
+
+        Call this before anything that cuts power to the panel or resets the
+        board; interrupting the waveform can leave ghosting on the screen.
+        """
+        if self.epd is not None:
+            self._wait_pending()
+
+    def _refresh_done(self, blocked_ms):
+        refresh_ms = time.ticks_diff(time.ticks_ms(), self._busy_since)
+        reclaimed = max(refresh_ms - blocked_ms, 0)
+        self._busy_since = None
+        self.refresh_ms += refresh_ms
+        self.reclaimed_ms += reclaimed
+        print(f"Info: Panel refresh took {refresh_ms} ms, {reclaimed} ms free for other work.")
+
+    async def wait_idle(self):
+        """Waits, yielding to other tasks, until the panel finishes refreshing."""
+        try:
+            while self._busy_since is not None:
+                if not self.epd.is_busy():
+                    self._refresh_done(0)
+                    break
+                await asyncio.sleep_ms(BUSY_POLL_MS)
+        finally:
+            self._watching = False
+
+    def _refresh_full(self):
+        epd = self._driver()
+        self._wait_pending()
+        if self.state == STATE_READY:
+            # Still configured from the last full refresh; rewind the RAM cursor
+            epd.SetCursor(0, 0)
+        else:
+            self._leave_gray(epd)
+            epd.init()
+            self.state = STATE_READY
+        epd.display_Base(self.back_buf, wait=False)
+        self._start_refresh()
+
+    def _refresh_partial(self, regions):
+        epd = self._driver()
+        self._wait_pending()
+        if self.state == STATE_GRAY:
+            # The RAM holds gray planes; load the mono version of the frame on
+            # the panel so the partial waveform starts from what is shown
+            self._leave_gray(epd)
+            epd.init()
+            epd.load_Base(self.front_buf)
+            self.state = STATE_READY
+        if self.state != STATE_PARTIAL:
+            epd.init_Partial()
+            self.state = STATE_PARTIAL
+        epd.display_Partial_Fast(self.back_buf, regions, wait=False)
+        self._start_refresh()
+
+    def _refresh_gray(self, layers):
+        epd = self._driver()
+        self._wait_pending()
+        epd.init_4Gray()
+        self.state = STATE_GRAY
+        # Compose in the driver's GS2 buffer: the mono frame, then the gray images
+        expand_mono_to_gray(self.back_buf, epd.buffer_4Gray)
+        for buf, width, height, x, y in layers:
+            epd.image4Gray.blit((buf, width, height, framebuf.GS2_HMSB), x, y)
+        epd.display_4Gray(epd.buffer_4Gray, wait=False)
+        self._start_refresh()
+
+    def _leave_gray(self, epd):
+        # The gray composition buffers are only needed for gray frames
+        if self.state == STATE_GRAY:
+            epd.release_buffers()
+
+    def sleep(self):
+        """Puts the panel into deep sleep if it is awake."""
+        if self.epd is None or self.state in (STATE_RESET, STATE_SLEEP):
+            return
+        self._wait_pending()
+        self._leave_gray(self.epd)
+        self.epd.deep_sleep()
+        self.state = STATE_SLEEP
+
+display_service = DisplayService()
@@ -1,6 +1,7 @@
 # display_utils.py
 import framebuf
-import gc
+import array
+import os
 
 def get_pixel(buf, x, y, width):
     """Gets the pixel value from a framebuffer."""
@@ -19,113 +20,362 @@ def set_pixel(buf, x, y, width, color):
     else:
         buf[index] |= (1 << bit)
 
-def rotate_buffer_270(src, src_width, src_height):
-    """Rotates a framebuffer 270 degrees clockwise."""
-    dest_width = src_height
-    dest = bytearray(len(src))
-    for i in range(len(dest)):
-        dest[i] = 0xff
-    for y in range(src_height):
-        for x in range(src_width):
-            dx = (src_height - 1) - y
-            dy = x
-            pixel = get_pixel(src, x, y, src_width)
-            set_pixel(dest, dx, dy, dest_width, pixel)
+def _build_transpose_table():
+    """Builds the lookup table used by the 8x8 block transpose.
+
+    Entry ``(k << 8) | v`` spreads bits ``7 - 2k`` and ``6 - 2k`` of byte ``v``
+    to bit 0 of the low and high byte of a 16-bit word, so a whole source row
+    can be merged into two output rows with one shift and one OR. Words stay
+    well inside MicroPython's small-int range, so no heap is touched.
+    """
+    table = array.array('H', bytes(2048))
+    for k in range(4):
+        lo_bit = 7 - 2 * k
+        hi_bit = 6 - 2 * k
+        for v in range(256):
+            table[(k << 8) | v] = ((v >> lo_bit) & 1) | (((v >> hi_bit) & 1) << 8)
+    return table
+
+def _build_reverse_table():
+    """Builds the 256-entry bit-reversal lookup table."""
+    table = bytearray(256)
+    for v in range(256):
+        r = 0
+        for bit in range(8):
+            if v & (1 << bit):
+                r |= 0x80 >> bit
+        table[v] = r
+    return bytes(table)
+
+def _build_gs2_nibble_table():
+    """Maps 4 MONO_HLSB pixels (a nibble, leftmost in bit 3) to one GS2_HMSB byte."""
+    table = bytearray(16)
+    for n in range(16):
+        v = 0
+        for p in range(4):
+            if n & (0x08 >> p):
+                v |= 0x03 << (2 * p)
+        table[n] = v
+    return bytes(table)
+
+_TRANSPOSE = _build_transpose_table()
+_REVERSE = _build_reverse_table()
+_GS2_NIBBLE = _build_gs2_nibble_table()
+
+# 4-gray images are stored pre-rotated for the default landscape canvas
+GRAY_IMAGE_ANGLE = 90
+
+# Image sizes (icons, photos, splash screens) that get reusable load buffers
+IMAGE_SIZE_CLASSES = ((32, 32), (128, 128), (296, 128))
+
+# Dirty-rectangle tracking for partial refreshes
+DIRTY_MAX_REGIONS = 4
+DIRTY_MERGE_GAP = 8
+
+def _check_block_aligned(src_width, src_height):
+    if src_width % 8 or src_height % 8:
+        raise ValueError("Rotation requires dimensions that are multiples of 8")
+
+def _rotate_quarter(src, src_width, src_height, dest, clockwise):
+    """Rotates a MONO_HLSB buffer by 90 or 270 degrees one 8x8 block at a time.
+
+    Each source block (8 rows of one byte column) is transposed with the
+    ``_TRANSPOSE`` table. For 90 degrees source row ``r`` lands on bit
+    ``7 - r`` of the destination byte and the block's rows are written bottom
+    up; for 270 degrees it lands on bit ``r`` and the rows run top down.
+    All-white blocks are skipped because ``dest`` is pre-filled with white.
+    """
+    table = _TRANSPOSE
+    src_bpl = src_width >> 3
+    dest_bpl = src_height >> 3
+    for by in range(dest_bpl):
+        if clockwise:
+            dest_col = by
+        else:
+            dest_col = dest_bpl - 1 - by
+        row0 = by * 8 * src_bpl
+        for bx in range(src_bpl):
+            i = row0 + bx
+            b0 = src[i]
+            b1 = src[i + src_bpl]
+            b2 = src[i + 2 * src_bpl]
+            b3 = src[i + 3 * src_bpl]
+            b4 = src[i + 4 * src_bpl]
+            b5 = src[i + 5 * src_bpl]
+            b6 = src[i + 6 * src_bpl]
+            b7 = src[i + 7 * src_bpl]
+            if b0 & b1 & b2 & b3 & b4 & b5 & b6 & b7 == 0xff:
+                continue
+            for k in range(4):
+                base = k << 8
+                if clockwise:
+                    w = (table[base | b0] << 7 | table[base | b1] << 6 |
+                         table[base | b2] << 5 | table[base | b3] << 4 |
+                         table[base | b4] << 3 | table[base | b5] << 2 |
+                         table[base | b6] << 1 | table[base | b7])
+                    # Source column c maps to destination row (width - 1 - c)
+                    row = src_width - 1 - (bx * 8 + 2 * k)
+                    dest[row * dest_bpl + dest_col] = w & 0xff
+                    dest[(row - 1) * dest_bpl + dest_col] = w >> 8
+                else:
+                    w = (table[base | b0] | table[base | b1] << 1 |
+                         table[base | b2] << 2 | table[base | b3] << 3 |
+                         table[base | b4] << 4 | table[base | b5] << 5 |
+                         table[base | b6] << 6 | table[base | b7] << 7)
+                    row = bx * 8 + 2 * k
+                    dest[row * dest_bpl + dest_col] = w & 0xff
+                    dest[(row + 1) * dest_bpl + dest_col] = w >> 8
     return dest
 
-def rotate_buffer_180(src, src_width, src_height):
+def _new_white_buffer(size):
+    dest = bytearray(size)
+    dest[:] = b'\xff' * size
+    return dest
+
+def rotate_buffer_270(src, src_width, src_height, dest=None):
+    """Rotates a framebuffer 270 degrees clockwise."""
+    _check_block_aligned(src_width, src_height)
+    if dest is None:
+        dest = _new_white_buffer(len(src))
+    return _rotate_quarter(src, src_width, src_height, dest, False)
+
+def rotate_buffer_180(src, src_width, src_height, dest=None):
     """Rotates a framebuffer 180 degrees clockwise."""
-    dest = bytearray(len(src))
-    for i in range(len(dest)):
-        dest[i] = 0xff
-    for y in range(src_height):
-        for x in range(src_width):
-            dx = (src_width - 1) - x
-            dy = (src_height - 1) - y
-            pixel = get_pixel(src, x, y, src_width)
-            set_pixel(dest, dx, dy, src_width, pixel)
+    _check_block_aligned(src_width, src_height)
+    if dest is None:
+        dest = bytearray(len(src))
+    reverse = _REVERSE
+    last = len(src) - 1
+    for i in range(len(src)):
+        dest[last - i] = reverse[src[i]]
     return dest
 
-def rotate_buffer_90_clockwise(src, src_width, src_height):
+def rotate_buffer_90_clockwise(src, src_width, src_height, dest=None):
     """Rotates a framebuffer 90 degrees clockwise."""
-    dest_width = src_height
-    dest = bytearray(len(src))
-    for i in range(len(dest)):
-        dest[i] = 0xff
-    for y in range(src_height):
-        for x in range(src_width):
-            dx = y
-            dy = (src_width - 1) - x
-            pixel = get_pixel(src, x, y, src_width)
-            set_pixel(dest, dx, dy, dest_width, pixel)
-    return dest
+    _check_block_aligned(src_width, src_height)
+    if dest is None:
+        dest = _new_white_buffer(len(src))
+    return _rotate_quarter(src, src_width, src_height, dest, True)
 
-def rotate_buffer(src, src_width, src_height, angle):
-    """Rotates a framebuffer by a specified angle."""
+def rotate_buffer(src, src_width, src_height, angle, dest=None):
+    """Rotates a framebuffer by a specified angle.
+
+    Both dimensions must be multiples of 8. ``dest``, when given, must be
+    filled with white (0xff) for 90 and 270 degrees; all-white source blocks
+    are not copied.
+    """
     if angle == 90:
-        return rotate_buffer_90_clockwise(src, src_width, src_height)
+        return rotate_buffer_90_clockwise(src, src_width, src_height, dest)
     elif angle == 180:
-        return rotate_buffer_180(src, src_width, src_height)
+        return rotate_buffer_180(src, src_width, src_height, dest)
     elif angle == 270:
-        return rotate_buffer_270(src, src_width, src_height)
+        return rotate_buffer_270(src, src_width, src_height, dest)
     else:
         raise ValueError("Unsupported rotation angle")
 
+class RotatedAsset:
+    """A MONO_HLSB bitmap stored already rotated into the panel's native orientation.
+
+    ``width`` and ``height`` are the landscape (drawing) dimensions; ``buf``
+    holds the rotated pixels so blitting it needs no rotation pass.
+    """
+    def __init__(self, buf, width, height, angle):
+        self.buf = buf
+        self.width = width
+        self.height = height
+        self.angle = angle
+
+def prerotate(buf, width, height, angle=90, dest=None):
+    """Rotates a landscape MONO_HLSB bitmap once so it can be blitted as-is."""
+    return RotatedAsset(rotate_buffer(buf, width, height, angle, dest), width, height, angle)
+
+class RotatedCanvas:
+    """A FrameBuffer-compatible canvas that draws in landscape coordinates.
+
+    Drawing calls are mapped straight into a buffer in the panel's native
+    portrait MONO_HLSB layout, so the finished buffer can be sent to the EPD
+    without a rotation pass. ``blit`` accepts a ``(buffer, width, height,
+    format)`` tuple in landscape orientation (rotated on the fly) or a
+    ``RotatedAsset`` prepared with ``prerotate``.
+    """
+    def __init__(self, buf, native_width, native_height, angle=90):
+        if angle in (90, 270):
+            self.width = native_height
+            self.height = native_width
+        elif angle == 180:
+            self.width = native_width
+            self.height = native_height
+        else:
+            raise ValueError("Unsupported rotation angle: {}".format(angle))
+        self.angle = angle
+        self.buf = buf
+        self.fb = framebuf.FrameBuffer(buf, native_width, native_height, framebuf.MONO_HLSB)
+        # 4-gray images queued by blit_gray, as (buf, width, height, x, y) in native coordinates
+        self.gray_layers = []
+
+    def _map_rect(self, x, y, w, h):
+        """Maps a landscape rectangle to native (x, y, w, h)."""
+        if self.angle == 90:
+            return y, self.width - x - w, h, w
+        if self.angle == 270:
+            return self.height - y - h, x, h, w
+        return self.width - x - w, self.height - y - h, w, h
+
+    def fill(self, color):
+        self.fb.fill(color)
+
+    def pixel(self, x, y, color=None):
+        nx, ny, _, _ = self._map_rect(x, y, 1, 1)
+        if color is None:
+            return self.fb.pixel(nx, ny)
+        self.fb.pixel(nx, ny, color)
+
+    def fill_rect(self, x, y, w, h, color):
+        nx, ny, nw, nh = self._map_rect(x, y, w, h)
+        self.fb.fill_rect(nx, ny, nw, nh, color)
+
+    def text(self, s, x, y, color=1):
+        width = len(s) * 8
+        if not width:
+            return
+        # Render on the opposite colour and key it out, like FrameBuffer.text
+        background = 0 if color else 1
+        temp_buf = bytearray(width)
+        temp_fb = framebuf.FrameBuffer(temp_buf, width, 8, framebuf.MONO_HLSB)
+        temp_fb.fill(background)
+        temp_fb.text(s, 0, 0, color)
+        self.blit((temp_buf, width, 8, framebuf.MONO_HLSB), x, y, background)
+
+    def blit(self, src, x, y, key=-1):
+        if isinstance(src, RotatedAsset):
+            if src.angle != self.angle:
+                raise ValueError("Asset rotated for {} degrees, canvas is {}".format(src.angle, self.angle))
+            rotated = src.buf
+            width, height = src.width, src.height
+        elif isinstance(src, tuple):
+            buf, width, height, fmt = src[:4]
+            if fmt != framebuf.MONO_HLSB:
+                raise ValueError("Only MONO_HLSB sources can be rotated")
+            rotated = rotate_buffer(buf, width, height, self.angle)
+        else:
+            raise TypeError("RotatedCanvas.blit needs a buffer tuple or RotatedAsset")
+        nx, ny, nw, nh = self._map_rect(x, y, width, height)
+        self.fb.blit((rotated, nw, nh, framebuf.MONO_HLSB), nx, ny, key)
+
+    def blit_gray(self, buf, width, height, x, y):
+        """Queues a 4-gray image to be composed over the frame.
+
+        ``buf`` is GS2_HMSB data already rotated into the panel's native
+        orientation (see ``tools/image_to_bin.py``); ``width`` and
+        ``height`` are its landscape size. A frame with gray layers is sent
+        with a 4-gray full refresh.
+        """
+        if self.angle != GRAY_IMAGE_ANGLE:
+            raise ValueError("4-gray images are stored for a {} degree canvas".format(GRAY_IMAGE_ANGLE))
+        nx, ny, nw, nh = self._map_rect(x, y, width, height)
+        self.gray_layers.append((buf, nw, nh, nx, ny))
+
 def draw_scaled_text(canvas, text, x, y, scale, color=0):
-    """Draws scaled text on the canvas."""
-    orig_char_width = 8
-    orig_char_height = 8
-    orig_width = len(text) * orig_char_width
-    orig_height = orig_char_height
-
-    temp_buf = bytearray((orig_width * orig_height) // 8)
-    temp_fb = framebuf.FrameBuffer(temp_buf, orig_width, orig_height, framebuf.MONO_HLSB)
-    temp_fb.fill(0xff)
-    temp_fb.text(text, 0, 0, color)
-
-    scaled_width = orig_width * scale
-    scaled_height = orig_height * scale
-    scaled_buf = bytearray((scaled_width * scaled_height) // 8)
-    for i in range(len(scaled_buf)):
-        scaled_buf[i] = 0xff
-
-    for py in range(orig_height):
-        for px in range(orig_width):
-            p = temp_fb.pixel(px, py)
-            if p == 0:
-                for sy in range(scale):
-                    for sx in range(scale):
-                        set_pixel(scaled_buf, px * scale + sx, py * scale + sy, scaled_width, 0)
-    scaled_fb = framebuf.FrameBuffer(scaled_buf, scaled_width, scaled_height, framebuf.MONO_HLSB)
-    canvas.blit(scaled_fb, x, y)
-
-    temp_fb = None
-    temp_buf = None
-    scaled_fb = None
-    scaled_buf = None
-    gc.collect()
+    """Draws scaled text on the canvas by blitting cached pre-scaled glyphs.
+
+    Like ``FrameBuffer.text``, this draws one glyph per UTF-8 byte. The
+    text takes ``len(text)`` cells; bytes of multi-byte characters that
+    do not fit are clipped, as when the text was drawn into a buffer of
+    that width.
+    """
+    from glyph_cache import glyph_cache, glyph_code
+    size = 8 * scale
+    if color:
+        # White text on the white glyph background leaves only blank cells
+        canvas.fill_rect(x, y, len(text) * size, size, 1)
+        return
+    angle = canvas.angle if isinstance(canvas, RotatedCanvas) else 0
+    data = text.encode()
+    for i in range(len(text)):
+        canvas.blit(glyph_cache.get(glyph_code(data[i]), scale, angle), x, y)
+        x += size
+
+class ImageBufferPool:
+    """Reusable buffers for 1-bit images loaded from flash, one set per size.
+
+    Each set is a buffer the file is read into plus a rotation buffer that
+    is wrapped in a FrameBuffer once, so it can be reset to white in C.
+    After the first image of a size, loading another allocates nothing.
+    """
+    def __init__(self, sizes=IMAGE_SIZE_CLASSES):
+        self.sizes = sizes
+        self._sets = {}
+
+    def get(self, width, height):
+        """Returns (read_buf, rotate_buf, rotate_fb) for a pooled size, or None."""
+        key = (width, height)
+        entry = self._sets.get(key)
+        if entry is None and key in self.sizes:
+            size = width * height // 8
+            rotated = bytearray(size)
+            entry = (bytearray(size), rotated, framebuf.FrameBuffer(rotated, width, height, framebuf.MONO_HLSB))
+            self._sets[key] = entry
+        return entry
+
+    def release(self, width, height):
+        """Frees the buffers of one size, e.g. after a one-off splash screen."""
+        self._sets.pop((width, height), None)
+
+image_pool = ImageBufferPool()
 
 def draw_image(canvas, image_path, src_width, src_height, x, y):
-    """Draws an image from a binary file onto the canvas."""
-    img_data = None
-    img_fb = None
+    """Draws an image from a binary file onto the canvas.
+
+    1-bit files are read straight into a pooled buffer and blitted without
+    intermediate copies. Files twice that size are 4-gray images and are
+    queued on the canvas for a 4-gray refresh.
+    """
+    expected_length = (src_width * src_height) // 8
     try:
-        with open(image_path, "rb") as f:
-            img_data = f.read()
-        expected_length = (src_width * src_height) // 8
-        if len(img_data) != expected_length:
-            print(f"Error: Image data length mismatch for {image_path}. Expected {expected_length}, got {len(img_data)}.")
+        length = os.stat(image_path)[6]
+        if length == expected_length * 2 and hasattr(canvas, "blit_gray"):
+            # Kept by the canvas until the refresh, so it cannot be pooled
+            data = bytearray(length)
+            with open(image_path, "rb") as f:
+                f.readinto(data)
+            canvas.blit_gray(data, src_width, src_height, x, y)
             return
-        img_fb = framebuf.FrameBuffer(bytearray(img_data), src_width, src_height, framebuf.MONO_HLSB)
-        canvas.blit(img_fb, x, y)
+        if length != expected_length:
+            print(f"Error: Image data length mismatch for {image_path}. Expected {expected_length}, got {length}.")
+            return
+
+        scratch = image_pool.get(src_width, src_height)
+        if scratch is None:
+            data = bytearray(expected_length)
+        else:
+            data = scratch[0]
+        with open(image_path, "rb") as f:
+            f.readinto(data)
+
+        if isinstance(canvas, RotatedCanvas):
+            dest = None
+            if scratch is not None:
+                scratch[2].fill(1)
+                dest = scratch[1]
+            canvas.blit(prerotate(data, src_width, src_height, canvas.angle, dest), x, y)
+        else:
+            canvas.blit((data, src_width, src_height, framebuf.MONO_HLSB), x, y)
     except OSError as e:
         print(f"Error: Could not read image file {image_path}. Details: {e}")
     except Exception as e:
         print(f"Error: An unexpected error occurred while processing {image_path}. Details: {e}")
-    finally:
-        img_data = None
-        img_fb = None
-        gc.collect()
+
+def expand_mono_to_gray(src, dest):
+    """Expands a MONO_HLSB frame into a GS2_HMSB buffer of the same size.
+
+    White pixels become level 3 and black pixels level 0, so ``dest`` must
+    be twice as long as ``src``.
+    """
+    table = _GS2_NIBBLE
+    for i in range(len(src)):
+        v = src[i]
+        dest[2 * i] = table[v >> 4]
+        dest[2 * i + 1] = table[v & 0x0F]
 
 def clear_region(canvas, x1, y1, x2, y2):
     """Clears a rectangular region on the canvas."""
@@ -133,31 +383,68 @@ def clear_region(canvas, x1, y1, x2, y2):
     height = y2 - y1
     canvas.fill_rect(x1, y1, width, height, 1)
 
-def display_rotated_screen(draw_callback, angle=90, partial_update=False):
-    """Displays content on the e-paper screen with rotation."""
-    from epaper import EPD_2in9
-    if angle in [90, 270]:
-        canvas_width = 296
-        canvas_height = 128
-    elif angle == 180:
-        canvas_width = 128
-        canvas_height = 296
-    else:
-        raise ValueError("Unsupported rotation angle: {}".format(angle))
-    canvas_buf = bytearray(canvas_width * canvas_height // 8)
-    canvas = framebuf.FrameBuffer(canvas_buf, canvas_width, canvas_height, framebuf.MONO_HLSB)
-    for i in range(len(canvas_buf)):
-        canvas_buf[i] = 0xff
-    draw_callback(canvas)
-    native_buf = rotate_buffer(canvas_buf, canvas_width, canvas_height, angle)
-    epd = EPD_2in9()
-    epd.init()
-    if partial_update:
-        epd.display_Partial(native_buf)
-    else:
-        epd.display_Base(native_buf)
-    canvas_buf = None
-    native_buf = None
-    canvas = None
-    epd = None
-    gc.collect()
\ No newline at end of file
+def find_dirty_regions(previous, current, stride, max_regions=DIRTY_MAX_REGIONS, merge_gap=DIRTY_MERGE_GAP):
+    """Finds the byte-aligned boxes where two MONO_HLSB frames differ.
+
+    Args:
+        previous: The frame currently in the panel's RAM.
+        current: The new frame.
+        stride: Bytes per row.
+        max_regions: Upper bound on the number of boxes returned.
+        merge_gap: Bands of changed rows this close together are merged.
+
+    Returns:
+        list: (x_start, y_start, x_end, y_end) pixel boxes with inclusive
+        ends and x on byte boundaries; empty if the frames are identical.
+    """
+    if previous == current:
+        return []
+    bands = []
+    band = None
+    rows = len(current) // stride
+    for y in range(rows):
+        row = y * stride
+        if current[row:row + stride] == previous[row:row + stride]:
+            continue
+        first = 0
+        while current[row + first] == previous[row + first]:
+            first += 1
+        last = stride - 1
+        while current[row + last] == previous[row + last]:
+            last -= 1
+        if band is not None and y - band[3] <= merge_gap + 1:
+            band[0] = min(band[0], first)
+            band[2] = max(band[2], last)
+            band[3] = y
+        else:
+            band = [first, y, last, y]
+            bands.append(band)
+
+    # Merge the closest neighbouring bands until few enough remain
+    while len(bands) > max_regions:
+        best = 0
+        for i in range(1, len(bands) - 1):
+            if bands[i + 1][1] - bands[i][3] < bands[best + 1][1] - bands[best][3]:
+                best = i
+        a = bands[best]
+        b = bands.pop(best + 1)
+        a[0] = min(a[0], b[0])
+        a[2] = max(a[2], b[2])
+        a[3] = b[3]
+
+    return [(b[0] * 8, b[1], b[2] * 8 + 7, b[3]) for b in bands]
+
+def display_rotated_screen(draw_callback, angle=90, partial_update=False, key=None):
+    """Displays content on the e-paper screen with rotation.
+
+    ``draw_callback`` receives a ``RotatedCanvas`` that draws in landscape
+    coordinates directly into the panel's native buffer. Partial updates
+    only rewrite the parts of the panel RAM that differ from the last frame
+    sent. A frame is skipped when its ``key`` (a tuple of the page's inputs)
+    or its pixels match the frame on the panel.
+
+    Returns:
+        bool: False if an unchanged frame was skipped.
+    """
+    from display_service import display_service
+    return display_service.show(draw_callback, angle, partial_update, key)
@@ -35,7 +35,7 @@ import utime
 EPD_WIDTH       = 128
 EPD_HEIGHT      = 296
   
-WF_PARTIAL_2IN9 = [
+WF_PARTIAL_2IN9 = bytes([
     0x0,0x40,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,
     0x80,0x80,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,
     0x40,0x40,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,
@@ -55,9 +55,9 @@ WF_PARTIAL_2IN9 = [
     0x0,0x0,0x0,0x0,0x0,0x0,0x0,
     0x22,0x22,0x22,0x22,0x22,0x22,0x0,0x0,0x0,
     0x22,0x17,0x41,0xB0,0x32,0x36,
-]
+])
 
-WF_PARTIAL_2IN9_Wait = [
+WF_PARTIAL_2IN9_Wait = bytes([
 0x0,0x40,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,
 0x80,0x80,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,
 0x40,0x40,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,0x0,
@@ -77,9 +77,9 @@ WF_PARTIAL_2IN9_Wait = [
 0x0,0x0,0x0,0x0,0x0,0x0,0x0,
 0x22,0x22,0x22,0x22,0x22,0x22,0x0,0x0,0x0,
 0x22,0x17,0x41,0xB0,0x32,0x36,
-]
+])
 
-WS_20_30 = [					
+WS_20_30 = bytes([					
 0x80,0x66,0x0,0x0,0x0,0x0,0x0,0x0,0x40,0x0,0x0,0x0,
 0x10,0x66,0x0,0x0,0x0,0x0,0x0,0x0,0x20,0x0,0x0,0x0,
 0x80,0x66,0x0,0x0,0x0,0x0,0x0,0x0,0x40,0x0,0x0,0x0,
@@ -99,9 +99,9 @@ WS_20_30 = [
 0x0,0x0,0x0,0x0,0x0,0x0,0x0,
 0x44,0x44,0x44,0x44,0x44,0x44,0x0,0x0,0x0,
 0x22,0x17,0x41,0x0,0x32,0x36
-]
+])
 
-Gray4 = [						
+Gray4 = bytes([						
 0x00,0x60,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,
 0x20,0x60,0x10,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,
 0x28,0x60,0x14,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,0x00,
@@ -121,7 +121,26 @@ Gray4 = [
 0x00,0x00,0x00,0x00,0x00,0x00,0x00,
 0x24,0x22,0x22,0x22,0x23,0x32,0x00,0x00,0x00,
 0x22,0x17,0x41,0xAE,0x32,0x28		
-]	
+])	
+
+def _build_gray4_planes():
+    """Maps each GS2_HMSB byte to its RAM plane bits.
+
+    The high nibble holds the 0x24 plane bits and the low nibble the 0x26
+    plane bits, leftmost pixel first: white (3) is 0/0, gray1 (2) 0/1,
+    gray2 (1) 1/0 and black (0) 1/1.
+    """
+    table = bytearray(256)
+    for v in range(256):
+        hi = lo = 0
+        for p in range(4):
+            level = (v >> (2 * p)) & 0x03
+            hi = (hi << 1) | (0 if level & 0x02 else 1)
+            lo = (lo << 1) | (0 if level & 0x01 else 1)
+        table[v] = (hi << 4) | lo
+    return bytes(table)
+
+_GRAY4_PLANES = _build_gray4_planes()
 
 # e-Paper
 RST_PIN         = 12
@@ -154,6 +173,8 @@ class config():
         self.spi = SPI(1)
         self.spi.init(baudrate=4000_000)
         self.dc_pin = Pin(DC_PIN, Pin.OUT)
+        # Running total of bytes written to the EPD over SPI
+        self.bytes_sent = 0
 
         self.address = i2c_addr
         self.i2c = I2C(1, scl=Pin(7), sda=Pin(6), freq=100_000)
@@ -169,6 +190,11 @@ class config():
 
     def spi_writebyte(self, data):
         self.spi.write(bytearray(data))
+        self.bytes_sent += len(data)
+
+    def spi_write(self, buf):
+        self.spi.write(buf)
+        self.bytes_sent += len(buf)
 
     def i2c_writebyte(self, reg, value):
         wbuf = [(reg>>8)&0xff, reg&0xff, value]
@@ -204,11 +230,46 @@ class EPD_2in9:
         self.lut = WF_PARTIAL_2IN9
         self.lut_l = WF_PARTIAL_2IN9_Wait
 
-        self.buffer_4Gray = bytearray(self.height * self.width // 4)
-        self.image4Gray = framebuf.FrameBuffer(self.buffer_4Gray, self.width, self.height, framebuf.GS2_HMSB)
-        self.buffer = bytearray(self.height * self.width // 8)
-        self.image1Gray_Portrait = framebuf.FrameBuffer(self.buffer, self.width, self.height, framebuf.MONO_HLSB)
-        
+        # Drawing buffers are allocated on first access only. The app passes
+        # its own frames, so the 4-gray pair (9.5 KB) is paid for only by
+        # callers that opt in to gray mode.
+        self._buffer_4Gray = None
+        self._image4Gray = None
+        self._buffer = None
+        self._image1Gray_Portrait = None
+        self._gray_plane_buf = None
+
+    @property
+    def buffer_4Gray(self):
+        if self._buffer_4Gray is None:
+            self._buffer_4Gray = bytearray(self.height * self.width // 4)
+        return self._buffer_4Gray
+
+    @property
+    def image4Gray(self):
+        if self._image4Gray is None:
+            self._image4Gray = framebuf.FrameBuffer(self.buffer_4Gray, self.width, self.height, framebuf.GS2_HMSB)
+        return self._image4Gray
+
+    @property
+    def buffer(self):
+        if self._buffer is None:
+            self._buffer = bytearray(self.height * self.width // 8)
+        return self._buffer
+
+    @property
+    def image1Gray_Portrait(self):
+        if self._image1Gray_Portrait is None:
+            self._image1Gray_Portrait = framebuf.FrameBuffer(self.buffer, self.width, self.height, framebuf.MONO_HLSB)
+        return self._image1Gray_Portrait
+
+    def release_buffers(self):
+        # Drops the built-in drawing buffers so their heap can be reclaimed
+        self._buffer_4Gray = None
+        self._image4Gray = None
+        self._buffer = None
+        self._image1Gray_Portrait = None
+        self._gray_plane_buf = None
 
     # Hardware reset
     def reset(self):
@@ -230,6 +291,28 @@ class EPD_2in9:
         self.config.digital_write(self.config.cs_pin, 0)
         self.config.spi_writebyte([data])
         self.config.digital_write(self.config.cs_pin, 1)
+
+    def send_data_buffer(self, buf):
+        # Streams a whole buffer (bytes, bytearray or memoryview) in one transfer
+        self.config.digital_write(self.config.dc_pin, 1)
+        self.config.digital_write(self.config.cs_pin, 0)
+        self.config.spi_write(buf)
+        self.config.digital_write(self.config.cs_pin, 1)
+
+    def send_data_fill(self, value, count):
+        # Streams count copies of value without allocating a full frame
+        row = bytes([value]) * (self.width // 8)
+        self.config.digital_write(self.config.dc_pin, 1)
+        self.config.digital_write(self.config.cs_pin, 0)
+        while count >= len(row):
+            self.config.spi_write(row)
+            count -= len(row)
+        if count:
+            self.config.spi_write(row[:count])
+        self.config.digital_write(self.config.cs_pin, 1)
+
+    def _frame(self, image):
+        return memoryview(image)[:self.height * (self.width // 8)]
         
     def ReadBusy(self):
         # print("e-Paper busy")
@@ -237,23 +320,32 @@ class EPD_2in9:
             self.config.delay_ms(10) 
         # print("e-Paper busy release")  
 
-    def TurnOnDisplay(self):
+    def is_busy(self):
+        return self.config.digital_read(self.config.busy_pin) == 1
+
+    # With wait=False the TurnOnDisplay* and display* calls return as soon as
+    # the update is started; the caller must wait for BUSY to drop (ReadBusy
+    # or is_busy) before sending the panel anything else.
+    def TurnOnDisplay(self, wait=True):
         self.send_command(0x22) # DISPLAY_UPDATE_CONTROL_2
         self.send_data(0xF7)
         self.send_command(0x20) # MASTER_ACTIVATION
-        self.ReadBusy()
+        if wait:
+            self.ReadBusy()
 
-    def TurnOnDisplay_Partial(self):
+    def TurnOnDisplay_Partial(self, wait=True):
         self.send_command(0x22) # DISPLAY_UPDATE_CONTROL_2
         self.send_data(0x0F)
         self.send_command(0x20) # MASTER_ACTIVATION
-        self.ReadBusy()
+        if wait:
+            self.ReadBusy()
 
-    def TurnOnDisplay_4Gray(self):
+    def TurnOnDisplay_4Gray(self, wait=True):
         self.send_command(0x22) # DISPLAY_UPDATE_CONTROL_2
         self.send_data(0xC7)
         self.send_command(0x20) # MASTER_ACTIVATION
-        self.ReadBusy()
+        if wait:
+            self.ReadBusy()
 
     def delay_ms(self, delaytime):
         utime.sleep(delaytime / 1000.0)
@@ -265,8 +357,7 @@ class EPD_2in9:
         else:
             lut = self.lut_l
 
-        for i in range(0, 153):
-            self.send_data(lut[i])
+        self.send_data_buffer(lut[0:153])
         self.ReadBusy()
 
     def SetWindow(self, x_start, y_start, x_end, y_end):
@@ -292,17 +383,14 @@ class EPD_2in9:
 
     def SetLut(self, lut):
         self.send_command(0x32)
-        for i in range(0, 153):
-            self.send_data(lut[i])
+        self.send_data_buffer(lut[0:153])
         self.ReadBusy()
         self.send_command(0x3f)
         self.send_data(lut[153])
         self.send_command(0x03);	# gate voltage
         self.send_data(lut[154])
         self.send_command(0x04);	# source voltage
-        self.send_data(lut[155])	# VSH
-        self.send_data(lut[156])	# VSH2
-        self.send_data(lut[157])	# VSL
+        self.send_data_buffer(lut[155:158])	# VSH, VSH2, VSL
         self.send_command(0x2c);		# VCOM
         self.send_data(lut[158])
 
@@ -364,132 +452,116 @@ class EPD_2in9:
         if (image == None):
             return            
         self.send_command(0x24) # WRITE_RAM
-        for i in range(0, self.height * int(self.width/8)):
-            # for i in range(0, int(self.width / 8)):
-            self.send_data(image[i])   
+        self.send_data_buffer(self._frame(image))
         self.TurnOnDisplay()
 
-    def display_Base(self, image):
+    def display_Base(self, image, wait=True):
         if (image == None):
             return   
+        frame = self._frame(image)
         self.send_command(0x24) # WRITE_RAM
-        for i in range(0, self.height * int(self.width/8)):
-            self.send_data(image[i])
+        self.send_data_buffer(frame)
         self.send_command(0x26) # WRITE_RAM
-        for i in range(0, self.height * int(self.width/8)):
-            self.send_data(image[i])
-        self.TurnOnDisplay()
+        self.send_data_buffer(frame)
+        self.TurnOnDisplay(wait)
         
-    def display_Partial(self, image):
+    def load_Base(self, image):
+        # Writes a frame into both RAM planes without refreshing, so partial
+        # updates can start from what is already on the panel
+        frame = self._frame(image)
+        self.send_command(0x24) # WRITE_RAM
+        self.send_data_buffer(frame)
+        self.send_command(0x26) # WRITE_RAM
+        self.send_data_buffer(frame)
+
+    def display_Partial(self, image, regions=None):
+        # regions: optional list of (x_start, y_start, x_end, y_end) boxes with
+        # x on byte boundaries; only those parts of the RAM image are rewritten
         if (image == None):
             return
-            
+        self.init_Partial()
+        self.display_Partial_Fast(image, regions)
+
+    def init_Partial(self):
+        # Hardware reset and partial waveform upload; registers then persist
+        # until the next reset, so consecutive partial updates can skip this
         self.config.digital_write(self.config.reset_pin, 0)
         self.config.delay_ms(0.2)
         self.config.digital_write(self.config.reset_pin, 1) 
         
         self.SendLut(1)
         self.send_command(0x37)
-        self.send_data(0x00)
-        self.send_data(0x00)  
-        self.send_data(0x00)  
-        self.send_data(0x00) 
-        self.send_data(0x00)  	
-        self.send_data(0x40)  
-        self.send_data(0x00)  
-        self.send_data(0x00)   
-        self.send_data(0x00)  
-        self.send_data(0x00)
+        self.send_data_buffer(b'\x00\x00\x00\x00\x00\x40\x00\x00\x00\x00')
 
         self.send_command(0x3C) #BorderWavefrom
         self.send_data(0x80)
 
+    def display_Partial_Fast(self, image, regions=None, wait=True):
+        # Partial update with the partial LUT already loaded by init_Partial
+        if (image == None):
+            return
         self.send_command(0x22) 
         self.send_data(0xC0)   
         self.send_command(0x20) 
         self.ReadBusy()
 
-        self.SetWindow(0, 0, self.width - 1, self.height - 1)
-        self.SetCursor(0, 0)
-        
+        if regions is None:
+            self.SetWindow(0, 0, self.width - 1, self.height - 1)
+            self.SetCursor(0, 0)
+
+            self.send_command(0x24) # WRITE_RAM
+            self.send_data_buffer(self._frame(image))
+        else:
+            for region in regions:
+                self.write_ram_window(image, *region)
+        self.TurnOnDisplay_Partial(wait)
+
+    def write_ram_window(self, image, x_start, y_start, x_end, y_end):
+        # Writes one byte-aligned box of a full frame into RAM (0x24)
+        stride = self.width // 8
+        first = x_start >> 3
+        last = x_end >> 3
+        frame = memoryview(image)
+        self.SetWindow(x_start, y_start, x_end, y_end)
+        self.SetCursor(x_start, y_start)
         self.send_command(0x24) # WRITE_RAM
-        for i in range(0, self.height * int(self.width/8)):
-            self.send_data(image[i])
-        self.TurnOnDisplay_Partial()
+        self.config.digital_write(self.config.dc_pin, 1)
+        self.config.digital_write(self.config.cs_pin, 0)
+        if first == 0 and last == stride - 1:
+            self.config.spi_write(frame[y_start * stride:(y_end + 1) * stride])
+        else:
+            for y in range(y_start, y_end + 1):
+                row = y * stride
+                self.config.spi_write(frame[row + first:row + last + 1])
+        self.config.digital_write(self.config.cs_pin, 1)
+
 
+    def _gray_plane(self):
+        if self._gray_plane_buf is None:
+            self._gray_plane_buf = bytearray(self.height * self.width // 8)
+        return self._gray_plane_buf
 
-    def display_4Gray(self, image):
+    def display_4Gray(self, image, wait=True):
+        # Each GS2 byte holds 4 pixels; two of them make one byte per RAM plane
+        lut = _GRAY4_PLANES
+        plane = self._gray_plane()
+        size = len(plane)
+
+        for i in range(size):
+            plane[i] = (lut[image[2 * i]] & 0xF0) | (lut[image[2 * i + 1]] >> 4)
         self.send_command(0x24)
-        for i in range(0, 4736):
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0x03 
-                    if(temp2 == 0x03):
-                        temp3 |= 0x00   # white
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01   # black
-                    elif(temp2 == 0x02):
-                        temp3 |= 0x00   # gray1
-                    else:   # 0x01
-                        temp3 |= 0x01   # gray2
-                    temp3 <<= 1
-
-                    temp1 >>= 2
-                    temp2 = temp1&0x03 
-                    if(temp2 == 0x03):   # white
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):   # black
-                        temp3 |= 0x01
-                    elif(temp2 == 0x02):
-                        temp3 |= 0x00   # gray1
-                    else:   # 0x01
-                        temp3 |= 0x01   # gray2
-                    
-                    if (( j!=1 ) | ( k!=1 )):
-                        temp3 <<= 1
-                    temp1 >>= 2
-            self.send_data(temp3)
-            
-        self.send_command(0x26)	       
-        for i in range(0, 4736):
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0x03 
-                    if(temp2 == 0x03):
-                        temp3 |= 0x00   # white
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01   # black
-                    elif(temp2 == 0x02):
-                        temp3 |= 0x01   # gray1
-                    else:   # 0x01
-                        temp3 |= 0x00   # gray2
-                    temp3 <<= 1
-
-                    temp1 >>= 2
-                    temp2 = temp1&0x03
-                    if(temp2 == 0x03):   # white
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):   # black
-                        temp3 |= 0x01
-                    elif(temp2 == 0x02):
-                        temp3 |= 0x01   # gray1
-                    else:   # 0x01
-                        temp3 |= 0x00   # gray2  
-                    if(j!=1 or k!=1):                    
-                        temp3 <<= 1
-                    temp1 >>= 2
-            self.send_data(temp3)
-
-        self.TurnOnDisplay_4Gray()
+        self.send_data_buffer(plane)
+
+        for i in range(size):
+            plane[i] = ((lut[image[2 * i]] & 0x0F) << 4) | (lut[image[2 * i + 1]] & 0x0F)
+        self.send_command(0x26)
+        self.send_data_buffer(plane)
+
+        self.TurnOnDisplay_4Gray(wait)
 
     def Clear(self, color):
         self.send_command(0x24) # WRITE_RAM
-        for i in range(0, self.height * int(self.width/8)):
-            self.send_data(color)
+        self.send_data_fill(color, self.height * (self.width // 8))
         self.TurnOnDisplay()
 
     def sleep(self):
@@ -497,7 +569,13 @@ class EPD_2in9:
         self.send_data(0x01)
         
         self.config.delay_ms(2000)
-        self.module_exit()
+        self.config.module_exit()
+
+    def deep_sleep(self):
+        # Enters deep sleep (RAM retained) without touching the shared reset
+        # pins; a hardware reset via init() or init_Partial() wakes it up
+        self.send_command(0x10) # DEEP_SLEEP_MODE
+        self.send_data(0x01)
 
 
 class ICNT_Development():
@@ -576,13 +654,14 @@ class ICNT86():
                 return(296 - ICNT_Dev.Y[0], ICNT_Dev.X[0])
         return
     
-def get_touch_coordinates(tp, icnt_dev, icnt_old):
+def get_touch_coordinates(tp, icnt_dev, icnt_old, pending=False):
     """
     檢查觸控中斷並執行觸控掃描，回傳第一個觸碰點的 (x, y) 座標
     若未偵測到觸碰則回傳 None
+    pending 為 True 表示中斷已由 Pin.irq 捕捉，即使腳位已回到高電位也執行掃描
     """
     # 檢查中斷腳位：低電位表示有觸控
-    if tp.config.digital_read(tp.config.int_pin) == 0:
+    if pending or tp.config.digital_read(tp.config.int_pin) == 0:
         icnt_dev.Touch = 1
     else:
         icnt_dev.Touch = 0
@@ -598,14 +677,14 @@ def get_touch_coordinates(tp, icnt_dev, icnt_old):
         return None
 
 prev_touch = None
-def get_touch_state(tp, icnt_dev, icnt_old):
+def get_touch_state(tp, icnt_dev, icnt_old, pending=False):
     """
     偵測觸控向量，回傳 (delta_x, delta_y)。
     每次呼叫會比較前一次觸控點與目前的觸控點，若未偵測到觸碰則回傳 None。
     首次偵測時回傳 (0, 0)。
     """
     global prev_touch
-    new_touch = (get_touch_coordinates(tp, icnt_dev, icnt_old), utime.ticks_ms())
+    new_touch = (get_touch_coordinates(tp, icnt_dev, icnt_old, pending), utime.ticks_ms())
     
     if new_touch[0] is None :
         return None
@@ -0,0 +1,54 @@
+# event_queue.py
+import array
+
+EVENT_QUEUE_SIZE = 16
+
+# Event kinds
+EVENT_TOUCH = 1      # Touch controller raised its INT line
+EVENT_KEY_DOWN = 2   # arg: button index
+EVENT_KEY_UP = 3     # arg: button index
+
+class EventQueue:
+    """Fixed-size ring buffer of input events filled from interrupt handlers.
+
+    ``push`` only writes into preallocated arrays, so it is safe to call
+    from an ISR. When the queue is full the new event is dropped and
+    counted in ``dropped``. If ``flag`` is set to an
+    ``asyncio.ThreadSafeFlag``, every push signals it.
+    """
+    def __init__(self, size=EVENT_QUEUE_SIZE):
+        self.size = size
+        self._kinds = bytearray(size)
+        self._args = bytearray(size)
+        self._times = array.array('i', [0] * size)
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+        self.flag = None
+
+    def push(self, kind, arg, ticks):
+        head = self._head
+        nxt = head + 1
+        if nxt == self.size:
+            nxt = 0
+        if nxt == self._tail:
+            self.dropped += 1
+            return
+        self._kinds[head] = kind
+        self._args[head] = arg
+        self._times[head] = ticks
+        self._head = nxt
+        if self.flag is not None:
+            self.flag.set()
+
+    def pop(self):
+        """Returns the oldest event as (kind, arg, ticks_ms), or None if empty."""
+        tail = self._tail
+        if tail == self._head:
+            return None
+        event = (self._kinds[tail], self._args[tail], self._times[tail])
+        self._tail = (tail + 1) % self.size
+        return event
+
+    def __len__(self):
+        return (self._head - self._tail) % self.size
@@ -0,0 +1,137 @@
+# forecast_aggregator.py
+import time
+from array import array
+
+SECONDS_PER_DAY = 86400
+
+# OpenWeather "weather[0].main" groups; anything else is counted as "Unknown"
+CONDITIONS = (
+    "Clear", "Clouds", "Rain", "Drizzle", "Thunderstorm", "Snow",
+    "Mist", "Smoke", "Haze", "Dust", "Fog", "Sand", "Ash", "Squall", "Tornado",
+    "Unknown",
+)
+CONDITION_UNKNOWN = len(CONDITIONS) - 1
+_CONDITION_INDEX = {name: i for i, name in enumerate(CONDITIONS)}
+
+def condition_index(name):
+    """Maps an OpenWeather condition name to its index in ``CONDITIONS``."""
+    return _CONDITION_INDEX.get(name, CONDITION_UNKNOWN)
+
+def read_entry(entry):
+    """Extracts (dt, temp, condition index, pop) from a decoded API entry.
+
+    Forecast list entries and the current-weather response share this
+    shape; ``pop`` only appears in forecasts.
+    """
+    return entry.get("dt", 0), entry["main"]["temp"], condition_index(entry["weather"][0]["main"]), entry.get("pop", 0)
+
+class ForecastAggregator:
+    """Folds forecast entries into per-day (date, avg temp, weather, rain %) tuples.
+
+    All accumulators are preallocated for ``days_limit + 1`` days and reused
+    across ``reset`` calls. Days are keyed by integer day number computed
+    from ``dt``; the "MM-DD" label is formatted once per day in ``result``.
+    The day's weather is the most frequent condition in an array-backed
+    histogram, ties going to the condition seen first that day.
+
+    Also keeps the (temp, condition) of the entry closest to now in
+    ``current``, which can stand in for the current conditions.
+    """
+    def __init__(self, days_limit=4):
+        self.days_limit = days_limit
+        slots = days_limit + 1
+        self._day_keys = array('i', [0] * slots)
+        self._temp_sums = array('d', [0] * slots)
+        self._rain_sums = array('d', [0] * slots)
+        self._counts = array('H', [0] * slots)
+        self._histogram = bytearray(slots * len(CONDITIONS))
+        # Per day and condition: 1 + position of its first entry that day, 0 if unseen
+        self._first_seen = bytearray(slots * len(CONDITIONS))
+        self.reset()
+
+    def reset(self, timezone_offset=8, now=None):
+        """Clears all days so the aggregator can be filled again."""
+        self.offset = timezone_offset * 3600
+        self._now = time.time() if now is None else now
+        self._day = 0
+        self._counts[0] = 0
+        self.current = None
+        self._current_gap = None
+
+    def add(self, dt, temp, condition, pop=0):
+        """Accumulates one forecast entry.
+
+        Args:
+            dt: Entry time, UTC epoch seconds.
+            temp: Temperature.
+            condition: Index into ``CONDITIONS``.
+            pop: Probability of precipitation, 0 to 1.
+
+        Returns:
+            bool: False once ``days_limit`` days are complete and further
+            entries would be ignored.
+        """
+        day = self._day
+        if day >= self.days_limit:
+            return False
+        key = (dt + self.offset) // SECONDS_PER_DAY
+        count = self._counts[day]
+        if count and key != self._day_keys[day]:
+            # Previous day complete; start the next slot
+            day += 1
+            self._day = day
+            count = 0
+        if not count:
+            self._day_keys[day] = key
+            self._temp_sums[day] = 0
+            self._rain_sums[day] = 0
+            base = day * len(CONDITIONS)
+            for i in range(base, base + len(CONDITIONS)):
+                self._histogram[i] = 0
+                self._first_seen[i] = 0
+
+        slot = day * len(CONDITIONS) + condition
+        if not self._first_seen[slot]:
+            self._first_seen[slot] = count + 1
+        self._histogram[slot] += 1
+        self._temp_sums[day] += temp
+        self._rain_sums[day] += pop
+        self._counts[day] = count + 1
+
+        gap = abs(dt - self._now)
+        if self._current_gap is None or gap < self._current_gap:
+            self._current_gap = gap
+            self.current = (temp, CONDITIONS[condition])
+        return day < self.days_limit
+
+    def add_entry(self, entry):
+        """Accumulates one decoded forecast list entry; see ``add``."""
+        dt, temp, condition, pop = read_entry(entry)
+        return self.add(dt, temp, condition, pop)
+
+    def _weather(self, day):
+        base = day * len(CONDITIONS)
+        best = CONDITION_UNKNOWN
+        best_count = best_first = 0
+        for i in range(len(CONDITIONS)):
+            count = self._histogram[base + i]
+            if count > best_count or (count == best_count and count and self._first_seen[base + i] < best_first):
+                best = i
+                best_count = count
+                best_first = self._first_seen[base + i]
+        return CONDITIONS[best]
+
+    def result(self):
+        """Returns the aggregated days as (date "MM-DD", avg temp, weather, rain %) tuples."""
+        days = self._day + 1 if self._counts[self._day] else self._day
+        result = []
+        for day in range(days):
+            count = self._counts[day]
+            local_time = time.localtime(self._day_keys[day] * SECONDS_PER_DAY)
+            result.append((
+                "{:02d}-{:02d}".format(local_time[1], local_time[2]),
+                self._temp_sums[day] / count,
+                self._weather(day),
+                (self._rain_sums[day] / count) * 100,
+            ))
+        return result
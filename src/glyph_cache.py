@@ -0,0 +1,162 @@
+# glyph_cache.py
+import framebuf
+import gc
+import struct
+from collections import OrderedDict
+from display_utils import prerotate
+
+FONT_FILE = "/font/glyphs.fnt"
+FONT_MAGIC = b"PCGF"
+FONT_VERSION = 1
+GLYPH_CACHE_BUDGET = 4096
+
+# Header: magic, version, glyph count. Index entry: byte code, scale, data offset.
+_HEADER_FORMAT = "<4sBH"
+_ENTRY_FORMAT = "<HBI"
+
+def glyph_size(scale):
+    """Returns the byte size of one MONO_HLSB glyph at the given scale."""
+    return 8 * scale * scale
+
+def glyph_code(byte):
+    """Maps a text byte to the font glyph ``FrameBuffer.text`` draws for it.
+
+    The built-in font covers bytes 32 to 127; ``text`` draws every other
+    byte, including each byte of a UTF-8 sequence, as glyph 127.
+    """
+    if byte < 32 or byte > 127:
+        return 127
+    return byte
+
+def render_glyph(code, scale):
+    """Renders one 8x8 font glyph scaled up as a MONO_HLSB bitmap.
+
+    ``code`` is a byte value as returned by ``glyph_code``. The glyph is
+    black (0) on white (1) and ``8 * scale`` pixels square. Each font row
+    is expanded in one go instead of pixel by pixel.
+    """
+    row_buf = bytearray(8)
+    row_fb = framebuf.FrameBuffer(row_buf, 8, 8, framebuf.MONO_HLSB)
+    row_fb.fill(1)
+    row_fb.text(chr(code), 0, 0, 0)
+
+    out = bytearray(glyph_size(scale))
+    run = (1 << scale) - 1
+    pos = 0
+    for row in row_buf:
+        ink = ~row & 0xff
+        wide = 0
+        for bit in range(8):
+            wide <<= scale
+            if ink & (0x80 >> bit):
+                wide |= run
+        # Write the scaled row once, then repeat it scale times
+        for i in range(scale):
+            out[pos + i] = ~(wide >> (8 * (scale - 1 - i))) & 0xff
+        for _ in range(scale - 1):
+            out[pos + scale:pos + 2 * scale] = out[pos:pos + scale]
+            pos += scale
+        pos += scale
+    return out
+
+def write_font_file(path, chars, scales):
+    """Writes pre-scaled glyphs for every (char, scale) pair to a font file.
+
+    ``chars`` is a string of ASCII characters.
+    """
+    entries = [(glyph_code(c), s) for c in chars.encode() for s in scales]
+    offset = struct.calcsize(_HEADER_FORMAT) + len(entries) * struct.calcsize(_ENTRY_FORMAT)
+    with open(path, "wb") as f:
+        f.write(struct.pack(_HEADER_FORMAT, FONT_MAGIC, FONT_VERSION, len(entries)))
+        for c, s in entries:
+            f.write(struct.pack(_ENTRY_FORMAT, c, s, offset))
+            offset += glyph_size(s)
+        for c, s in entries:
+            f.write(render_glyph(c, s))
+
+class GlyphCache:
+    """LRU cache of pre-scaled glyphs, ready to blit onto a canvas.
+
+    Glyphs come from the baked font file when it has them and are rendered
+    from the built-in 8x8 font otherwise. Entries are keyed by
+    (byte code, scale, angle), with codes from ``glyph_code``; angle 0 holds a plain landscape buffer tuple,
+    other angles hold a ``RotatedAsset`` for a ``RotatedCanvas``. The least
+    recently used glyphs are dropped once their bitmaps exceed
+    ``budget_bytes``.
+    """
+    def __init__(self, budget_bytes=GLYPH_CACHE_BUDGET, font_path=FONT_FILE):
+        self.budget_bytes = budget_bytes
+        self.font_path = font_path
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._font_index = self._load_font_index()
+
+    def _load_font_index(self):
+        """Reads the baked font's index, or returns an empty one if it is missing."""
+        index = {}
+        try:
+            with open(self.font_path, "rb") as f:
+                magic, version, count = struct.unpack(_HEADER_FORMAT, f.read(struct.calcsize(_HEADER_FORMAT)))
+                if magic != FONT_MAGIC or version != FONT_VERSION:
+                    print(f"Warning: Ignoring font file {self.font_path} with unknown format.")
+                    return index
+                entry_size = struct.calcsize(_ENTRY_FORMAT)
+                for _ in range(count):
+                    code, scale, offset = struct.unpack(_ENTRY_FORMAT, f.read(entry_size))
+                    index[(code, scale)] = offset
+        except OSError:
+            pass
+        except Exception as e:
+            print(f"Error: Failed to read font file {self.font_path}. Details: {e}")
+            index = {}
+        return index
+
+    def _load_glyph(self, code, scale):
+        offset = self._font_index.get((code, scale))
+        if offset is not None:
+            data = bytearray(glyph_size(scale))
+            try:
+                with open(self.font_path, "rb") as f:
+                    f.seek(offset)
+                    if f.readinto(data) == len(data):
+                        return data
+            except OSError as e:
+                print(f"Error: Could not read glyph from {self.font_path}. Details: {e}")
+        return render_glyph(code, scale)
+
+    def get(self, code, scale, angle=0):
+        """Returns the blit source for glyph ``code``, loading it on a miss."""
+        key = (code, scale, angle)
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.hits += 1
+            self._entries[key] = entry
+            return entry
+
+        self.misses += 1
+        size = 8 * scale
+        data = self._load_glyph(code, scale)
+        if angle:
+            entry = prerotate(data, size, size, angle)
+        else:
+            entry = (data, size, size, framebuf.MONO_HLSB)
+        self._entries[key] = entry
+        self.used_bytes += len(data)
+        self._evict()
+        return entry
+
+    def _evict(self):
+        while self.used_bytes > self.budget_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self.used_bytes -= glyph_size(oldest[1])
+            del self._entries[oldest]
+
+    def clear(self):
+        """Drops every cached glyph."""
+        self._entries = OrderedDict()
+        self.used_bytes = 0
+        gc.collect()
+
+glyph_cache = GlyphCache()
@@ -1,8 +1,16 @@
 # hardware_manager.py
 import time
+import array
+import asyncio
 import dht
 from machine import ADC, Pin
 from epaper import ICNT86, ICNT_Development, get_touch_state
+from event_queue import EventQueue, EVENT_TOUCH, EVENT_KEY_DOWN, EVENT_KEY_UP
+
+BUTTON_DEBOUNCE_MS = 30
+# The touch controller keeps pulsing INT while a finger stays down; only a
+# pulse after this long without one (the finger was lifted) is a new touch
+TOUCH_RELEASE_MS = 150
 
 class HardwareManager:
     """Manages hardware components like ADC, buttons, and touch panel."""
@@ -30,6 +38,13 @@ class HardwareManager:
         self.button_press_timestamps = {}
         self.long_press_threshold_ms = 3000
 
+        # Interrupt-driven input, enabled by enable_input_events()
+        self.events = EventQueue()
+        self.buttons = (self.button_1, self.button_2, self.button_3)
+        self._last_edge_ms = array.array('i', [0] * len(self.buttons))
+        self._last_touch_ms = array.array('i', [time.ticks_add(time.ticks_ms(), -TOUCH_RELEASE_MS)])
+        self._touch_pending = False
+
     def get_adc_value(self):
         """Reads the ADC value from the light sensor."""
         return self.adc.read_u16()
@@ -46,9 +61,105 @@ class HardwareManager:
         
         return (inverted_state_1, inverted_state_2, inverted_state_3)
 
-    def get_touch_state(self):
+    def get_touch_state(self, pending=False):
         """Gets the current touch state from the touch panel."""
-        return get_touch_state(self.tp, self.icnt_dev, self.icnt_old)
+        return get_touch_state(self.tp, self.icnt_dev, self.icnt_old, pending)
+
+    def enable_input_events(self):
+        """Routes touch and button input through pin interrupts.
+
+        Touch-downs and both edges of each button are debounced and queued
+        in ``self.events`` by the handlers; ``poll_input`` then consumes
+        them instead of sampling the pins. The queue signals an
+        ``asyncio.ThreadSafeFlag`` so ``wait_for_input`` can await it.
+        """
+        self.events.flag = asyncio.ThreadSafeFlag()
+        for i, pin in enumerate(self.buttons):
+            pin.irq(handler=self._button_handler(i), trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING)
+        self.tp.config.int_pin.irq(handler=self._on_touch_irq, trigger=Pin.IRQ_FALLING)
+
+    def _button_handler(self, index):
+        def handler(pin):
+            now = time.ticks_ms()
+            # Ignore contact bounce right after the previous edge
+            if time.ticks_diff(now, self._last_edge_ms[index]) < BUTTON_DEBOUNCE_MS:
+                return
+            self._last_edge_ms[index] = now
+            self.events.push(EVENT_KEY_DOWN if pin.value() == 0 else EVENT_KEY_UP, index, now)
+        return handler
+
+    def _on_touch_irq(self, pin):
+        now = time.ticks_ms()
+        quiet_ms = time.ticks_diff(now, self._last_touch_ms[0])
+        self._last_touch_ms[0] = now
+        # Repeated reports of a finger still down extend the lockout
+        if quiet_ms < TOUCH_RELEASE_MS:
+            return
+        self.events.push(EVENT_TOUCH, 0, now)
+
+    def poll_input(self, long_press_callback=None):
+        """Consumes queued input events.
+
+        Button presses are timed from their queued timestamps; a button
+        still held ``long_press_threshold_ms`` after it went down triggers
+        ``long_press_callback`` with its index.
+
+        Returns:
+            The touch state (see ``get_touch_state``) if the touch panel
+            raised an interrupt, otherwise None.
+        """
+        event = self.events.pop()
+        while event is not None:
+            kind, arg, ticks = event
+            if kind == EVENT_TOUCH:
+                self._touch_pending = True
+            elif kind == EVENT_KEY_DOWN:
+                self.button_press_timestamps[arg] = ticks
+            elif kind == EVENT_KEY_UP:
+                self.button_press_timestamps.pop(arg, None)
+            event = self.events.pop()
+
+        now = time.ticks_ms()
+        for i in list(self.button_press_timestamps):
+            if self.buttons[i].value() != 0:
+                # Released, but the edge was lost to debouncing
+                del self.button_press_timestamps[i]
+                continue
+            press_duration = time.ticks_diff(now, self.button_press_timestamps[i])
+            if press_duration >= self.long_press_threshold_ms:
+                print(f"Button {i+1} long pressed for {press_duration} ms")
+                del self.button_press_timestamps[i]
+                if long_press_callback:
+                    long_press_callback(i)
+
+        if self._touch_pending:
+            self._touch_pending = False
+            return self.get_touch_state(pending=True)
+        return None
+
+    def next_input_deadline_ms(self):
+        """Returns ms until the earliest pending long press completes, or None."""
+        deadline = None
+        now = time.ticks_ms()
+        for start in self.button_press_timestamps.values():
+            remaining = self.long_press_threshold_ms - time.ticks_diff(now, start)
+            if deadline is None or remaining < deadline:
+                deadline = remaining
+        if deadline is not None and deadline < 0:
+            deadline = 0
+        return deadline
+
+    async def wait_for_input(self, timeout_ms=None):
+        """Waits until an input event is queued or timeout_ms has passed."""
+        if len(self.events):
+            return
+        if timeout_ms is None:
+            await self.events.flag.wait()
+            return
+        try:
+            await asyncio.wait_for_ms(self.events.flag.wait(), timeout_ms)
+        except asyncio.TimeoutError:
+            pass
     
     def handle_button_long_press(self, callback=None):
         """Handle button long press detection with callback support.
@@ -0,0 +1,74 @@
+# icon_atlas.py
+import os
+from display_utils import prerotate
+
+ICON_DIR = "/image/weather_icons"
+ICON_SIZE = 32
+ICON_ANGLE = 90
+
+class IconAtlas:
+    """Weather icons held in RAM, pre-rotated for the display canvas.
+
+    ``load`` reads every icon once; ``get`` never touches the filesystem.
+    ``refresh`` reloads the atlas only when the directory listing (file
+    names and sizes) differs from the one it was built from.
+    """
+    def __init__(self, directory=ICON_DIR, size=ICON_SIZE, angle=ICON_ANGLE):
+        self.directory = directory
+        self.size = size
+        self.angle = angle
+        self.signature = None
+        self._icons = {}
+
+    def _signature(self):
+        try:
+            entries = [(e[0], e[3] if len(e) > 3 else 0) for e in os.ilistdir(self.directory)]
+        except OSError as e:
+            print(f"Error: Failed to list icons in '{self.directory}'. Details: {e}")
+            return ()
+        entries.sort()
+        return tuple(entries)
+
+    def load(self, signature=None):
+        """Reads all icons in the directory into the atlas."""
+        if signature is None:
+            signature = self._signature()
+        length = self.size * self.size // 8
+        icons = {}
+        for name, _ in signature:
+            if not name.endswith(".bin"):
+                continue
+            path = "{}/{}".format(self.directory, name)
+            data = bytearray(length)
+            try:
+                with open(path, "rb") as f:
+                    if f.readinto(data) != length:
+                        print(f"Warning: Skipping icon {path} with unexpected size.")
+                        continue
+            except OSError as e:
+                print(f"Error: Could not read icon {path}. Details: {e}")
+                continue
+            icons[name[:-4]] = prerotate(data, self.size, self.size, self.angle)
+        self._icons = icons
+        self.signature = signature
+        print(f"Info: Loaded {len(icons)} weather icons.")
+
+    def refresh(self):
+        """Reloads the atlas if the icon directory changed.
+
+        Returns:
+            bool: True if the atlas was reloaded.
+        """
+        signature = self._signature()
+        if signature == self.signature:
+            return False
+        self.load(signature)
+        return True
+
+    def get(self, condition):
+        """Returns the ``RotatedAsset`` for a weather condition, or None."""
+        if self.signature is None:
+            self.load()
+        return self._icons.get(condition)
+
+icon_atlas = IconAtlas()
@@ -0,0 +1,166 @@
+# json_stream.py
+import json
+
+JSON_CHUNK_SIZE = 256
+JSON_ITEM_SIZE = 1024
+
+_QUOTE = 0x22      # "
+_BACKSLASH = 0x5C  # \
+_COMMA = 0x2C      # ,
+_LBRACE = 0x7B     # {
+_RBRACE = 0x7D     # }
+_LBRACKET = 0x5B   # [
+_RBRACKET = 0x5D   # ]
+
+class JsonStream:
+    """Incremental JSON scanner reading from an asyncio stream.
+
+    Walks the document in ``chunk_size`` pieces through one reusable buffer,
+    so only a chunk and the array element being decoded are ever resident.
+    ``find_array`` skips ahead to an array under a top-level key and
+    ``next_item`` then decodes that array one element at a time.
+    """
+    def __init__(self, reader, chunk_size=JSON_CHUNK_SIZE, item_size=JSON_ITEM_SIZE):
+        self._reader = reader
+        self._buf = bytearray(chunk_size)
+        self._buf_mv = memoryview(self._buf)
+        self._item = bytearray(item_size)
+        self._item_mv = memoryview(self._item)
+        self._pos = 0
+        self._end = 0
+        self._in_array = False
+
+    async def _fill(self):
+        """Reads the next chunk; returns False at the end of the stream."""
+        n = await self._reader.readinto(self._buf)
+        self._pos = 0
+        self._end = n or 0
+        return self._end > 0
+
+    async def find_array(self, key):
+        """Advances to just past the ``[`` of ``key`` in the top-level object.
+
+        Returns:
+            bool: True if the array was found, False if the document ended.
+        """
+        key = key.encode()
+        key_len = len(key)
+        depth = 0
+        in_str = escape = False
+        # Bytes of the string being read at depth 1; only needs to fit the key
+        word = bytearray(key_len + 1)
+        word_len = 0
+        last = None
+        while True:
+            if self._pos >= self._end and not await self._fill():
+                return False
+            buf = self._buf
+            i = self._pos
+            end = self._end
+            while i < end:
+                c = buf[i]
+                i += 1
+                if in_str:
+                    if escape:
+                        escape = False
+                    elif c == _BACKSLASH:
+                        escape = True
+                    elif c == _QUOTE:
+                        in_str = False
+                        if depth == 1:
+                            last = word_len == key_len and word[:word_len] == key
+                    elif depth == 1 and word_len <= key_len:
+                        word[word_len] = c
+                        word_len += 1
+                elif c == _QUOTE:
+                    in_str = True
+                    word_len = 0
+                elif c == _LBRACE or c == _LBRACKET:
+                    if c == _LBRACKET and depth == 1 and last:
+                        self._pos = i
+                        self._in_array = True
+                        return True
+                    depth += 1
+                    last = None
+                elif c == _RBRACE or c == _RBRACKET:
+                    depth -= 1
+                elif c == _COMMA:
+                    last = None
+            self._pos = i
+
+    async def next_item(self):
+        """Decodes the next element of the array found by ``find_array``.
+
+        Returns:
+            The decoded element, or None once the array is exhausted.
+
+        Raises:
+            ValueError: If the stream ends early or an element does not fit
+                in the item buffer.
+        """
+        if not self._in_array:
+            return None
+        # Skip the separator and whitespace before the element
+        while True:
+            if self._pos >= self._end and not await self._fill():
+                raise ValueError("JSON stream ended inside an array")
+            c = self._buf[self._pos]
+            if c == _RBRACKET:
+                self._pos += 1
+                self._in_array = False
+                return None
+            if c != _COMMA and c > 0x20:
+                break
+            self._pos += 1
+
+        item = self._item_mv
+        size = len(self._item)
+        n = 0
+        depth = 0
+        in_str = escape = False
+        while True:
+            if self._pos >= self._end and not await self._fill():
+                raise ValueError("JSON stream ended inside an array")
+            buf = self._buf
+            start = i = self._pos
+            end = self._end
+            done = False
+            while i < end:
+                c = buf[i]
+                if in_str:
+                    if escape:
+                        escape = False
+                    elif c == _BACKSLASH:
+                        escape = True
+                    elif c == _QUOTE:
+                        in_str = False
+                        if depth == 0:
+                            i += 1
+                            done = True
+                            break
+                elif c == _QUOTE:
+                    in_str = True
+                elif c == _LBRACE or c == _LBRACKET:
+                    depth += 1
+                elif c == _RBRACE or c == _RBRACKET:
+                    if depth == 0:
+                        # End of the array after a bare number or literal
+                        done = True
+                        break
+                    depth -= 1
+                    if depth == 0:
+                        i += 1
+                        done = True
+                        break
+                elif c == _COMMA and depth == 0:
+                    done = True
+                    break
+                i += 1
+            count = i - start
+            if n + count > size:
+                raise ValueError("JSON array element larger than {} bytes".format(size))
+            item[n:n + count] = self._buf_mv[start:i]
+            n += count
+            self._pos = i
+            if done:
+                return json.loads(bytes(item[:n]))
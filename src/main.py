@@ -1,9 +1,10 @@
 # main.py
-import time
+import asyncio
 from wifi_manager import wifi_manager
 from netutils import sync_time
 from file_manager import list_files, shuffle_files
 from display_manager import update_page_loading
+from icon_atlas import icon_atlas
 from app_state import AppState
 from hardware_manager import HardwareManager
 from app_controller import AppController
@@ -27,13 +28,15 @@ def main():
     app_state.image_name_list = list_files(image_directory)
     app_state.image_name_list = shuffle_files(app_state.image_name_list)
 
+    # Preload the weather icons so page renders need no flash reads
+    icon_atlas.load()
+
     # 4. Initialize Controller: Set up the main application controller
     controller = AppController(app_state, hardware)
+    hardware.enable_input_events()
 
-    # 5. Main Loop: Continuously run the application logic
-    while True:
-        controller.run_main_loop()
-        time.sleep(1)
+    # 5. Main Loop: Run the application tasks (clock, weather, sensor, input, chime)
+    asyncio.run(controller.run())
 
 if __name__ == "__main__":
     main()
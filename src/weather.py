@@ -1,55 +1,274 @@
 # weather.py
-import time
-import urequests
+import asyncio
+import json
 import network
 import gc
+from json_stream import JsonStream
+from forecast_aggregator import ForecastAggregator, CONDITIONS, read_entry
 
-def _make_request_with_retry(url, max_retries=3, delay=5):
-    """Makes an HTTP request with retry mechanism and error handling."""
-    for attempt in range(max_retries):
+HTTP_TIMEOUT_MS = 10000
+HTTP_BUFFER_SIZE = 1024
+
+def _split_url(url):
+    """Splits an http(s) URL into (host, port, path, use_ssl)."""
+    scheme, _, rest = url.partition("://")
+    host, _, path = rest.partition("/")
+    use_ssl = scheme == "https"
+    port = 443 if use_ssl else 80
+    if ":" in host:
+        host, port = host.split(":", 1)
+        port = int(port)
+    return host, port, "/" + path, use_ssl
+
+class _Body:
+    """Reader over one response body that stops where the body ends.
+
+    Handles ``Content-Length``, chunked transfer encoding, and bodies that
+    run until the server closes. It offers ``readinto`` like the stream
+    it wraps, so a body can be consumed incrementally.
+    """
+    def __init__(self, reader, length, chunked):
+        self._reader = reader
+        self._chunked = chunked
+        # Bytes left in the body (or current chunk); None reads until close
+        self._left = 0 if chunked else length
+        self._first_chunk = True
+        self.done = length == 0 and not chunked
+
+    def remaining(self):
+        """Returns the bytes left in a ``Content-Length`` body, or None if unknown."""
+        return None if self._chunked else self._left
+
+    async def _next_chunk(self):
+        if not self._first_chunk:
+            await self._reader.readline()  # CRLF closing the previous chunk
+        self._first_chunk = False
+        line = await self._reader.readline()
+        if not line:
+            raise OSError("Connection closed inside a chunked body")
+        size = int(line.split(b";", 1)[0].strip(), 16)
+        if size == 0:
+            # Skip any trailers up to the closing blank line
+            while True:
+                line = await self._reader.readline()
+                if not line or line == b"\r\n":
+                    break
+            self.done = True
+        self._left = size
+
+    async def readinto(self, buf):
+        """Reads up to ``len(buf)`` body bytes into ``buf``; returns 0 at the end."""
+        if self.done:
+            return 0
+        if self._chunked and self._left == 0:
+            await self._next_chunk()
+            if self.done:
+                return 0
+        if self._left is not None and self._left < len(buf):
+            buf = memoryview(buf)[:self._left]
+        n = await self._reader.readinto(buf)
+        if not n:
+            if self._left is not None:
+                raise OSError("Connection closed inside a response body")
+            self.done = True
+            return 0
+        if self._left is not None:
+            self._left -= n
+            if self._left == 0 and not self._chunked:
+                self.done = True
+        return n
+
+class _HttpClient:
+    """Minimal HTTP/1.1 client that keeps one connection alive between requests.
+
+    Back-to-back requests to the same host (current weather, forecast,
+    retries) share one socket and TLS session. A connection the server
+    closed while idle is detected on reuse and replaced transparently;
+    any other failure drops the connection so the next request starts
+    fresh. ``close`` frees the socket and its TLS buffers between rounds.
+    """
+    def __init__(self, buffer_size=HTTP_BUFFER_SIZE):
+        self._buf = bytearray(buffer_size)
+        self._key = None
+        self._reader = None
+        self._writer = None
+        self.connections = 0
+
+    def _drop(self):
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except OSError:
+                pass
+        self._key = self._reader = self._writer = None
+
+    async def close(self):
+        """Closes the kept-alive connection, if any."""
+        self._drop()
+
+    async def _request(self, host, port, path, use_ssl):
+        """Sends the request and returns its status line, reconnecting once if a reused connection is dead."""
+        request = "GET {} HTTP/1.1\r\nHost: {}\r\nConnection: keep-alive\r\n\r\n".format(path, host).encode()
+        key = (host, port, use_ssl)
+        if self._key != key:
+            self._drop()
+        while True:
+            reused = self._writer is not None
+            if not reused:
+                self._reader, self._writer = await asyncio.open_connection(host, port, ssl=use_ssl)
+                self._key = key
+                self.connections += 1
+            try:
+                self._writer.write(request)
+                await self._writer.drain()
+                line = await self._reader.readline()
+            except OSError:
+                if not reused:
+                    raise
+                line = b""
+            if line:
+                return line
+            self._drop()
+            if not reused:
+                raise OSError("Connection closed before the response")
+
+    async def _read_all(self, body):
+        """Reads a whole body into the reusable buffer and returns it as bytes."""
+        n = 0
+        while True:
+            if n == len(self._buf):
+                self._buf.extend(bytearray(len(self._buf)))
+            count = await body.readinto(memoryview(self._buf)[n:])
+            if not count:
+                return bytes(memoryview(self._buf)[:n])
+            n += count
+
+    async def get(self, url, handler=None):
+        """Performs a GET and returns (status, body).
+
+        If ``handler`` is given, a 200 response body is not buffered;
+        instead ``await handler(body)`` consumes it through a ``_Body``
+        reader and its return value takes the place of the body. If the
+        handler stops early, a remainder that fits in one buffer is
+        drained so the connection stays usable; a longer or unknown one
+        drops the connection instead. The forecast ends each round, so
+        reading the rest of it over TLS would be wasted.
+        """
+        host, port, path, use_ssl = _split_url(url)
+        ok = keep_alive = False
         try:
-            response = urequests.get(url, timeout=10)
-            if response.status_code == 200:
-                print(f"Memory available after request: {gc.mem_free()} bytes.")
-                return response
-            else:
-                print(f"Error: API request failed on attempt {attempt + 1}/{max_retries}. Status code: {response.status_code}")
-                response.close()
-        except OSError as e:
-            if e.errno == 103:
-                print(f"Warning: Connection aborted on attempt {attempt + 1}/{max_retries}.")
+            parts = (await self._request(host, port, path, use_ssl)).split(None, 2)
+            status = int(parts[1])
+            keep_alive = parts[0] == b"HTTP/1.1"
+            length = None
+            chunked = False
+            while True:
+                line = await self._reader.readline()
+                if not line or line == b"\r\n":
+                    break
+                name, _, value = line.partition(b":")
+                name = name.strip().lower()
+                value = value.strip().lower()
+                if name == b"content-length":
+                    length = int(value)
+                elif name == b"transfer-encoding":
+                    chunked = b"chunked" in value
+                elif name == b"connection":
+                    keep_alive = keep_alive and value != b"close"
+            if length is None and not chunked:
+                # Body runs until the server closes
+                keep_alive = False
+
+            body = _Body(self._reader, length, chunked)
+            if handler is not None and status == 200:
+                result = await handler(body)
+            elif handler is None and status == 200:
+                result = await self._read_all(body)
             else:
-                print(f"Error: Network issue on attempt {attempt + 1}/{max_retries}. Details: {e}")
-        except MemoryError:
-            print(f"Error: Memory allocation failed on attempt {attempt + 1}/{max_retries}. Forcing garbage collection.")
-            gc.collect()
-        except Exception as e:
-            print(f"Error: API request exception on attempt {attempt + 1}/{max_retries}. Details: {e}")
-        
-        if attempt < max_retries - 1:
-            time.sleep(delay)
-    
-    print(f"Error: API request failed after {max_retries} attempts for URL: {url}")
+                result = None
+            if keep_alive and not body.done:
+                left = body.remaining()
+                if left is not None and left <= len(self._buf):
+                    while await body.readinto(self._buf):
+                        pass
+                else:
+                    keep_alive = False
+            ok = True
+            return status, result
+        finally:
+            # Timeouts, errors and server-side closes leave the stream in an unknown state
+            if not ok or not keep_alive:
+                self._drop()
+
+_client = _HttpClient()
+
+async def close_connection():
+    """Closes the kept-alive weather API connection to free its memory."""
+    await _client.close()
+
+async def _make_request(url, breaker=None, handler=None):
+    """Makes one HTTP request with error handling.
+
+    There is no retry loop here: a failure is recorded on ``breaker``,
+    whose backoff schedule decides when the caller may try again, so no
+    task ever sleeps waiting to retry.
+
+    Returns:
+        bytes: The response body (or the ``handler`` result), or None if
+        the request failed.
+    """
+    try:
+        status, body = await asyncio.wait_for_ms(_client.get(url, handler), HTTP_TIMEOUT_MS)
+        if status == 200:
+            print(f"Memory available after request: {gc.mem_free()} bytes.")
+            if breaker is not None:
+                breaker.success()
+            return body
+        print(f"Error: API request failed. Status code: {status}")
+    except asyncio.TimeoutError:
+        print("Warning: Request timed out.")
+    except OSError as e:
+        if e.errno == 103:
+            print("Warning: Connection aborted.")
+        else:
+            print(f"Error: Network issue. Details: {e}")
+    except (ValueError, KeyError, IndexError) as e:
+        print(f"Error: Invalid response. Details: {e}")
+    except MemoryError:
+        print("Error: Memory allocation failed. Forcing garbage collection.")
+        gc.collect()
+    except Exception as e:
+        print(f"Error: API request exception. Details: {e}")
+
+    if breaker is not None:
+        breaker.failure()
     return None
 
-def fetch_current_weather(api_key, location):
-    """Fetches current weather information."""
+def _can_request(breaker, what):
+    """Checks the network and the endpoint's breaker before a request."""
     if not network.WLAN(network.STA_IF).isconnected():
-        print("Info: No internet connection. Skipping current weather request.")
+        print(f"Info: No internet connection. Skipping {what} request.")
+        return False
+    # Backing off: skip quietly, the breaker logged when it tripped
+    return breaker is None or breaker.allow()
+
+async def fetch_current_weather(api_key, location, breaker=None):
+    """Fetches current weather information.
+
+    Returns None without a request while ``breaker`` is backing off.
+    """
+    if not _can_request(breaker, "current weather"):
         return None
     print(f"Info: Fetching current weather for {location}.")
     url = "https://api.openweathermap.org/data/2.5/weather?q={},TW&appid={}&units=metric".format(location, api_key)
-    response = _make_request_with_retry(url)
+    body = await _make_request(url, breaker)
     
-    if response:
+    if body:
         try:
-            data = response.json()
-            temp = data["main"]["temp"]
-            condition = data["weather"][0]["main"]
-            del data
-            gc.collect()
-
-            return temp, condition
+            # Same entry reader and condition enum as the forecast path
+            _, temp, condition, _ = read_entry(json.loads(body))
+            body = None
+            return temp, CONDITIONS[condition]
         except (ValueError, AttributeError) as e:
             print(f"Error: Failed to parse current weather data. Invalid JSON or attribute error. Details: {e}")
             return None
@@ -59,111 +278,70 @@ def fetch_current_weather(api_key, location):
         except Exception as e:
             print(f"Error: An unexpected error occurred while fetching current weather. Details: {e}")
             return None
-        finally:
-            try:
-                response.close()
-            except Exception as e_close:
-                print(f"Error: Failed to close response for current weather request. Details: {e_close}")
 
     return None
 
-def fetch_weather_forecast(api_key, location, days_limit=4, timezone_offset=8):
-    """Fetches weather forecast information. """
-    if not network.WLAN(network.STA_IF).isconnected():
-        print("Info: No internet connection. Skipping weather forecast request.")
-        return []
+_aggregator = None
+
+def _get_aggregator(days_limit, timezone_offset):
+    """Returns the shared ForecastAggregator, reset for a new forecast."""
+    global _aggregator
+    if _aggregator is None or _aggregator.days_limit != days_limit:
+        _aggregator = ForecastAggregator(days_limit)
+    _aggregator.reset(timezone_offset)
+    return _aggregator
+
+async def _read_forecast(reader, days_limit, timezone_offset):
+    """Streams the forecast ``list`` from the socket into the ForecastAggregator.
+
+    Only one entry is decoded at a time, and the rest of the response is
+    left unread once ``days_limit`` days are complete; ``_HttpClient.get``
+    then drops the connection instead of draining it.
+    """
+    stream = JsonStream(reader)
+    aggregator = _get_aggregator(days_limit, timezone_offset)
+    if not await stream.find_array("list"):
+        raise ValueError("Forecast response has no 'list' array")
+    while True:
+        entry = await stream.next_item()
+        if entry is None or not aggregator.add_entry(entry):
+            break
+    return aggregator
+
+async def _fetch_forecast(api_key, location, days_limit, timezone_offset, breaker):
+    """Fetches the forecast and returns the filled ForecastAggregator, or None."""
+    if not _can_request(breaker, "weather forecast"):
+        return None
 
     print(f"Info: Fetching weather forecast for {location}.")
     url = "https://api.openweathermap.org/data/2.5/forecast?q={0},TW&appid={1}&units=metric&cnt=40".format(location, api_key)
-    response = _make_request_with_retry(url)
 
-    if not response:
-        return []
+    async def handler(reader):
+        return await _read_forecast(reader, days_limit, timezone_offset)
 
-    try:
-        gc.collect()
-        if response.status_code != 200:
-            print(f"Error: Weather forecast query failed with status code: {response.status_code}")
-            return []
-        data = response.json()
-        forecast_list = data.get("list", [])
-        del data
-        gc.collect()
+    aggregator = await _make_request(url, breaker, handler)
+    gc.collect()
+    return aggregator
 
-        result = []
-        processed_days = 0
-        current_date = None
-        temps_sum = 0
-        temps_count = 0
-        weather_counts = {}
-        rain_sum = 0
-        rain_count = 0
-
-        for i in range(len(forecast_list)):
-            if processed_days >= days_limit:
-                break
-
-            entry = forecast_list[i]
-            dt = entry["dt"]
-            local_time = time.localtime(dt + timezone_offset * 3600)
-            month_day = "{:02d}-{:02d}".format(local_time[1], local_time[2])
-
-            if current_date is None:
-                current_date = month_day
-
-            if month_day != current_date:
-                # Store previous day's aggregated data
-                if temps_count > 0:
-                    avg_temp = temps_sum / temps_count
-                    most_common_weather = max(weather_counts, key=weather_counts.get)
-                    avg_rain_prob = (rain_sum / rain_count) * 100 if rain_count > 0 else 0
-                    result.append((current_date, avg_temp, most_common_weather, avg_rain_prob))
-                    processed_days += 1
-
-                # Reset for new day
-                current_date = month_day
-                temps_sum = temps_count = rain_sum = rain_count = 0
-                weather_counts = {}
-                gc.collect()
-
-            # Accumulate data for the current day
-            temp = entry["main"]["temp"]
-            weather = entry["weather"][0]["main"]
-            rain_prob = entry.get("pop", 0)
-
-            temps_sum += temp
-            temps_count += 1
-            weather_counts[weather] = weather_counts.get(weather, 0) + 1
-            rain_sum += rain_prob
-            rain_count += 1
-
-            # Explicitly release processed entry
-            forecast_list[i] = None
-
-        # Process data for the last day
-        if temps_count > 0 and processed_days <= days_limit:
-            avg_temp = temps_sum / temps_count
-            most_common_weather = max(weather_counts, key=weather_counts.get)
-            avg_rain_prob = (rain_sum / rain_count) * 100 if rain_count > 0 else 0
-            result.append((current_date, avg_temp, most_common_weather, avg_rain_prob))
-
-        # Release main list
-        del forecast_list
-        gc.collect()
-        return result
+async def fetch_weather_forecast(api_key, location, days_limit=4, timezone_offset=8, breaker=None):
+    """Fetches weather forecast information.
 
-    except (ValueError, AttributeError) as e:
-        print(f"Error: Failed to parse weather forecast data. Invalid JSON or attribute error. Details: {e}")
-        return []
-    except MemoryError:
-        print("Error: Memory allocation failed during weather forecast processing.")
-        gc.collect()
-        return []
-    except Exception as e:
-        print(f"Error: An unexpected error occurred while fetching weather forecast. Details: {e}")
-        return []
-    finally:
-        try:
-            response.close()
-        except Exception as e_close:
-            print(f"Error: Failed to close response for weather forecast request. Details: {e_close}")
+    The response is parsed as it arrives rather than loaded whole, so only
+    one forecast entry is held in memory at a time.
+    """
+    aggregator = await _fetch_forecast(api_key, location, days_limit, timezone_offset, breaker)
+    return aggregator.result() if aggregator else []
+
+async def fetch_weather_combined(api_key, location, days_limit=4, timezone_offset=8, breaker=None):
+    """Fetches the forecast and derives current conditions from it.
+
+    Saves the separate current-weather request (and its TLS handshake):
+    the forecast entry closest to now stands in for current conditions.
+
+    Returns:
+        tuple: ((temp, condition) or None, forecast list).
+    """
+    aggregator = await _fetch_forecast(api_key, location, days_limit, timezone_offset, breaker)
+    if not aggregator:
+        return None, []
+    return aggregator.current, aggregator.result()
@@ -0,0 +1,103 @@
+# weather_cache.py
+import os
+import time
+import ujson
+
+WEATHER_CACHE_FILE = "weather_cache.json"
+WEATHER_CACHE_VERSION = 1
+WEATHER_CACHE_SAVE_INTERVAL_S = 10 * 60
+
+class WeatherCache:
+    """The last fetched weather, kept on flash so it survives reboots.
+
+    The record is tagged with the location it was fetched for and holds
+    the epoch time of both the current-conditions and the forecast fetch,
+    so a reader can tell how stale each part is. Unforced saves are rate
+    limited to one per ``save_interval`` seconds to spare the flash.
+
+    Refetches are unconditional: the OpenWeather 2.5 endpoints send no
+    ``ETag`` or ``Last-Modified`` header, so there is no validator to
+    revalidate with. How often they happen is bounded by the max age.
+    """
+    def __init__(self, path=WEATHER_CACHE_FILE, save_interval=WEATHER_CACHE_SAVE_INTERVAL_S):
+        self.path = path
+        self.save_interval = save_interval
+        self._last_save = None
+
+    def load(self, location):
+        """Reads the cached weather for ``location``.
+
+        Parts with a fetch time in the future (the clock has not been set
+        yet) are treated as missing, since their age is unknown.
+
+        Returns:
+            tuple: (current, current_age_s, forecast, forecast_age_s) with
+            None for missing parts, or None if there is no usable record.
+        """
+        try:
+            with open(self.path, "r") as f:
+                record = ujson.load(f)
+        except OSError:
+            return None
+        except ValueError as e:
+            print(f"Warning: Ignoring unreadable weather cache. Details: {e}")
+            return None
+
+        if record.get("v") != WEATHER_CACHE_VERSION or record.get("loc") != location:
+            return None
+
+        now = time.time()
+        current = current_age = forecast = forecast_age = None
+        cur = record.get("cur")
+        if cur and now >= cur[2]:
+            current = (cur[0], cur[1])
+            current_age = now - cur[2]
+        fc = record.get("fc")
+        if fc and now >= fc[0]:
+            forecast = [tuple(day) for day in fc[1]]
+            forecast_age = now - fc[0]
+
+        if current is None and forecast is None:
+            return None
+        return current, current_age, forecast, forecast_age
+
+    def save(self, location, current, current_age, forecast, forecast_age, force=False):
+        """Writes the weather to flash.
+
+        The record is written to a temporary file and renamed over the old
+        one, so a power cut mid-write leaves the previous record intact.
+
+        Args:
+            location: Location the data was fetched for.
+            current: (temp, condition) tuple, or None.
+            current_age: Seconds since ``current`` was fetched.
+            forecast: List of per-day forecast tuples, or None.
+            forecast_age: Seconds since ``forecast`` was fetched.
+            force: Write even if the last save was less than
+                ``save_interval`` seconds ago.
+
+        Returns:
+            bool: True if the record was written.
+        """
+        now = time.time()
+        if not force and self._last_save is not None and now - self._last_save < self.save_interval:
+            return False
+
+        record = {"v": WEATHER_CACHE_VERSION, "loc": location}
+        if current:
+            record["cur"] = [current[0], current[1], now - current_age]
+        if forecast:
+            record["fc"] = [now - forecast_age, forecast]
+
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                ujson.dump(record, f)
+            os.rename(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error: Failed to write weather cache. Details: {e}")
+            return False
+        self._last_save = now
+        return True
+
+weather_cache = WeatherCache()
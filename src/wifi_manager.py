@@ -5,7 +5,9 @@ import time
 import machine
 import gc
 import ujson
+import ubinascii
 from display_manager import update_display_Restart, update_display_AP
+from display_service import display_service
 from config_manager import config_manager
 from chime import Chime
 from hardware_manager import HardwareManager
@@ -54,6 +56,7 @@ def reset_wifi_and_reboot():
     update_display_Restart()
     print("Entering AP mode. System will restart...")
     time.sleep(2)
+    display_service.wait_refresh()
     machine.reset()
 
 def factory_reset():
@@ -147,8 +150,27 @@ def html_escape(text):
                 .replace('"', "&quot;")
                 .replace("'", "&#39;"))
 
-def scan_networks():
-    """Scans for available Wi-Fi networks and returns with signal strength."""
+# Join timeouts: the direct rejoin of the last access point gives up early
+# and falls back to scanning
+FAST_CONNECT_TIMEOUT_MS = 8 * 1000
+CONNECT_TIMEOUT_MS = 30 * 1000
+CONNECT_POLL_MS = 100
+# The configuration page reuses scan results this young instead of rescanning
+SCAN_CACHE_MS = 30 * 1000
+
+_scan_cache = None  # (ticks_ms, networks) of the last scan
+
+def scan_networks(max_age_ms=0):
+    """Scans for available Wi-Fi networks and returns with signal strength.
+
+    Each network keeps the BSSID and channel of its strongest access point.
+    Results of the last scan are returned as-is if younger than
+    ``max_age_ms``.
+    """
+    global _scan_cache
+    if max_age_ms and _scan_cache and time.ticks_diff(time.ticks_ms(), _scan_cache[0]) < max_age_ms:
+        return _scan_cache[1]
+
     sta = network.WLAN(network.STA_IF)
     sta.active(True)
     nets = sta.scan()
@@ -159,7 +181,9 @@ def scan_networks():
             if ssid:
                 networks.append({
                     'ssid': ssid,
-                    'rssi': rssi  # Signal strength (higher is better, usually negative values)
+                    'rssi': rssi,  # Signal strength (higher is better, usually negative values)
+                    'bssid': bssid,
+                    'channel': channel
                 })
         except UnicodeError:
             pass
@@ -171,7 +195,61 @@ def scan_networks():
         if ssid not in unique_networks or net['rssi'] > unique_networks[ssid]['rssi']:
             unique_networks[ssid] = net
 
-    return list(unique_networks.values())
+    networks = list(unique_networks.values())
+    _scan_cache = (time.ticks_ms(), networks)
+    return networks
+
+def _wait_for_connection(sta, timeout_ms):
+    """Waits for a pending connect; returns False on timeout or a definite failure."""
+    start = time.ticks_ms()
+    while not sta.isconnected():
+        # Negative status: wrong password, AP not found or join failed
+        if sta.status() < 0 or time.ticks_diff(time.ticks_ms(), start) >= timeout_ms:
+            return False
+        time.sleep_ms(CONNECT_POLL_MS)
+    return True
+
+def _remember_connection(profile, bssid, channel):
+    """Records the connected profile and access point for the next boot."""
+    with config_manager.transaction():
+        config_manager.set_active_profile(profile['name'])
+        config_manager.set_last_connected_profile(profile['name'])
+        if bssid:
+            config_manager.set_last_connection(profile['wifi']['ssid'], bssid, channel)
+
+def _fast_reconnect(sta):
+    """Rejoins the access point of the last successful connection without scanning.
+
+    Returns:
+        dict: The connected profile, or None if there is no usable record or
+        the join failed within FAST_CONNECT_TIMEOUT_MS.
+    """
+    last = config_manager.get_last_connection()
+    if not last:
+        return None
+    profile = config_manager.find_profile_by_ssid(last.get("ssid"))
+    if profile is None:
+        return None
+    try:
+        bssid = ubinascii.unhexlify(last["bssid"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    ssid = profile['wifi']['ssid']
+    password = profile['wifi']['password']
+    channel = last.get("channel")
+    print(f"Info: Reconnecting to '{ssid}' ({last['bssid']}, channel {channel}, profile: '{profile['name']}')...")
+    try:
+        sta.connect(ssid, password, bssid=bssid, channel=channel)
+    except TypeError:
+        # Firmware without the channel argument
+        sta.connect(ssid, password, bssid=bssid)
+
+    if _wait_for_connection(sta, FAST_CONNECT_TIMEOUT_MS):
+        return profile
+    print(f"Warning: Direct reconnect to '{ssid}' failed. Scanning instead.")
+    sta.disconnect()
+    return None
 
 # Compressed static HTML chunks for memory efficiency with improved UI/UX
 HTML_HEADER = b"HTTP/1.0 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n\r\n<!DOCTYPE html><html lang=\"zh-TW\"><head><meta charset=\"UTF-8\"><meta name=\"viewport\" content=\"width=device-width,initial-scale=1.0\"><title>Pi Clock</title><style>:root{--primary:#0288d1;--primary-dark:#0277bd;--primary-light:#4fc3f7;--danger:#d32f2f;--danger-dark:#c62828;--warning:#f57c00;--warning-dark:#e65100;--success:#388e3c;--bg:#f4f7f6;--card:#fff;--sidebar-bg:#fff;--text:#333;--text-light:#666;--border:#ddd;--shadow:rgba(2,136,209,0.15)}*{box-sizing:border-box}body{margin:0;padding:0;font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:var(--bg);color:var(--text);min-height:100vh}.profile-selector{background:var(--sidebar-bg);border-bottom:2px solid var(--primary);padding:1rem}.profile-selector h2{color:var(--primary);font-size:1.2rem;margin:0 0 0.75rem 0}.profile-select-group{display:flex;gap:0.5rem;align-items:center;max-width:500px;margin:0 auto}.profile-select-group select{flex:1;padding:0.7rem;border:1px solid var(--primary);border-radius:6px;font-size:1rem;background:var(--card);color:var(--text);font-weight:500;cursor:pointer}.profile-select-group select:focus{border-color:var(--primary-dark);outline:none;box-shadow:0 0 0 2px rgba(2,136,209,0.2)}.profile-select-group .btn{flex:0 0 auto;width:auto;min-width:auto;margin:0;padding:0.4rem 0.6rem;font-size:0.85rem;line-height:1.2}.main-content{flex:1;padding:1rem;overflow-y:auto}.container{max-width:700px;margin:auto;background:var(--card);padding:1.25rem;border-radius:12px;box-shadow:0 4px 20px var(--shadow)}h1{text-align:center;color:var(--primary);margin-bottom:1.25rem;font-size:1.75rem}fieldset{border:2px solid var(--primary);border-radius:8px;padding:1rem;margin-bottom:1rem;background:#f9feff}legend{font-weight:600;padding:0 .5rem;color:var(--primary)}label{display:block;font-weight:500;margin-bottom:.4rem;color:var(--text);font-size:0.95rem}input,select{width:100%;padding:0.7rem;border:1px solid var(--border);border-radius:6px;font-size:1rem;background:var(--card);transition:border .2s}input:focus,select:focus{border-color:var(--primary);outline:none;box-shadow:0 0 0 2px rgba(2,136,209,0.2)}input[type='checkbox']{width:auto;margin-right:.5rem;transform:scale(1.2);accent-color:var(--primary)}.form-group{margin-bottom:1rem}.info{font-size:.85rem;color:var(--text-light);margin-top:.25rem;padding:0.5rem;background:#e3f2fd;border-radius:4px;border-left:3px solid var(--primary)}.btn{width:100%;padding:0.8rem;font-size:1rem;font-weight:bold;border:none;border-radius:6px;cursor:pointer;transition:all .2s;margin-top:0.5rem}.btn:disabled{opacity:0.6;cursor:not-allowed}.btn-primary{background:var(--primary);color:#fff}.btn-primary:hover:not(:disabled){background:var(--primary-dark);transform:translateY(-1px)}.btn-primary:active{transform:translateY(0)}.btn-danger{background:var(--danger);color:#fff}.btn-danger:hover:not(:disabled){background:var(--danger-dark)}.btn-warning{background:var(--warning);color:#fff}.btn-warning:hover:not(:disabled){background:var(--warning-dark)}.adc-value{font-weight:bold;color:var(--primary)}.button-group{display:flex;gap:0.5rem;margin-top:1rem;flex-wrap:wrap}.button-group .btn{flex:1;min-width:140px}.danger-zone{margin-top:2rem;border-color:var(--danger)!important;background:#fff5f5!important}.danger-zone legend{color:var(--danger)!important}@media (min-width:768px){.profile-selector{padding:1.5rem}.profile-selector h2{font-size:1.3rem;margin-bottom:1rem}.main-content{padding:1.5rem}.container{padding:1.5rem}h1{font-size:2rem}.button-group .btn{min-width:auto}}</style></head><body><div class=\"profile-selector\"><h2>設定檔管理</h2><div class=\"profile-select-group\">"
@@ -384,6 +462,7 @@ def run_web_server():
                         print(f"Info: Switched to last connected profile: {last_profile}")
                     except:
                         pass
+                display_service.wait_refresh()
                 machine.reset()
 
             s.settimeout(1.0)
@@ -472,7 +551,7 @@ def run_web_server():
 
                     profile = config_manager.get_profile(profile_name)
                     if profile:
-                        networks = scan_networks()
+                        networks = scan_networks(SCAN_CACHE_MS)
                         send_html_page(cl, networks, profile)
                     else:
                         cl.send(b"HTTP/1.0 404 Not Found\r\n\r\nProfile not found")
@@ -503,6 +582,7 @@ def run_web_server():
                             "name": new_name,
                             "wifi": {"ssid": "", "password": ""},
                             "weather_location": base_profile.get("weather_location", "Taipei") if base_profile else "Taipei",
+                            "weather": base_profile.get("weather", {}) if base_profile else {},
                             "user": base_profile.get("user", {
                                 "birthday": "0101",
                                 "light_threshold": 56000,
@@ -600,6 +680,7 @@ def run_web_server():
                         print("Factory reset complete. Restarting in 5 seconds...")
                         time.sleep(5)
                         s.close()
+                        display_service.wait_refresh()
                         machine.reset()
 
                     except Exception as e:
@@ -650,6 +731,8 @@ def run_web_server():
                                 "password": wifi_password
                             },
                             "weather_location": params.get("location", "Taipei"),
+                            # Not editable in the form; keep what the profile had
+                            "weather": original_profile.get("weather", {}) if original_profile else {},
                             "user": {
                                 "birthday": params.get("birthday", "0101"),
                                 "light_threshold": int(params.get("light_threshold", "56000")),
@@ -664,27 +747,29 @@ def run_web_server():
                             }
                         }
 
-                        # Update profile
-                        config_manager.update_profile(original_name, profile_data)
+                        # Written to flash once, at the end of the block
+                        with config_manager.transaction():
+                            # Update profile
+                            config_manager.update_profile(original_name, profile_data)
 
-                        # Phase 2 安全改進：僅在有值時更新全局設定
-                        api_key_input = params.get("api_key", "")
-                        # 忽略遮罩值和空值
-                        if api_key_input and not api_key_input.startswith("已設定") and "..." not in api_key_input:
-                            config_manager.set_global("weather_api_key", api_key_input)
+                            # Phase 2 安全改進：僅在有值時更新全局設定
+                            api_key_input = params.get("api_key", "")
+                            # 忽略遮罩值和空值
+                            if api_key_input and not api_key_input.startswith("已設定") and "..." not in api_key_input:
+                                config_manager.set_global("weather_api_key", api_key_input)
 
-                        # AP SSID 總是更新
-                        config_manager.set_global("ap_mode.ssid", params.get("ap_mode_ssid", "Pi_Clock_AP"))
+                            # AP SSID 總是更新
+                            config_manager.set_global("ap_mode.ssid", params.get("ap_mode_ssid", "Pi_Clock_AP"))
 
-                        # AP 密碼僅在有輸入時更新
-                        ap_password_input = params.get("ap_mode_password", "")
-                        if ap_password_input:
-                            config_manager.set_global("ap_mode.password", ap_password_input)
+                            # AP 密碼僅在有輸入時更新
+                            ap_password_input = params.get("ap_mode_password", "")
+                            if ap_password_input:
+                                config_manager.set_global("ap_mode.password", ap_password_input)
 
-                        # Set as active profile and update last connected
-                        # This ensures the device will prioritize this profile on next restart
-                        config_manager.set_active_profile(new_name)
-                        config_manager.set_last_connected_profile(new_name)
+                            # Set as active profile and update last connected
+                            # This ensures the device will prioritize this profile on next restart
+                            config_manager.set_active_profile(new_name)
+                            config_manager.set_last_connected_profile(new_name)
 
                         print(f"Success: Profile '{new_name}' saved and activated.")
 
@@ -696,6 +781,7 @@ def run_web_server():
                         print("Info: Restarting in 5 seconds...")
                         time.sleep(5)
                         s.close()
+                        display_service.wait_refresh()
                         machine.reset()
 
                     except Exception as e:
@@ -709,7 +795,7 @@ def run_web_server():
 
                 # Default: show main page
                 try:
-                    networks = scan_networks()
+                    networks = scan_networks(SCAN_CACHE_MS)
                     send_html_page(cl, networks)
                     cl.close()
                 except Exception as e:
@@ -736,7 +822,8 @@ def run_web_server():
 def wifi_manager():
     """
     Main WiFi manager with multi-profile support and intelligent connection logic.
-    Scans networks, matches with known profiles, tries to connect by priority.
+    Rejoins the last access point directly if possible; otherwise scans
+    networks, matches with known profiles, tries to connect by priority.
     """
     # Check if force AP mode is enabled
     if config_manager.get_global("force_ap_mode", False):
@@ -769,8 +856,16 @@ def wifi_manager():
     sta = network.WLAN(network.STA_IF)
     sta.active(True)
 
+    profile = _fast_reconnect(sta)
+    if profile:
+        print(f"Success: Connected to '{profile['wifi']['ssid']}'.")
+        print(f"IP Address: {sta.ifconfig()[0]}")
+        _remember_connection(profile, None, None)
+        print(f"Info: Active profile set to '{profile['name']}'.")
+        return sta
+
     print("Info: Scanning for available networks...")
-    available_networks = scan_networks()  # Returns list of {ssid, rssi}
+    available_networks = scan_networks()  # Returns list of {ssid, rssi, bssid, channel}
 
     if not available_networks:
         print("Warning: No networks found in scan.")
@@ -785,7 +880,9 @@ def wifi_manager():
         if profile:
             matching_profiles.append({
                 'profile': profile,
-                'rssi': net['rssi']
+                'rssi': net['rssi'],
+                'bssid': net['bssid'],
+                'channel': net['channel']
             })
 
     if not matching_profiles:
@@ -828,18 +925,13 @@ def wifi_manager():
 
             sta.connect(ssid, password)
 
-            timeout = 30
-            while timeout > 0 and not sta.isconnected():
-                time.sleep(1)
-                timeout -= 1
-
-            if sta.isconnected():
+            if _wait_for_connection(sta, CONNECT_TIMEOUT_MS):
                 print(f"Success: Connected to '{ssid}'.")
                 print(f"IP Address: {sta.ifconfig()[0]}")
 
-                # Set this profile as active and last connected
-                config_manager.set_active_profile(profile['name'])
-                config_manager.set_last_connected_profile(profile['name'])
+                # Set this profile as active and last connected, and keep
+                # its access point for a direct reconnect on the next boot
+                _remember_connection(profile, ubinascii.hexlify(match['bssid']).decode(), match['channel'])
 
                 print(f"Info: Active profile set to '{profile['name']}'.")
                 return sta
@@ -0,0 +1,45 @@
+# conftest.py
+"""Host test setup.
+
+The sources target MicroPython on a Pico W. To import them under CPython
+this puts ``src`` and the hardware stand-ins in ``tests/stubs`` on the
+path and adds the MicroPython-only helpers of ``time``, ``asyncio`` and
+the ``u``-prefixed modules that the code uses.
+"""
+import asyncio
+import binascii
+import gc
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "..", "src"), os.path.join(HERE, "stubs")]
+
+sys.modules.setdefault("ujson", json)
+sys.modules.setdefault("ubinascii", binascii)
+
+if not hasattr(gc, "mem_free"):
+    gc.mem_free = lambda: 0
+
+if not hasattr(time, "ticks_ms"):
+    time.ticks_ms = lambda: int(time.monotonic() * 1000)
+    time.ticks_diff = lambda a, b: a - b
+    time.ticks_add = lambda a, b: a + b
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+
+if not hasattr(asyncio, "sleep_ms"):
+    asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+    asyncio.wait_for_ms = lambda aw, ms: asyncio.wait_for(aw, ms / 1000)
+
+    class ThreadSafeFlag(asyncio.Event):
+        pass
+    asyncio.ThreadSafeFlag = ThreadSafeFlag
+
+if not hasattr(asyncio.StreamReader, "readinto"):
+    async def readinto(self, buf):
+        data = await self.read(len(buf))
+        buf[:len(data)] = data
+        return len(data)
+    asyncio.StreamReader.readinto = readinto
@@ -0,0 +1,13 @@
+# Host stand-in for MicroPython dht (tests only).
+class DHT22:
+    def __init__(self, pin):
+        pass
+
+    def measure(self):
+        pass
+
+    def temperature(self):
+        return 25.0
+
+    def humidity(self):
+        return 50.0
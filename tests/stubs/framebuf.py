@@ -0,0 +1,94 @@
+# Host stand-in for MicroPython framebuf (tests only).
+#
+# Pixel layouts match the C implementation for the formats the app uses.
+# ``text`` walks the UTF-8 bytes of the string like the C code, mapping
+# bytes outside 32..127 to 127; glyphs are deterministic stand-ins, not the
+# real 8x8 font.
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+
+def glyph_rows(code):
+    """Returns the 8 row bytes of the stand-in glyph for byte ``code``."""
+    if code < 32 or code > 127:
+        code = 127
+    return bytes(((code * 37 + r * 91) ^ (code << r)) & 0xff for r in range(8))
+
+class FrameBuffer:
+    def __init__(self, buf, width, height, fmt, stride=None):
+        self.buf = buf
+        self.width = width
+        self.height = height
+        self.fmt = fmt
+        self.stride = stride or width
+
+    def _get(self, x, y):
+        if self.fmt == MONO_HLSB:
+            i = (x + y * self.stride) >> 3
+            return (self.buf[i] >> (7 - (x & 7))) & 1
+        if self.fmt == GS2_HMSB:
+            i = (x + y * self.stride) >> 2
+            return (self.buf[i] >> ((x & 3) << 1)) & 3
+        raise NotImplementedError(self.fmt)
+
+    def _set(self, x, y, c):
+        if self.fmt == MONO_HLSB:
+            i = (x + y * self.stride) >> 3
+            bit = 7 - (x & 7)
+            self.buf[i] = (self.buf[i] & ~(1 << bit)) | ((c & 1) << bit)
+        elif self.fmt == GS2_HMSB:
+            i = (x + y * self.stride) >> 2
+            shift = (x & 3) << 1
+            self.buf[i] = (self.buf[i] & ~(3 << shift)) | ((c & 3) << shift)
+        else:
+            raise NotImplementedError(self.fmt)
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        if c is None:
+            return self._get(x, y)
+        self._set(x, y, c)
+
+    def fill(self, c):
+        self.fill_rect(0, 0, self.width, self.height, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        for yy in range(max(0, y), min(self.height, y + h)):
+            for xx in range(max(0, x), min(self.width, x + w)):
+                self._set(xx, yy, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def text(self, s, x, y, c=1):
+        for n, code in enumerate(s.encode()):
+            rows = glyph_rows(code)
+            for r in range(8):
+                for col in range(8):
+                    if (rows[r] >> (7 - col)) & 1:
+                        self.pixel(x + n * 8 + col, y + r, c)
+
+    def blit(self, src, x, y, key=-1, palette=None):
+        if isinstance(src, tuple):
+            src = FrameBuffer(*src)
+        for sy in range(src.height):
+            for sx in range(src.width):
+                c = src._get(sx, sy)
+                if palette is not None:
+                    c = palette._get(c, 0)
+                if c != key and 0 <= x + sx < self.width and 0 <= y + sy < self.height:
+                    self._set(x + sx, y + sy, c)
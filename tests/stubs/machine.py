@@ -0,0 +1,66 @@
+# Host stand-in for MicroPython machine (tests only).
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=None, pull=None, value=None):
+        self.id = id
+        self._value = 1 if value is None else value
+        self.handler = None
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = v
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def irq(self, handler=None, trigger=None):
+        self.handler = handler
+
+class SPI:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def write(self, buf):
+        pass
+
+class I2C:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def writeto(self, *args):
+        pass
+
+    def readfrom_into(self, *args):
+        pass
+
+class ADC:
+    def __init__(self, pin):
+        pass
+
+    def read_u16(self):
+        return 40000
+
+class PWM:
+    def __init__(self, pin):
+        pass
+
+    def freq(self, f):
+        pass
+
+    def duty_u16(self, d):
+        pass
+
+    def deinit(self):
+        pass
+
+def reset():
+    raise SystemExit("machine.reset()")
@@ -0,0 +1,13 @@
+# Host stand-in for MicroPython network (tests only).
+STA_IF = 0
+AP_IF = 1
+
+class WLAN:
+    def __init__(self, interface):
+        pass
+
+    def active(self, *args):
+        return True
+
+    def isconnected(self):
+        return True
@@ -0,0 +1,3 @@
+# Host stand-in for MicroPython ntptime (tests only).
+def settime():
+    pass
@@ -0,0 +1,18 @@
+# Host stand-in for MicroPython utime (tests only).
+from time import *  # noqa: F401,F403
+import time as _time
+
+def sleep_ms(ms):
+    pass
+
+def sleep_us(us):
+    pass
+
+def ticks_ms():
+    return _time.ticks_ms()
+
+def ticks_diff(a, b):
+    return a - b
+
+def ticks_add(a, b):
+    return a + b
@@ -0,0 +1,200 @@
+import json
+import os
+
+import pytest
+
+import config_manager
+from config_manager import ConfigManager, CONFIG_FILE, CONFIG_TMP_FILE, _SETTINGS
+
+PROFILES = [
+    {
+        "name": "Home",
+        "wifi": {"ssid": "home-net", "password": "pw1"},
+        "weather_location": "Taipei",
+        "weather": {"mode": "combined", "max_age_min": 30},
+        "user": {"birthday": "0101", "light_threshold": 56000, "timezone_offset": 8},
+        "chime": {"enabled": True, "interval": "hourly", "pitch": 880, "volume": 80},
+    },
+    {
+        "name": "Office",
+        "wifi": {"ssid": "office-net", "password": "pw2"},
+        "weather_location": "Hsinchu",
+        "user": {"light_threshold": 40000, "image_interval_min": 5},
+        "chime": {"enabled": False},
+    },
+]
+
+KEYS = [key for _, key, _ in _SETTINGS] + [
+    "wifi.ssid", "wifi.password", "ap_mode.ssid", "ap_mode.password",
+    "user.missing", "weather.missing", "chime.missing", "other.key",
+]
+
+def write_config(config):
+    with open("config.json", "w") as f:
+        json.dump(config, f)
+
+def sample_config():
+    return {
+        "global": {"ap_mode": {"ssid": "Pi_Clock_AP", "password": "12345678"}, "weather_api_key": "key"},
+        "profiles": json.loads(json.dumps(PROFILES)),
+        "active_profile": "Home",
+        "last_connected_profile": None,
+    }
+
+def reference_get(config, key, default=None):
+    """ConfigManager.get as it was before the snapshot: a lookup per call."""
+    if key.startswith("ap_mode."):
+        val = config.get("global", {}).get("ap_mode", {})
+        return val.get(key[8:], default)
+    if key == "weather.api_key":
+        return config.get("global", {}).get("weather_api_key", default)
+
+    profiles = config.get("profiles", [])
+    name = config["active_profile"] if "active_profile" in config else (profiles[0]["name"] if profiles else None)
+    active = next((p for p in profiles if p["name"] == name), None)
+    if not active:
+        return default
+    if key == "weather.location":
+        return active.get("weather_location", default)
+    for section in ("wifi", "weather", "user", "chime"):
+        if key.startswith(section + "."):
+            return active.get(section, {}).get(key[len(section) + 1:], default)
+    return default
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_config(sample_config())
+    return ConfigManager()
+
+def check(manager):
+    for key in KEYS:
+        assert manager.get(key, "default") == reference_get(manager.config, key, "default"), key
+    settings = manager.settings
+    for name, key, default in _SETTINGS:
+        assert getattr(settings, name) == reference_get(manager.config, key, default), key
+
+def test_get_matches_the_old_lookup(manager):
+    check(manager)
+    assert manager.get("user.light_threshold") == 56000
+    assert manager.get("weather.api_key") == "key"
+
+def test_snapshot_is_kept_until_a_change(manager):
+    settings = manager.settings
+    manager.get("user.light_threshold")
+    manager.set("user.light_threshold", 56000)
+    manager.set_global("weather_api_key", "key")
+    manager.set_active_profile("Home")
+    assert manager.settings is settings
+
+@pytest.mark.parametrize("change", [
+    lambda m: m.set("user.light_threshold", 1234),
+    lambda m: m.set("weather.location", "Tainan"),
+    lambda m: m.set("weather.mode", "current"),
+    lambda m: m.set("chime.interval", "half_hourly"),
+    lambda m: m.set("wifi.ssid", "other-net"),
+    lambda m: m.set("ap_mode.password", "87654321"),
+    lambda m: m.set("weather.api_key", "new-key"),
+    lambda m: m.set_global("weather_api_key", "global-key"),
+    lambda m: m.set_global("ap_mode.ssid", "Other_AP"),
+    lambda m: m.set_active_profile("Office"),
+    lambda m: m.update_profile("Home", dict(PROFILES[0], weather_location="Kaohsiung")),
+    lambda m: m.update_profile("Home", dict(PROFILES[0], name="House")),
+    lambda m: m.delete_profile("Home"),
+    lambda m: (m.add_profile(dict(PROFILES[1], name="Cafe")), m.set_active_profile("Cafe")),
+])
+def test_snapshot_is_rebuilt_after_a_change(manager, change):
+    before = manager.settings
+    check(manager)
+    change(manager)
+    assert manager.settings is not before
+    check(manager)
+    # The change was written and reads back the same
+    check(ConfigManager())
+
+def test_changes_inside_a_transaction_are_visible_at_once(manager):
+    with manager.transaction():
+        manager.set_active_profile("Office")
+        assert manager.settings.location == "Hsinchu"
+        manager.set("user.light_threshold", 1)
+        assert manager.get("user.light_threshold") == 1
+        check(manager)
+    check(ConfigManager())
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def test_save_writes_a_temporary_file_and_renames_it(manager, monkeypatch):
+    renames = []
+    rename = os.rename
+    def recording_rename(src, dst):
+        # The new copy is complete before it replaces the old one
+        renames.append((src, dst, read_json(src)["generation"]))
+        rename(src, dst)
+    monkeypatch.setattr(config_manager.os, "rename", recording_rename)
+
+    manager.set("user.light_threshold", 1)
+    manager.set("user.light_threshold", 2)
+    assert renames == [(CONFIG_TMP_FILE, CONFIG_FILE, 1), (CONFIG_TMP_FILE, CONFIG_FILE, 2)]
+    assert not os.path.exists(CONFIG_TMP_FILE)
+    assert read_json(CONFIG_FILE)["generation"] == 2
+
+def test_transaction_writes_once(manager):
+    with manager.transaction():
+        manager.set_active_profile("Office")
+        manager.set_last_connected_profile("Office")
+        manager.set("user.light_threshold", 1)
+    assert read_json(CONFIG_FILE)["generation"] == 1
+
+def interrupted_save(manager, monkeypatch, key, value):
+    """Makes a change whose save loses power between the write and the rename."""
+    def power_cut(src, dst):
+        raise OSError("power cut")
+    with monkeypatch.context() as m:
+        m.setattr(config_manager.os, "rename", power_cut)
+        with pytest.raises(OSError):
+            manager.set(key, value)
+
+def test_save_interrupted_before_rename_is_finished_on_load(manager, monkeypatch):
+    manager.set("user.light_threshold", 1)
+    interrupted_save(manager, monkeypatch, "user.light_threshold", 2)
+    assert read_json(CONFIG_FILE)["generation"] == 1
+
+    reloaded = ConfigManager()
+    assert reloaded.get("user.light_threshold") == 2
+    assert not os.path.exists(CONFIG_TMP_FILE)
+    assert read_json(CONFIG_FILE)["generation"] == 2
+
+def test_truncated_temporary_file_is_ignored_and_removed(manager):
+    manager.set("user.light_threshold", 1)
+    with open(CONFIG_FILE) as f:
+        text = f.read()
+    with open(CONFIG_TMP_FILE, "w") as f:
+        f.write(text.replace('"generation": 1', '"generation": 2')[:len(text) // 2])
+
+    assert ConfigManager().get("user.light_threshold") == 1
+    assert not os.path.exists(CONFIG_TMP_FILE)
+
+def test_uploaded_config_wins_over_a_leftover_temporary_file(manager, monkeypatch):
+    manager.set("user.light_threshold", 1)
+    interrupted_save(manager, monkeypatch, "user.light_threshold", 2)
+
+    # A config.json uploaded by hand has no generation
+    uploaded = sample_config()
+    uploaded["profiles"][0]["user"]["light_threshold"] = 3
+    write_config(uploaded)
+
+    reloaded = ConfigManager()
+    assert reloaded.get("user.light_threshold") == 3
+    assert not os.path.exists(CONFIG_TMP_FILE)
+    # Saves made after the upload read back as usual
+    reloaded.set("user.light_threshold", 4)
+    assert ConfigManager().get("user.light_threshold") == 4
+
+def test_temporary_file_is_used_without_a_config_file(manager, monkeypatch):
+    interrupted_save(manager, monkeypatch, "user.light_threshold", 2)
+    os.remove(CONFIG_FILE)
+
+    assert ConfigManager().get("user.light_threshold") == 2
+    assert os.path.exists(CONFIG_FILE) and not os.path.exists(CONFIG_TMP_FILE)
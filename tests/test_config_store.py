@@ -0,0 +1,166 @@
+import json
+import os
+
+import pytest
+
+import config_store
+from config_manager import ConfigManager, CONFIG_FILE
+from config_store import CONFIG_BIN_FILE, ProfileList
+
+def make_profile(name, ssid, threshold):
+    profile = {"name": name, "weather_location": "Taipei", "user": {"light_threshold": threshold}}
+    if ssid is not None:
+        profile["wifi"] = {"ssid": ssid, "password": "pw"}
+    return profile
+
+PROFILES = [
+    make_profile("預設", "home-net", 56000),
+    make_profile("Office", "office-net", 40000),
+    make_profile("No WiFi", None, 30000),
+    make_profile("Cafe", "cafe-net", 20000),
+]
+
+def sample_config(storage="binary", active="Office"):
+    return {
+        "global": {"ap_mode": {"ssid": "Pi_Clock_AP", "password": "12345678"}, "weather_api_key": "key"},
+        "profiles": json.loads(json.dumps(PROFILES)),
+        "active_profile": active,
+        "last_connected_profile": None,
+        "storage": storage,
+    }
+
+def write_json(config):
+    with open(CONFIG_FILE, "w") as f:
+        json.dump(config, f)
+
+def loaded(manager):
+    """Names of the profiles decoded in memory."""
+    profiles = manager.config["profiles"]
+    assert isinstance(profiles, ProfileList)
+    return [profiles.key(i)[0] for i in range(len(profiles)) if profiles.loaded(i)]
+
+@pytest.fixture(autouse=True)
+def in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def test_round_trip():
+    config = sample_config()
+    config["generation"] = 7
+    profiles = config_store.save(config)
+    assert [profiles.key(i) for i in range(len(profiles))] == [config_store.profile_key(p) for p in PROFILES]
+
+    generation, loaded_config = config_store.load()
+    assert generation == 7
+    assert list(loaded_config.pop("profiles")) == PROFILES
+    del config["profiles"]
+    assert loaded_config == config
+
+def test_load_pages_in_the_active_profile_only():
+    config_store.save(sample_config(active="No WiFi"))
+    profiles = config_store.load()[1]["profiles"]
+    assert [profiles.loaded(i) for i in range(4)] == [False, False, True, False]
+    assert [profiles.key(i) for i in range(4)] == [config_store.profile_key(p) for p in PROFILES]
+    assert [profiles.loaded(i) for i in range(4)] == [False, False, True, False]
+    assert profiles[3] == PROFILES[3]
+    assert [profiles.loaded(i) for i in range(4)] == [False, False, True, True]
+
+def test_save_copies_profiles_never_paged_in():
+    config = sample_config()
+    config_store.save(config)
+    config = config_store.load()[1]
+    config["profiles"][1]["user"]["light_threshold"] = 1
+    config["profiles"] = config_store.save(config)
+    assert [config["profiles"].loaded(i) for i in range(4)] == [False, True, False, False]
+
+    expected = json.loads(json.dumps(PROFILES))
+    expected[1]["user"]["light_threshold"] = 1
+    assert list(config_store.load()[1]["profiles"]) == expected
+
+def test_newer_temporary_file_wins_and_truncated_one_is_ignored():
+    config = sample_config()
+    config["generation"] = 1
+    config_store.save(config)
+    with open(CONFIG_BIN_FILE, "rb") as f:
+        old = f.read()
+    config["generation"] = 2
+    config["active_profile"] = "Cafe"
+    config_store.save(config)
+    with open(CONFIG_BIN_FILE, "rb") as f:
+        new = f.read()
+
+    # Interrupted before the rename: the complete newer copy is moved into place
+    with open(CONFIG_BIN_FILE, "wb") as f:
+        f.write(old)
+    with open(CONFIG_BIN_FILE + ".tmp", "wb") as f:
+        f.write(new)
+    generation, loaded_config = config_store.load()
+    assert (generation, loaded_config["active_profile"]) == (2, "Cafe")
+    assert not os.path.exists(CONFIG_BIN_FILE + ".tmp")
+
+    # Interrupted mid-write: the truncated copy is ignored
+    with open(CONFIG_BIN_FILE + ".tmp", "wb") as f:
+        f.write(new[:len(new) - 10])
+    with open(CONFIG_BIN_FILE, "wb") as f:
+        f.write(old)
+    assert config_store.load()[0] == 1
+
+def test_manager_edits_page_in_only_what_they_touch():
+    write_json(sample_config())
+    ConfigManager()
+    # Imported into the binary store
+    assert os.path.exists(CONFIG_BIN_FILE) and not os.path.exists(CONFIG_FILE)
+
+    manager = ConfigManager()
+    assert loaded(manager) == ["Office"]
+    assert manager.list_profiles() == ["預設", "Office", "No WiFi", "Cafe"]
+    assert manager.get("user.light_threshold") == 40000
+    assert loaded(manager) == ["Office"]
+
+    manager.add_profile(make_profile("Library", "lib-net", 10000))
+    manager.update_profile("Office", dict(PROFILES[1], name="Work"))
+    manager.delete_profile("No WiFi")
+    assert loaded(manager) == ["Work", "Library"]
+
+    manager = ConfigManager()
+    assert manager.list_profiles() == ["預設", "Work", "Cafe", "Library"]
+    assert manager.get_active_profile_name() == "Work"
+    assert loaded(manager) == ["Work"]
+
+    manager.set_active_profile("Cafe")
+    assert manager.settings.light_threshold == 20000
+    assert loaded(manager) == ["Work", "Cafe"]
+
+    manager = ConfigManager()
+    assert loaded(manager) == ["Cafe"]
+    assert manager.find_profile_by_ssid("lib-net")["user"]["light_threshold"] == 10000
+    assert loaded(manager) == ["Cafe", "Library"]
+    assert manager.get_profile("預設") == PROFILES[0]
+    assert manager.get_profile("Work") == dict(PROFILES[1], name="Work")
+
+def test_switching_between_json_and_binary():
+    write_json(sample_config(storage="json"))
+    manager = ConfigManager()
+    manager.set("user.light_threshold", 1)
+    assert not os.path.exists(CONFIG_BIN_FILE)
+
+    # Switch to binary by uploading a config.json that asks for it
+    exported = dict(manager.config, storage="binary")
+    write_json(exported)
+    manager = ConfigManager()
+    assert os.path.exists(CONFIG_BIN_FILE) and not os.path.exists(CONFIG_FILE)
+    manager = ConfigManager()
+    assert isinstance(manager.config["profiles"], ProfileList)
+    assert manager.get("user.light_threshold") == 1
+
+    # And back, from a config.json exported from the binary file
+    exported = config_store.load()[1]
+    exported["profiles"] = list(exported["profiles"])
+    exported["storage"] = "json"
+    write_json(exported)
+    manager = ConfigManager()
+    manager.set("user.light_threshold", 2)
+    manager = ConfigManager()
+    assert isinstance(manager.config["profiles"], list)
+    assert manager.get("user.light_threshold") == 2
+    with open(CONFIG_FILE) as f:
+        assert json.load(f)["profiles"][1]["user"]["light_threshold"] == 2
@@ -0,0 +1,166 @@
+import random
+
+import pytest
+
+import epaper
+from display_service import DisplayService, FRAME_SIZE
+from display_utils import DIRTY_MAX_REGIONS, draw_scaled_text, find_dirty_regions
+from epaper import EPD_2in9, EPD_WIDTH, EPD_HEIGHT
+from test_epaper_stream import RecordingSPI
+
+STRIDE = EPD_WIDTH // 8
+
+class PanelRAM:
+    """Replays a recorded SPI stream into a model of the controller's RAM.
+
+    Models the commands the driver uses to address RAM: the X/Y window
+    (0x44/0x45), the address counters (0x4E/0x4F) and the two RAM writes
+    (0x24/0x26), with data entry mode 0x03 (X then Y increment).
+    """
+    PARAMS = {0x44: 2, 0x45: 4, 0x4E: 1, 0x4F: 2}
+
+    def __init__(self):
+        self.ram = {0x24: bytearray(FRAME_SIZE), 0x26: bytearray(FRAME_SIZE)}
+        self.window = (0, STRIDE - 1, 0, EPD_HEIGHT - 1)
+        self.x = self.y = 0
+        self.command = None
+        self.params = []
+        self.written = {0x24: 0, 0x26: 0}
+        self.pos = 0
+
+    def replay(self, stream):
+        for dc, byte in stream[self.pos:]:
+            if dc == 0:
+                self.command = byte
+                self.params = []
+            elif self.command in self.ram:
+                self._write(byte)
+            elif self.command in self.PARAMS:
+                self.params.append(byte)
+                if len(self.params) == self.PARAMS[self.command]:
+                    self._set(self.command, self.params)
+        self.pos = len(stream)
+
+    def _set(self, command, p):
+        if command == 0x44:
+            self.window = (p[0], p[1]) + self.window[2:]
+        elif command == 0x45:
+            self.window = self.window[:2] + (p[0] | p[1] << 8, p[2] | p[3] << 8)
+        elif command == 0x4E:
+            self.x = p[0]
+        else:
+            self.y = p[0] | p[1] << 8
+
+    def _write(self, byte):
+        x_start, x_end, y_start, y_end = self.window
+        self.ram[self.command][self.y * STRIDE + self.x] = byte
+        self.written[self.command] += 1
+        self.x += 1
+        if self.x > x_end:
+            self.x = x_start
+            self.y = y_start if self.y >= y_end else self.y + 1
+
+def frame_with(changes):
+    frame = bytearray(b"\xff" * FRAME_SIZE)
+    for x, y in changes:
+        frame[y * STRIDE + x] = 0x00
+    return frame
+
+def covered(regions, x, y):
+    return any(xs // 8 <= x <= xe // 8 and ys <= y <= ye for xs, ys, xe, ye in regions)
+
+def test_identical_frames_have_no_regions():
+    frame = frame_with([(3, 10)])
+    assert find_dirty_regions(frame, bytearray(frame), STRIDE) == []
+
+def test_box_is_byte_aligned():
+    before = frame_with([])
+    after = bytearray(before)
+    after[40 * STRIDE + 5] ^= 0x01
+    after[42 * STRIDE + 9] ^= 0x80
+    assert find_dirty_regions(before, after, STRIDE) == [(40, 40, 79, 42)]
+
+def test_bands_merge_within_gap_only():
+    before = frame_with([])
+    after = frame_with([(2, 10), (2, 19), (6, 40)])
+    # Rows 10 and 19 are 8 unchanged rows apart; row 40 is further away
+    assert find_dirty_regions(before, after, STRIDE) == [(16, 10, 23, 19), (48, 40, 55, 40)]
+    assert find_dirty_regions(before, after, STRIDE, merge_gap=7) == [
+        (16, 10, 23, 10), (16, 19, 23, 19), (48, 40, 55, 40)]
+
+def test_region_count_is_capped_by_merging_closest_bands():
+    before = frame_with([])
+    rows = [0, 30, 45, 100, 200, 215, 295]
+    after = frame_with([(i, y) for i, y in enumerate(rows)])
+    regions = find_dirty_regions(before, after, STRIDE)
+    assert len(regions) == DIRTY_MAX_REGIONS
+    # The 15-row gaps close first, then the 30-row one
+    assert [(r[1], r[3]) for r in regions] == [(0, 45), (100, 100), (200, 215), (295, 295)]
+    assert all(covered(regions, i, y) for i, y in enumerate(rows))
+
+def test_regions_cover_every_changed_byte():
+    rng = random.Random(5)
+    for max_regions in (1, 2, 4, 8):
+        before = bytearray(rng.getrandbits(8) for _ in range(FRAME_SIZE))
+        after = bytearray(before)
+        changed = {(rng.randrange(STRIDE), rng.randrange(EPD_HEIGHT)) for _ in range(25)}
+        for x, y in changed:
+            after[y * STRIDE + x] ^= 0xff
+        regions = find_dirty_regions(before, after, STRIDE, max_regions=max_regions)
+        assert len(regions) <= max_regions
+        assert all(xs % 8 == 0 and xe % 8 == 7 for xs, _, xe, _ in regions)
+        assert all(covered(regions, x, y) for x, y in changed)
+
+@pytest.fixture
+def panel(monkeypatch):
+    monkeypatch.setattr(epaper.utime, "sleep", lambda s: None)
+    epd = EPD_2in9()
+    epd.config.busy_pin.value(0)
+    epd.config.spi = RecordingSPI(epd.config)
+    return epd
+
+@pytest.mark.parametrize("region", [(0, 0, 127, 295), (8, 3, 23, 5), (120, 290, 127, 295), (0, 100, 7, 100)])
+def test_write_ram_window_updates_only_the_box(panel, region):
+    rng = random.Random(6)
+    frame = bytearray(rng.getrandbits(8) for _ in range(FRAME_SIZE))
+    model = PanelRAM()
+    panel.write_ram_window(frame, *region)
+    model.replay(panel.config.spi.stream)
+
+    xs, ys, xe, ye = region
+    ram = model.ram[0x24]
+    for y in range(EPD_HEIGHT):
+        for x in range(STRIDE):
+            inside = xs // 8 <= x <= xe // 8 and ys <= y <= ye
+            assert ram[y * STRIDE + x] == (frame[y * STRIDE + x] if inside else 0)
+    assert model.written[0x24] == (xe // 8 - xs // 8 + 1) * (ye - ys + 1)
+
+def clock_page(minute):
+    def draw(canvas):
+        draw_scaled_text(canvas, "05/01", 3, 20, 4, 0)
+        draw_scaled_text(canvas, "{:02d}:{:02d}".format(12 + minute // 60, minute % 60), 3, 70, 4, 0)
+        canvas.fill_rect(200, 10, 80, 100, 0)
+    return draw
+
+def test_panel_ram_follows_mixed_full_and_partial_frames(panel):
+    service = DisplayService()
+    service.epd = panel
+    model = PanelRAM()
+    partial = False
+    partial_frames = partial_bytes = 0
+
+    for minute in range(40):
+        before = model.written[0x24]
+        assert service.show(clock_page(minute), partial_update=partial)
+        model.replay(panel.config.spi.stream)
+        assert model.ram[0x24] == service.front_buf
+        if partial:
+            partial_frames += 1
+            partial_bytes += model.written[0x24] - before
+        else:
+            # Full refreshes load both planes, which partial updates diff against
+            assert model.ram[0x26] == service.front_buf
+        partial = not partial
+
+    # Each partial frame rewrites the changed digits, not all 4,736 bytes
+    assert partial_bytes / partial_frames < FRAME_SIZE / 8
@@ -0,0 +1,118 @@
+import asyncio
+
+import framebuf
+import pytest
+
+import epaper
+from display_service import DisplayService, FRAME_SIZE, STATE_GRAY, STATE_PARTIAL
+from display_utils import RotatedCanvas
+from epaper import EPD_WIDTH, EPD_HEIGHT
+
+class FakePanel:
+    """Panel whose refresh only finishes when ReadBusy is called."""
+    def __init__(self):
+        self.busy = False
+        self.frames = 0
+
+    def init(self):
+        pass
+
+    def SetCursor(self, x, y):
+        pass
+
+    def display_Base(self, buf, wait=True):
+        self.frames += 1
+        self.busy = True
+
+    def is_busy(self):
+        return self.busy
+
+    def ReadBusy(self):
+        self.busy = False
+
+def test_wait_refresh_blocks_for_async_refresh():
+    service = DisplayService()
+    service.epd = FakePanel()
+    service.async_refresh = True
+
+    async def main():
+        service.show(lambda canvas: canvas.fill_rect(0, 0, 10, 10, 0))
+        assert service.epd.busy
+        service.wait_refresh()
+        assert not service.epd.busy
+        assert service._busy_since is None
+
+    asyncio.run(main())
+    assert service.epd.frames == 1
+
+def test_wait_refresh_without_panel():
+    DisplayService().wait_refresh()
+
+# 128x128 GS2 image, one gray level per 32-column band: 0, 1, 2, 3
+GRAY_IMAGE = bytes(b for _ in range(128) for level in range(4) for b in [level * 0x55] * 8)
+GRAY_CALLS = ("init", "init_Partial", "init_4Gray", "load_Base", "display_Base",
+              "display_Partial_Fast", "display_4Gray", "release_buffers")
+
+@pytest.fixture
+def panel(monkeypatch):
+    """The real driver with its top-level panel calls logged."""
+    monkeypatch.setattr(epaper.utime, "sleep", lambda s: None)
+    epd = epaper.EPD_2in9()
+    epd.config.busy_pin.value(0)
+    epd.calls = []
+    for name in GRAY_CALLS:
+        def logged(*args, _name=name, _method=getattr(epd, name), **kwargs):
+            epd.calls.append(_name)
+            return _method(*args, **kwargs)
+        setattr(epd, name, logged)
+    return epd
+
+def gray_page(minute, gray=True):
+    def draw(canvas):
+        canvas.fill_rect(3 + minute, 20, 8, 8, 0)
+        if gray:
+            canvas.blit_gray(GRAY_IMAGE, 128, 128, 168, 0)
+    return draw
+
+def take_calls(epd):
+    calls, epd.calls = epd.calls, []
+    return calls
+
+def test_gray_image_only_on_full_refreshes(panel):
+    service = DisplayService()
+    service.epd = panel
+
+    assert service.show(gray_page(0), partial_update=False)
+    assert take_calls(panel) == ["init_4Gray", "display_4Gray"]
+    assert service.state == STATE_GRAY
+    assert panel._buffer_4Gray is not None
+
+    # The reference frame holds the image thresholded to mono
+    fb = framebuf.FrameBuffer(service.front_buf, EPD_WIDTH, EPD_HEIGHT, framebuf.MONO_HLSB)
+    nx, ny, _, _ = RotatedCanvas(bytearray(FRAME_SIZE), EPD_WIDTH, EPD_HEIGHT, 90)._map_rect(168, 0, 128, 128)
+    assert [fb.pixel(nx + band * 32, ny + 5) for band in range(4)] == [0, 0, 1, 1]
+
+    # A partial tick reloads the mono frame and updates in place
+    assert service.show(gray_page(1), partial_update=True)
+    assert take_calls(panel) == ["release_buffers", "init", "load_Base", "init_Partial", "display_Partial_Fast"]
+    assert service.state == STATE_PARTIAL
+    assert panel._buffer_4Gray is None and panel._gray_plane_buf is None
+
+    assert service.show(gray_page(2), partial_update=True)
+    assert take_calls(panel) == ["display_Partial_Fast"]
+
+    assert not service.show(gray_page(2), partial_update=True)
+    assert take_calls(panel) == []
+
+    assert service.show(gray_page(3), partial_update=False)
+    assert take_calls(panel) == ["init_4Gray", "display_4Gray"]
+
+def test_mono_full_refresh_after_gray_frees_gray_buffers(panel):
+    service = DisplayService()
+    service.epd = panel
+    service.show(gray_page(0), partial_update=False)
+    take_calls(panel)
+
+    assert service.show(gray_page(1, gray=False), partial_update=False)
+    assert take_calls(panel) == ["release_buffers", "init", "display_Base"]
+    assert panel._buffer_4Gray is None
@@ -0,0 +1,70 @@
+import tracemalloc
+
+import framebuf
+import pytest
+
+import epaper
+from epaper import EPD_2in9
+
+LAZY = ("_buffer_4Gray", "_image4Gray", "_buffer", "_image1Gray_Portrait", "_gray_plane_buf")
+
+class EagerEPD(EPD_2in9):
+    """The driver as it was, allocating its drawing buffers up front."""
+    def __init__(self):
+        super().__init__()
+        self._buffer_4Gray = bytearray(self.height * self.width // 4)
+        self._image4Gray = framebuf.FrameBuffer(self._buffer_4Gray, self.width, self.height, framebuf.GS2_HMSB)
+        self._buffer = bytearray(self.height * self.width // 8)
+        self._image1Gray_Portrait = framebuf.FrameBuffer(self._buffer, self.width, self.height, framebuf.MONO_HLSB)
+
+@pytest.fixture
+def epd(monkeypatch):
+    monkeypatch.setattr(epaper.utime, "sleep", lambda s: None)
+    epd = EPD_2in9()
+    epd.config.busy_pin.value(0)
+    return epd
+
+def allocated(cls):
+    cls()  # warm up, so one-off costs are not counted
+    tracemalloc.start()
+    try:
+        epd = cls()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return epd, size
+
+def test_buffers_are_not_allocated_up_front(epd):
+    assert all(getattr(epd, name) is None for name in LAZY)
+    lazy, lazy_size = allocated(EPD_2in9)
+    eager, eager_size = allocated(EagerEPD)
+    # Allowing for tracing noise of a few hundred bytes
+    assert eager_size - lazy_size >= 0.95 * (len(eager.buffer_4Gray) + len(eager.buffer))
+
+def test_buffers_are_allocated_once_on_first_access(epd):
+    image = epd.image4Gray
+    assert len(epd._buffer_4Gray) == 296 * 128 // 4
+    assert image.buf is epd.buffer_4Gray
+    assert epd.image4Gray is image
+    assert epd._buffer is None
+
+    portrait = epd.image1Gray_Portrait
+    assert portrait.buf is epd.buffer
+    assert epd.image1Gray_Portrait is portrait
+
+    assert epd._gray_plane_buf is None
+    epd.display_4Gray(epd.buffer_4Gray)
+    plane = epd._gray_plane_buf
+    epd.display_4Gray(epd.buffer_4Gray)
+    assert epd._gray_plane_buf is plane
+
+def test_release_buffers_drops_and_recreates(epd):
+    old = (epd.buffer_4Gray, epd.image4Gray, epd.buffer, epd.image1Gray_Portrait)
+    epd.display_4Gray(epd.buffer_4Gray)
+
+    epd.release_buffers()
+    assert all(getattr(epd, name) is None for name in LAZY)
+
+    new = (epd.buffer_4Gray, epd.image4Gray, epd.buffer, epd.image1Gray_Portrait)
+    assert all(n is not o for n, o in zip(new, old))
+    assert new[1].buf is new[0] and new[3].buf is new[2]
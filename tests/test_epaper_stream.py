@@ -0,0 +1,158 @@
+import random
+
+import pytest
+
+import epaper
+from epaper import EPD_2in9, Gray4
+
+class RecordingSPI:
+    """Records every byte written as (DC level, byte)."""
+    def __init__(self, config):
+        self.config = config
+        self.stream = []
+
+    def write(self, buf):
+        dc = self.config.dc_pin.value()
+        self.stream.extend((dc, b) for b in bytes(buf))
+
+class BaselineEPD(EPD_2in9):
+    """The driver's original one-byte-per-transfer loops."""
+    def SendLut(self, isQuick):
+        self.send_command(0x32)
+        lut = self.lut if isQuick else self.lut_l
+        for i in range(0, 153):
+            self.send_data(lut[i])
+        self.ReadBusy()
+
+    def SetLut(self, lut):
+        self.send_command(0x32)
+        for i in range(0, 153):
+            self.send_data(lut[i])
+        self.ReadBusy()
+        self.send_command(0x3f)
+        self.send_data(lut[153])
+        self.send_command(0x03)
+        self.send_data(lut[154])
+        self.send_command(0x04)
+        self.send_data(lut[155])
+        self.send_data(lut[156])
+        self.send_data(lut[157])
+        self.send_command(0x2c)
+        self.send_data(lut[158])
+
+    def display(self, image):
+        self.send_command(0x24)
+        for i in range(0, self.height * int(self.width / 8)):
+            self.send_data(image[i])
+        self.TurnOnDisplay()
+
+    def display_Base(self, image, wait=True):
+        self.send_command(0x24)
+        for i in range(0, self.height * int(self.width / 8)):
+            self.send_data(image[i])
+        self.send_command(0x26)
+        for i in range(0, self.height * int(self.width / 8)):
+            self.send_data(image[i])
+        self.TurnOnDisplay()
+
+    def display_Partial(self, image, regions=None):
+        self.config.digital_write(self.config.reset_pin, 0)
+        self.config.delay_ms(0.2)
+        self.config.digital_write(self.config.reset_pin, 1)
+        self.SendLut(1)
+        self.send_command(0x37)
+        for b in (0x00, 0x00, 0x00, 0x00, 0x00, 0x40, 0x00, 0x00, 0x00, 0x00):
+            self.send_data(b)
+        self.send_command(0x3C)
+        self.send_data(0x80)
+        self.send_command(0x22)
+        self.send_data(0xC0)
+        self.send_command(0x20)
+        self.ReadBusy()
+        self.SetWindow(0, 0, self.width - 1, self.height - 1)
+        self.SetCursor(0, 0)
+        self.send_command(0x24)
+        for i in range(0, self.height * int(self.width / 8)):
+            self.send_data(image[i])
+        self.TurnOnDisplay_Partial()
+
+    def display_4Gray(self, image, wait=True):
+        # gray1 sets a bit only in the 0x26 plane, gray2 only in the 0x24 plane
+        for command, ink in ((0x24, (1, 1, 0, 0)), (0x26, (1, 0, 1, 0))):
+            self.send_command(command)
+            for i in range(0, 4736):
+                temp3 = 0
+                for j in range(0, 2):
+                    temp1 = image[i * 2 + j]
+                    for k in range(0, 2):
+                        temp3 |= ink[temp1 & 0x03]
+                        temp3 <<= 1
+                        temp1 >>= 2
+                        temp3 |= ink[temp1 & 0x03]
+                        if j != 1 or k != 1:
+                            temp3 <<= 1
+                        temp1 >>= 2
+                self.send_data(temp3)
+        self.TurnOnDisplay_4Gray()
+
+    def Clear(self, color):
+        self.send_command(0x24)
+        for i in range(0, self.height * int(self.width / 8)):
+            self.send_data(color)
+        self.TurnOnDisplay()
+
+@pytest.fixture(autouse=True)
+def no_delays(monkeypatch):
+    monkeypatch.setattr(epaper.utime, "sleep", lambda s: None)
+
+def make(cls):
+    epd = cls()
+    epd.config.busy_pin.value(0)
+    epd.config.spi = RecordingSPI(epd.config)
+    return epd
+
+def run(cls, steps):
+    epd = make(cls)
+    for step in steps:
+        step(epd)
+    return epd.config.spi.stream
+
+rng = random.Random(4)
+FRAME = bytearray(rng.getrandbits(8) for _ in range(296 * 128 // 8))
+# Longer than a frame, as the app's buffers may be
+PADDED = FRAME + bytearray(b"\x55" * 64)
+GRAY = bytearray(rng.getrandbits(8) for _ in range(296 * 128 // 4))
+
+STEPS = {
+    "init": lambda epd: epd.init(),
+    "display": lambda epd: epd.display(PADDED),
+    "display_Base": lambda epd: epd.display_Base(FRAME),
+    "display_Partial": lambda epd: epd.display_Partial(FRAME),
+    "Clear_white": lambda epd: epd.Clear(0xff),
+    "Clear_black": lambda epd: epd.Clear(0x00),
+    "SendLut_quick": lambda epd: epd.SendLut(1),
+    "SendLut_wait": lambda epd: epd.SendLut(0),
+    "SetLut": lambda epd: epd.SetLut(Gray4),
+    "init_4Gray": lambda epd: epd.init_4Gray(),
+    "display_4Gray": lambda epd: epd.display_4Gray(GRAY),
+}
+
+@pytest.mark.parametrize("name", sorted(STEPS))
+def test_stream_matches_baseline(name):
+    expected = run(BaselineEPD, [STEPS[name]])
+    assert expected
+    assert run(EPD_2in9, [STEPS[name]]) == expected
+
+def test_session_matches_baseline():
+    steps = [STEPS[name] for name in ("init", "display_Base", "display_Partial", "display_Partial",
+                                      "init_4Gray", "display_4Gray", "init", "Clear_white")]
+    expected = run(BaselineEPD, steps)
+    actual = run(EPD_2in9, steps)
+    assert len(actual) == len(expected)
+    assert actual == expected
+
+def test_bytes_sent_counts_stream():
+    epd = make(EPD_2in9)
+    epd.init()
+    epd.display_Base(FRAME)
+    assert epd.config.bytes_sent == len(epd.config.spi.stream)
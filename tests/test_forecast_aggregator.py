@@ -0,0 +1,119 @@
+import json
+import os
+import time
+
+import pytest
+
+from forecast_aggregator import ForecastAggregator
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "forecast_taipei.json")
+NOW = 1714575600  # 2024-05-01 15:00 UTC, between two forecast entries
+
+class DictDailyForecast:
+    """The dict-based day aggregation weather.py used before ForecastAggregator."""
+    def __init__(self, days_limit, timezone_offset, now):
+        self.days_limit = days_limit
+        self.offset = timezone_offset * 3600
+        self.result = []
+        self.current = None
+        self._now = now
+        self._current_gap = None
+        self.processed_days = 0
+        self.current_date = None
+        self._reset()
+
+    def _reset(self):
+        self.temps_sum = 0
+        self.temps_count = 0
+        self.weather_counts = {}
+        self.rain_sum = 0
+        self.rain_count = 0
+
+    def _store_day(self):
+        avg_temp = self.temps_sum / self.temps_count
+        most_common_weather = max(self.weather_counts, key=self.weather_counts.get)
+        avg_rain_prob = (self.rain_sum / self.rain_count) * 100 if self.rain_count > 0 else 0
+        self.result.append((self.current_date, avg_temp, most_common_weather, avg_rain_prob))
+
+    def add(self, entry):
+        local_time = time.localtime(entry["dt"] + self.offset)
+        month_day = "{:02d}-{:02d}".format(local_time[1], local_time[2])
+        if self.current_date is None:
+            self.current_date = month_day
+        if month_day != self.current_date:
+            if self.temps_count > 0:
+                self._store_day()
+                self.processed_days += 1
+            self.current_date = month_day
+            self._reset()
+        weather = entry["weather"][0]["main"]
+        temp = entry["main"]["temp"]
+        gap = abs(entry["dt"] - self._now)
+        if self._current_gap is None or gap < self._current_gap:
+            self._current_gap = gap
+            self.current = (temp, weather)
+        self.temps_sum += temp
+        self.temps_count += 1
+        self.weather_counts[weather] = self.weather_counts.get(weather, 0) + 1
+        self.rain_sum += entry.get("pop", 0)
+        self.rain_count += 1
+        return self.processed_days < self.days_limit
+
+    def finish(self):
+        if self.temps_count > 0 and self.processed_days <= self.days_limit:
+            self._store_day()
+        return self.result
+
+@pytest.fixture(autouse=True)
+def utc_localtime(monkeypatch):
+    # MicroPython's localtime is UTC; the offset is applied by the code
+    monkeypatch.setattr(time, "localtime", time.gmtime)
+
+def load_entries():
+    with open(FIXTURE) as f:
+        return json.load(f)["list"]
+
+def run_reference(entries, days_limit, timezone_offset):
+    daily = DictDailyForecast(days_limit, timezone_offset, NOW)
+    for entry in entries:
+        if not daily.add(entry):
+            break
+    return daily.finish(), daily.current
+
+def run_aggregator(aggregator, entries, days_limit, timezone_offset):
+    aggregator.reset(timezone_offset, now=NOW)
+    for entry in entries:
+        if not aggregator.add_entry(entry):
+            break
+    return aggregator.result(), aggregator.current
+
+@pytest.mark.parametrize("timezone_offset", [8, 0, -5, 13])
+def test_matches_dict_aggregation(timezone_offset):
+    entries = load_entries()
+    # An entry out of order starts a new day and then returns to the old one
+    reordered = entries[:6] + [entries[12]] + entries[6:12] + entries[13:]
+    for days_limit in range(1, 8):
+        aggregator = ForecastAggregator(days_limit)
+        for payload in (entries, reordered, entries[:5], entries[:1]):
+            assert run_aggregator(aggregator, payload, days_limit, timezone_offset) == \
+                run_reference(payload, days_limit, timezone_offset)
+
+def test_ties_go_to_condition_seen_first():
+    # Taipei day 05-03 counts two each of Clear, Mist, Clouds and Rain
+    result, _ = run_aggregator(ForecastAggregator(4), load_entries(), 4, 8)
+    assert result[2][0] == "05-03"
+    assert result[2][2] == "Clear"
+
+def test_keeps_day_after_limit():
+    # The entry that completes the last day is kept as an extra partial day
+    result, _ = run_aggregator(ForecastAggregator(4), load_entries(), 4, 8)
+    reference, _ = run_reference(load_entries(), 4, 8)
+    assert len(result) == len(reference) == 5
+
+def test_unknown_condition():
+    entries = load_entries()[:2]
+    for entry in entries:
+        entry["weather"][0]["main"] = "Volcano"
+    result, current = run_aggregator(ForecastAggregator(4), entries, 4, 8)
+    assert result[0][2] == "Unknown"
+    assert current[1] == "Unknown"
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import time
+
+import weather
+from weather import _HttpClient
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "forecast_taipei.json")
+
+class StandInServer:
+    """Local HTTP/1.1 server that serves scripted responses and counts connections."""
+    def __init__(self, routes):
+        # path -> (body, options); options: chunked, close, status
+        self.routes = routes
+        self.connections = 0
+        self.requests = []
+        self.closed_early = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return "http://127.0.0.1:{}".format(self._server.sockets[0].getsockname()[1])
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                path = line.split()[1].decode()
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                self.requests.append(path)
+                body, options = self.routes[path]
+                status = options.get("status", 200)
+                head = "HTTP/1.1 {} X\r\nContent-Type: application/json\r\n".format(status)
+                if options.get("close"):
+                    head += "Connection: close\r\n"
+                if options.get("chunked"):
+                    writer.write((head + "Transfer-Encoding: chunked\r\n\r\n").encode())
+                    for i in range(0, len(body), 700):
+                        piece = body[i:i + 700]
+                        writer.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+                    writer.write(b"0\r\n\r\n")
+                else:
+                    writer.write((head + "Content-Length: {}\r\n\r\n".format(len(body))).encode())
+                    writer.write(body)
+                await writer.drain()
+                if options.get("close") or options.get("drop_idle"):
+                    break
+        except (ConnectionError, OSError):
+            self.closed_early += 1
+        finally:
+            writer.close()
+
+def run(routes, client_steps):
+    """Runs ``client_steps(client, base_url)`` against a stand-in server; returns (server, result)."""
+    async def main():
+        server = StandInServer(routes)
+        base = await server.start()
+        client = _HttpClient()
+        try:
+            result = await client_steps(client, base)
+        finally:
+            await client.close()
+            await server.stop()
+        return server, client, result
+    return asyncio.run(main())
+
+with open(FIXTURE, "rb") as f:
+    FORECAST = f.read()
+CURRENT = json.dumps({"dt": 1714575600, "main": {"temp": 24.3}, "weather": [{"main": "Clouds"}]}).encode()
+
+def test_round_shares_one_connection():
+    routes = {"/weather": (CURRENT, {}), "/forecast": (FORECAST, {})}
+
+    async def steps(client, base):
+        return [await client.get(base + "/weather"), await client.get(base + "/forecast"),
+                await client.get(base + "/weather")]
+    server, client, results = run(routes, steps)
+    assert [body for _, body in results] == [CURRENT, FORECAST, CURRENT]
+    assert server.connections == client.connections == 1
+
+def test_chunked_body_is_reassembled():
+    routes = {"/forecast": (FORECAST, {"chunked": True}), "/weather": (CURRENT, {})}
+
+    async def steps(client, base):
+        return [await client.get(base + "/forecast"), await client.get(base + "/weather")]
+    server, client, results = run(routes, steps)
+    assert results == [(200, FORECAST), (200, CURRENT)]
+    assert server.connections == 1
+
+def test_reconnects_after_server_closes_idle_connection():
+    routes = {"/weather": (CURRENT, {"drop_idle": True})}
+
+    async def steps(client, base):
+        first = await client.get(base + "/weather")
+        await asyncio.sleep(0.05)
+        return first, await client.get(base + "/weather")
+    server, client, results = run(routes, steps)
+    assert results == ((200, CURRENT), (200, CURRENT))
+    assert server.connections == client.connections == 2
+
+def test_connection_close_header_drops_connection():
+    routes = {"/weather": (CURRENT, {"close": True})}
+
+    async def steps(client, base):
+        return [await client.get(base + "/weather") for _ in range(2)]
+    server, client, results = run(routes, steps)
+    assert results == [(200, CURRENT)] * 2
+    assert server.connections == 2
+
+def test_error_response_keeps_connection():
+    routes = {"/missing": (b'{"cod":"404"}', {"status": 404}), "/weather": (CURRENT, {})}
+
+    async def steps(client, base):
+        return [await client.get(base + "/missing"), await client.get(base + "/weather")]
+    server, client, results = run(routes, steps)
+    assert results == [(404, None), (200, CURRENT)]
+    assert server.connections == 1
+
+async def read_head(body, size):
+    buf = bytearray(size)
+    n = 0
+    while n < size:
+        count = await body.readinto(memoryview(buf)[n:])
+        if not count:
+            break
+        n += count
+    return bytes(buf[:n])
+
+def test_handler_stopping_early_drops_connection():
+    # The rest of the forecast is not read; the next request reconnects
+    routes = {"/forecast": (FORECAST, {}), "/weather": (CURRENT, {})}
+
+    async def steps(client, base):
+        head = await client.get(base + "/forecast", lambda body: read_head(body, 2000))
+        assert client._writer is None
+        return head, await client.get(base + "/weather")
+    server, client, (head, current) = run(routes, steps)
+    assert head == (200, FORECAST[:2000])
+    assert current == (200, CURRENT)
+    assert server.connections == client.connections == 2
+
+def test_handler_stopping_early_on_chunked_body_drops_connection():
+    routes = {"/forecast": (FORECAST, {"chunked": True}), "/weather": (CURRENT, {})}
+
+    async def steps(client, base):
+        head = await client.get(base + "/forecast", lambda body: read_head(body, 100))
+        return head, await client.get(base + "/weather")
+    server, client, (head, current) = run(routes, steps)
+    assert head == (200, FORECAST[:100])
+    assert current == (200, CURRENT)
+    assert server.connections == 2
+
+def test_short_remainder_is_drained():
+    routes = {"/weather": (CURRENT, {})}
+
+    async def steps(client, base):
+        head = await client.get(base + "/weather", lambda body: read_head(body, 10))
+        return head, await client.get(base + "/weather")
+    server, client, (head, current) = run(routes, steps)
+    assert head == (200, CURRENT[:10])
+    assert current == (200, CURRENT)
+    assert server.connections == 1
+
+def test_forecast_round_over_stand_in_server(monkeypatch):
+    # The real fetch path: streamed forecast, then the connection is closed
+    routes = {}
+    monkeypatch.setattr(time, "localtime", time.gmtime)
+
+    async def steps(client, base):
+        monkeypatch.setattr(weather, "_client", client)
+        real = weather._split_url
+
+        def to_stand_in(url):
+            host, port, path, use_ssl = real(url)
+            routes[path] = (FORECAST, {})
+            return real(base + path)
+        monkeypatch.setattr(weather, "_split_url", to_stand_in)
+        return await weather.fetch_weather_forecast("key", "Taipei", days_limit=2, timezone_offset=8)
+    server, client, forecast = run(routes, steps)
+    assert [day[0] for day in forecast] == ["05-01", "05-02", "05-03"]
+    assert server.connections == 1
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import random
+import time
+import tracemalloc
+
+import pytest
+
+import weather
+from json_stream import JsonStream
+from test_forecast_aggregator import DictDailyForecast, NOW
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "forecast_taipei.json")
+
+with open(FIXTURE, "rb") as f:
+    PAYLOAD = f.read()
+
+class RandomReader:
+    """Stream that hands out the data in randomly sized reads, like a socket."""
+    def __init__(self, data, seed, max_read=None):
+        self.data = data
+        self.pos = 0
+        self.rng = random.Random(seed)
+        self.max_read = max_read
+
+    def _take(self, limit):
+        n = self.rng.randint(1, limit)
+        if self.max_read:
+            n = min(n, self.max_read)
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += len(chunk)
+        return chunk
+
+    async def readinto(self, buf):
+        chunk = self._take(len(buf))
+        buf[:len(chunk)] = chunk
+        return len(chunk)
+
+    async def readline(self):
+        end = self.data.find(b"\n", self.pos)
+        end = len(self.data) if end < 0 else end + 1
+        line = self.data[self.pos:end]
+        self.pos = end
+        return line
+
+def chunked(data, seed):
+    """Encodes ``data`` with chunked transfer encoding in random chunk sizes."""
+    rng = random.Random(seed)
+    out = bytearray()
+    pos = 0
+    while pos < len(data):
+        piece = data[pos:pos + rng.randint(1, 900)]
+        out += b"%x\r\n%s\r\n" % (len(piece), piece)
+        pos += len(piece)
+    return bytes(out + b"0\r\n\r\n")
+
+def stream_list(reader, chunk_size):
+    async def main():
+        stream = JsonStream(reader, chunk_size=chunk_size)
+        assert await stream.find_array("list")
+        items = []
+        while True:
+            item = await stream.next_item()
+            if item is None:
+                return items
+            items.append(item)
+    return asyncio.run(main())
+
+@pytest.fixture(autouse=True)
+def fixed_clock(monkeypatch):
+    monkeypatch.setattr(time, "localtime", time.gmtime)
+    monkeypatch.setattr(time, "time", lambda: NOW)
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("chunk_size", [16, 64, 256])
+def test_stream_matches_json_loads(seed, chunk_size):
+    items = stream_list(RandomReader(PAYLOAD, seed), chunk_size)
+    assert items == json.loads(PAYLOAD)["list"]
+
+def test_stream_through_chunked_body():
+    for seed in range(8):
+        body = weather._Body(RandomReader(chunked(PAYLOAD, seed), seed, max_read=300), None, True)
+        assert stream_list(body, 256) == json.loads(PAYLOAD)["list"]
+
+def test_find_array_only_matches_top_level_key():
+    doc = (b'{"note": "list", "nested": {"list": [0]}, "esc": "\\"list\\"", '
+           b'"lists": [1], "list": [{"a": "]},["}, 2, "x", [3, [4]], true]}')
+    assert stream_list(RandomReader(doc, 1), 16) == [{"a": "]},["}, 2, "x", [3, [4]], True]
+
+def test_missing_array():
+    async def main():
+        return await JsonStream(RandomReader(b'{"cod": "404", "message": "city not found"}', 2)).find_array("list")
+    assert asyncio.run(main()) is False
+
+def test_truncated_array():
+    with pytest.raises(ValueError):
+        stream_list(RandomReader(PAYLOAD[:3000], 3), 256)
+
+def reference_forecast(days_limit, timezone_offset):
+    daily = DictDailyForecast(days_limit, timezone_offset, NOW)
+    for entry in json.loads(PAYLOAD)["list"]:
+        if not daily.add(entry):
+            break
+    return daily.finish(), daily.current
+
+def read_forecast(reader, days_limit, timezone_offset):
+    aggregator = asyncio.run(weather._read_forecast(reader, days_limit, timezone_offset))
+    return aggregator.result(), aggregator.current
+
+@pytest.mark.parametrize("timezone_offset", [8, 0, -5])
+def test_read_forecast_matches_dict_aggregation(timezone_offset):
+    for days_limit in (1, 4, 6):
+        expected = reference_forecast(days_limit, timezone_offset)
+        for seed in range(4):
+            assert read_forecast(RandomReader(PAYLOAD, seed), days_limit, timezone_offset) == expected
+            body = weather._Body(RandomReader(chunked(PAYLOAD, seed), seed), None, True)
+            assert read_forecast(body, days_limit, timezone_offset) == expected
+
+def test_read_forecast_stops_reading_after_days_limit():
+    reader = RandomReader(PAYLOAD, 5)
+    read_forecast(reader, 1, 8)
+    assert reader.pos < len(PAYLOAD) // 3
+
+def test_streaming_peak_memory_below_whole_document_parse():
+    # Host benchmark on the recorded response: peak heap while parsing,
+    # the event loop's own allocations excluded
+    weather._get_aggregator(4, 8)
+
+    async def streamed():
+        reader = RandomReader(PAYLOAD, 6)
+        tracemalloc.start()
+        try:
+            await weather._read_forecast(reader, 4, 8)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    streamed_peak = asyncio.run(streamed())
+    tracemalloc.start()
+    try:
+        reference_forecast(4, 8)
+        loaded_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert streamed_peak * 4 < loaded_peak, (streamed_peak, loaded_peak)
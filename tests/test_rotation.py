@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from display_utils import get_pixel, set_pixel, rotate_buffer
+
+SIZES = [(296, 128), (128, 296)]
+
+def reference_rotate(src, width, height, angle):
+    """Per-pixel rotation, as rotate_buffer did before the block transpose."""
+    if angle == 0:
+        return bytearray(src)
+    dest_width = height if angle in (90, 270) else width
+    dest = bytearray(b"\xff" * len(src))
+    for y in range(height):
+        for x in range(width):
+            if angle == 90:
+                dx, dy = y, (width - 1) - x
+            elif angle == 180:
+                dx, dy = (width - 1) - x, (height - 1) - y
+            else:
+                dx, dy = (height - 1) - y, x
+            set_pixel(dest, dx, dy, dest_width, get_pixel(src, x, y, width))
+    return dest
+
+def patterns(width, height):
+    size = width * height // 8
+    rng = random.Random(width * 1000 + height)
+    yield bytearray(rng.getrandbits(8) for _ in range(size))
+    # Mostly white with a few dark bytes, so all-white blocks get skipped
+    sparse = bytearray(b"\xff" * size)
+    for _ in range(40):
+        sparse[rng.randrange(size)] = rng.getrandbits(8)
+    yield sparse
+    yield bytearray(b"\x00" * size)
+    yield bytearray(b"\xff" * size)
+
+@pytest.mark.parametrize("width,height", SIZES)
+@pytest.mark.parametrize("angle", [90, 180, 270])
+def test_rotate_buffer_matches_reference(width, height, angle):
+    for src in patterns(width, height):
+        expected = reference_rotate(src, width, height, angle)
+        assert rotate_buffer(src, width, height, angle) == expected
+        dest = bytearray(b"\xff" * len(src))
+        assert rotate_buffer(src, width, height, angle, dest) is dest
+        assert dest == expected
+
+@pytest.mark.parametrize("width,height", SIZES)
+def test_rotations_compose_to_identity(width, height):
+    for src in patterns(width, height):
+        assert rotate_buffer(rotate_buffer(src, width, height, 90), height, width, 270) == src
+        assert rotate_buffer(rotate_buffer(src, width, height, 180), width, height, 180) == src
+        assert reference_rotate(src, width, height, 0) == src
+
+def test_rotate_buffer_rejects_unsupported_angle():
+    with pytest.raises(ValueError):
+        rotate_buffer(bytearray(296 * 128 // 8), 296, 128, 0)
@@ -0,0 +1,57 @@
+import framebuf
+import pytest
+
+from display_utils import RotatedCanvas, draw_scaled_text, rotate_buffer, set_pixel
+
+WIDTH, HEIGHT = 296, 128
+TEXTS = ["12:34", "SSID: Café", "網路-5G", "°C", ""]
+
+def reference_scaled_text(canvas, text, x, y, scale, color=0):
+    """Scales the text drawn by FrameBuffer.text, as draw_scaled_text did originally."""
+    orig_width = len(text) * 8
+    if not orig_width:
+        return
+    temp_buf = bytearray(orig_width)
+    temp_fb = framebuf.FrameBuffer(temp_buf, orig_width, 8, framebuf.MONO_HLSB)
+    temp_fb.fill(0xff)
+    temp_fb.text(text, 0, 0, color)
+    scaled_width = orig_width * scale
+    scaled_buf = bytearray(b"\xff" * (scaled_width * 8 * scale // 8))
+    for py in range(8):
+        for px in range(orig_width):
+            if temp_fb.pixel(px, py) == 0:
+                for sy in range(scale):
+                    for sx in range(scale):
+                        set_pixel(scaled_buf, px * scale + sx, py * scale + sy, scaled_width, 0)
+    canvas.blit(framebuf.FrameBuffer(scaled_buf, scaled_width, 8 * scale, framebuf.MONO_HLSB), x, y)
+
+def landscape():
+    buf = bytearray(WIDTH * HEIGHT // 8)
+    fb = framebuf.FrameBuffer(buf, WIDTH, HEIGHT, framebuf.MONO_HLSB)
+    fb.fill(1)
+    return buf, fb
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("scale", [1, 2, 3])
+def test_matches_framebuf_text(text, scale):
+    expected_buf, expected = landscape()
+    reference_scaled_text(expected, text, 5, 40, scale)
+    buf, fb = landscape()
+    draw_scaled_text(fb, text, 5, 40, scale)
+    assert buf == expected_buf
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_matches_framebuf_text_on_rotated_canvas(text):
+    expected_buf, expected = landscape()
+    reference_scaled_text(expected, text, 3, 50, 2)
+    panel = bytearray(WIDTH * HEIGHT // 8)
+    canvas = RotatedCanvas(panel, HEIGHT, WIDTH, 90)
+    canvas.fill(1)
+    draw_scaled_text(canvas, text, 3, 50, 2)
+    assert panel == rotate_buffer(expected_buf, WIDTH, HEIGHT, 90)
+
+def test_white_text_clears_its_cells():
+    buf, fb = landscape()
+    fb.fill(0)
+    draw_scaled_text(fb, "Café", 0, 0, 2, color=1)
+    assert [fb.pixel(x, 0) for x in (0, 63, 64)] == [1, 1, 0]
@@ -0,0 +1,149 @@
+import asyncio
+import calendar
+import selectors
+import sys
+import time
+import types
+
+# wifi_manager.py holds non-ASCII bytes literals that only MicroPython accepts
+sys.modules.setdefault("wifi_manager", types.SimpleNamespace(reset_wifi_and_reboot=lambda: None))
+
+import app_controller
+from app_controller import AppController
+from app_state import AppState
+
+EPOCH = 1714550400  # 2024-05-01 08:00:00 UTC
+SENSOR_READ_S = 0.025  # Blocking DHT22 read
+PARSE_S = 0.030  # Blocking JSON decode of a response
+FETCH_S = 1.5  # Network round trip, spent awaiting the socket
+SLOW_FETCH_S = 12.0
+TOUCH_AT_S = [95.4, 200.25, 1234.9]
+MAX_TICK_DELAY_MS = 100
+
+class Clock:
+    """Virtual time in seconds since ``EPOCH``; only moves when work or waits advance it."""
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+class VirtualSelector(selectors.SelectSelector):
+    """Lets the event loop skip idle waits by advancing the virtual clock."""
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        if timeout is None:
+            raise RuntimeError("Event loop would block forever")
+        self.clock.now += timeout
+        return []
+
+class FakeHardware:
+    def __init__(self, clock):
+        self.clock = clock
+        self.touch_at = list(TOUCH_AT_S)
+        self.touches = []
+
+    def get_adc_value(self):
+        return 0
+
+    def get_temperature_humidity(self):
+        self.clock.now += SENSOR_READ_S
+        return 22.5, 55.0
+
+    def next_input_deadline_ms(self):
+        return None
+
+    async def wait_for_input(self, timeout_ms=None):
+        if not self.touch_at:
+            await asyncio.sleep(10 ** 6)
+        await asyncio.sleep(self.touch_at[0] - self.clock.now)
+
+    def poll_input(self, long_press_callback=None):
+        self.touches.append(self.touch_at.pop(0))
+        return "Touch", (200, 60)
+
+def run_controller(monkeypatch, minutes, blocking_fetch=False):
+    """Runs the controller on a virtual clock; returns (render times, touch times)."""
+    clock = Clock()
+    renders = []
+    fetches = [0]
+
+    monkeypatch.setattr(time, "ticks_ms", lambda: int(clock.now * 1000))
+    monkeypatch.setattr(time, "time", lambda: int(EPOCH + clock.now))
+    monkeypatch.setattr(time, "localtime", lambda secs=None: time.gmtime(EPOCH + clock.now if secs is None else secs))
+    monkeypatch.setattr(time, "mktime", calendar.timegm)
+
+    async def fetch_weather_combined(api_key, location, days_limit=4, timezone_offset=8, breaker=None):
+        fetches[0] += 1
+        duration = SLOW_FETCH_S if fetches[0] % 5 == 0 else FETCH_S
+        if blocking_fetch:
+            clock.now += duration
+        else:
+            await asyncio.sleep(duration)
+        clock.now += PARSE_S
+        # Every fetch brings new data, so each one wakes the renderer
+        return (20.0 + fetches[0] % 7, "Clouds"), [("05-01", 21.0, "Rain", 40.0)]
+
+    async def close_connection():
+        pass
+
+    def render(*args, **kwargs):
+        renders.append(clock.now)
+        return True
+
+    monkeypatch.setattr(app_controller, "fetch_weather_combined", fetch_weather_combined)
+    monkeypatch.setattr(app_controller, "close_connection", close_connection)
+    monkeypatch.setattr(app_controller, "weather_cache", types.SimpleNamespace(load=lambda location: None, save=lambda *a, **k: True))
+    monkeypatch.setattr(app_controller, "update_page_weather", render)
+    monkeypatch.setattr(app_controller, "update_page_time_image", render)
+    monkeypatch.setattr(app_controller, "get_image_path", lambda *a: None)
+    monkeypatch.setattr(app_controller, "get_date_event_images", lambda date: [])
+    monkeypatch.setattr(app_controller, "sync_time", lambda: None)
+    monkeypatch.setattr(app_controller, "icon_atlas", types.SimpleNamespace(refresh=lambda: None))
+
+    hw = FakeHardware(clock)
+    controller = AppController(AppState(), hw)
+    controller.time_zone_offset = 0
+    controller.chime = None
+    # Refetch at every 30 s check so fetches keep overlapping minute boundaries
+    controller.weather_max_age_ms = 1
+
+    loop = asyncio.SelectorEventLoop(VirtualSelector(clock))
+    loop.time = clock.time
+    try:
+        task = loop.create_task(controller.run())
+        loop.run_until_complete(asyncio.wait([task], timeout=minutes * 60))
+        tasks = asyncio.all_tasks(loop)
+        for pending in tasks:
+            pending.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    finally:
+        loop.close()
+    return renders, hw.touches
+
+def tick_delays_ms(renders):
+    """Delay of the first render in each minute after its boundary."""
+    delays = {}
+    for at in renders:
+        delays.setdefault(int(at // 60), (at % 60) * 1000)
+    return [delays[m] for m in sorted(delays)[1:]]
+
+def test_minute_tick_on_time_during_weather_and_sensor_work(monkeypatch):
+    renders, touches = run_controller(monkeypatch, minutes=30)
+    delays = tick_delays_ms(renders)
+    assert len(delays) >= 29
+    assert max(delays) <= MAX_TICK_DELAY_MS, delays
+
+def test_touch_redrawn_immediately(monkeypatch):
+    renders, touches = run_controller(monkeypatch, minutes=30)
+    assert touches == TOUCH_AT_S
+    for at in touches:
+        assert any(at <= r <= at + MAX_TICK_DELAY_MS / 1000 for r in renders), at
+
+def test_blocking_fetch_would_delay_ticks(monkeypatch):
+    # The same run with fetches that block the loop, to show the check bites
+    renders, _ = run_controller(monkeypatch, minutes=30, blocking_fetch=True)
+    assert max(tick_delays_ms(renders)) > 1000
@@ -0,0 +1,54 @@
+import time
+
+import hardware_manager
+from event_queue import EVENT_TOUCH
+
+class Clock:
+    def __init__(self):
+        self.now = 10000
+
+    def ticks_ms(self):
+        return self.now
+
+def make_manager(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "ticks_ms", clock.ticks_ms)
+    monkeypatch.setattr(hardware_manager, "get_touch_state",
+                        lambda tp, dev, old, pending: ("Touch", (150, 60)))
+    return hardware_manager.HardwareManager(), clock
+
+def hold(hw, clock, duration_ms, report_ms=15):
+    """Fires the touch IRQ every ``report_ms`` while a finger stays down."""
+    end = clock.now + duration_ms
+    while clock.now < end:
+        hw._on_touch_irq(None)
+        clock.now += report_ms
+
+def queued_touches(hw):
+    touches = 0
+    event = hw.events.pop()
+    while event is not None:
+        touches += event[0] == EVENT_TOUCH
+        event = hw.events.pop()
+    return touches
+
+def test_held_finger_queues_one_touch(monkeypatch):
+    hw, clock = make_manager(monkeypatch)
+    hold(hw, clock, 800)
+    assert queued_touches(hw) == 1
+
+def test_new_touch_after_release(monkeypatch):
+    hw, clock = make_manager(monkeypatch)
+    hold(hw, clock, 300)
+    clock.now += hardware_manager.TOUCH_RELEASE_MS
+    hold(hw, clock, 300)
+    assert queued_touches(hw) == 2
+
+def test_poll_input_reports_held_finger_once(monkeypatch):
+    hw, clock = make_manager(monkeypatch)
+    states = []
+    for _ in range(40):
+        hw._on_touch_irq(None)
+        clock.now += 15
+        states.append(hw.poll_input())
+    assert [s for s in states if s is not None] == [("Touch", (150, 60))]
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import types
+
+import pytest
+
+# wifi_manager.py holds non-ASCII bytes literals that only MicroPython accepts
+sys.modules.setdefault("wifi_manager", types.SimpleNamespace(reset_wifi_and_reboot=lambda: None))
+
+import app_controller
+import weather_cache as weather_cache_module
+from app_controller import AppController
+from app_state import AppState
+from weather_cache import WeatherCache, WEATHER_CACHE_SAVE_INTERVAL_S
+
+# 2024-05-01 15:00 UTC, 23:00 in Taipei
+NOW = 1714575600
+CURRENT = (21.5, "Clouds")
+FORECAST = [("05-01", 20.0, "Rain", 50.0), ("05-02", 22.0, "Clear", 0.0), ("05-03", 19.0, "Rain", 80.0)]
+MINUTE = 60
+
+class Clock:
+    def __init__(self):
+        self.now = NOW
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock.time)
+    return clock
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return WeatherCache(str(tmp_path / "weather_cache.json"))
+
+def as_loaded(forecast):
+    return [tuple(day) for day in json.loads(json.dumps(forecast))]
+
+def test_round_trip_keeps_the_age(cache, clock):
+    assert cache.save("Taipei", CURRENT, 60, FORECAST, 600)
+    clock.now += 5 * MINUTE
+    assert cache.load("Taipei") == (CURRENT, 360, as_loaded(FORECAST), 900)
+
+def test_missing_corrupt_or_foreign_cache_loads_nothing(cache, capsys):
+    assert cache.load("Taipei") is None
+
+    cache.save("Taipei", CURRENT, 0, FORECAST, 0)
+    assert cache.load("Tainan") is None
+
+    with open(cache.path) as f:
+        text = f.read()
+    with open(cache.path, "w") as f:
+        f.write(text[:len(text) // 2])
+    assert cache.load("Taipei") is None
+    assert "Warning: Ignoring unreadable weather cache" in capsys.readouterr().out
+
+    with open(cache.path, "w") as f:
+        json.dump({"v": 0, "loc": "Taipei", "fc": [NOW, FORECAST]}, f)
+    assert cache.load("Taipei") is None
+
+def test_parts_from_the_future_are_dropped(cache, clock):
+    # Saved with the clock set, loaded before NTP has set it again
+    cache.save("Taipei", CURRENT, 0, FORECAST, 0)
+    clock.now = 0
+    assert cache.load("Taipei") is None
+
+def test_save_writes_a_temporary_file_and_renames_it(cache, monkeypatch):
+    renames = []
+    rename = os.rename
+    def recording_rename(src, dst):
+        with open(src) as f:
+            renames.append((src, dst, json.load(f)["loc"]))
+        rename(src, dst)
+    monkeypatch.setattr(weather_cache_module.os, "rename", recording_rename)
+
+    assert cache.save("Taipei", CURRENT, 0, FORECAST, 0)
+    assert renames == [(cache.path + ".tmp", cache.path, "Taipei")]
+    assert not os.path.exists(cache.path + ".tmp")
+
+def test_interrupted_save_keeps_the_previous_record(cache, clock, monkeypatch, capsys):
+    cache.save("Taipei", CURRENT, 0, FORECAST, 0)
+    def power_cut(src, dst):
+        raise OSError("power cut")
+    monkeypatch.setattr(weather_cache_module.os, "rename", power_cut)
+
+    clock.now += WEATHER_CACHE_SAVE_INTERVAL_S
+    assert not cache.save("Taipei", (10.0, "Snow"), 0, None, 0)
+    assert "Error: Failed to write weather cache" in capsys.readouterr().out
+    assert cache.load("Taipei")[0] == CURRENT
+
+def test_unforced_saves_are_rate_limited(cache, clock):
+    assert cache.save("Taipei", CURRENT, 0, FORECAST, 0)
+    clock.now += WEATHER_CACHE_SAVE_INTERVAL_S - 1
+    assert not cache.save("Taipei", (10.0, "Snow"), 0, FORECAST, 0)
+    assert cache.load("Taipei")[0] == CURRENT
+
+    assert cache.save("Taipei", (10.0, "Snow"), 0, FORECAST, 0, force=True)
+    clock.now += 1
+    assert not cache.save("Taipei", CURRENT, 0, FORECAST, 0)
+    clock.now += WEATHER_CACHE_SAVE_INTERVAL_S
+    assert cache.save("Taipei", CURRENT, 0, FORECAST, 0)
+
+TICKS_NOW = 10 * 60 * 60 * 1000
+
+@pytest.fixture
+def controller(cache, monkeypatch):
+    """A combined-mode controller with the network offline."""
+    calls = []
+
+    async def fetch_weather_combined(api_key, location, days_limit=4, timezone_offset=8, breaker=None):
+        calls.append(location)
+        return None, None
+
+    async def close_connection():
+        pass
+
+    monkeypatch.setattr(time, "ticks_ms", lambda: TICKS_NOW)
+    monkeypatch.setattr(app_controller, "get_local_time", lambda offset=0: time.gmtime(time.time() + offset))
+    monkeypatch.setattr(app_controller, "fetch_weather_combined", fetch_weather_combined)
+    monkeypatch.setattr(app_controller, "close_connection", close_connection)
+    monkeypatch.setattr(app_controller, "weather_cache", cache)
+
+    controller = AppController(AppState(), None)
+    controller.location = "Taipei"
+    controller.weather_mode = app_controller.WEATHER_MODE_COMBINED
+    controller.current_refresh_ms = 0
+    controller.current_expire_ms = app_controller.FORECAST_EXPIRE_MS
+    controller.weather_max_age_ms = 30 * MINUTE * 1000
+    controller.fetches = calls
+    return controller
+
+def test_stale_cache_is_served_while_refetching(cache, controller):
+    cache.save("Taipei", CURRENT, 45 * MINUTE, FORECAST, 45 * MINUTE)
+    controller._restore_weather_cache()
+    state = controller.state
+    assert state.current_weather == CURRENT
+    assert state.weather_forecast == as_loaded(FORECAST)
+    assert state.weather_forecast_last_updated == TICKS_NOW - 45 * MINUTE * 1000
+
+    # Past the 30 minute max age: refetched, and still shown while offline
+    assert not asyncio.run(controller._update_weather())
+    assert controller.fetches == ["Taipei"]
+    assert state.current_weather == CURRENT
+    assert state.weather_forecast == as_loaded(FORECAST)
+
+def test_expired_cache_is_not_restored(cache, controller):
+    cache.save("Taipei", CURRENT, 5 * 60 * MINUTE, FORECAST, 5 * 60 * MINUTE)
+    controller._restore_weather_cache()
+    assert controller.state.current_weather is None
+    assert controller.state.weather_forecast is None
+
+def test_restored_forecast_starts_today(cache, controller, clock):
+    # Saved at 23:00 local; restored after midnight, when 05-01 is over
+    cache.save("Taipei", CURRENT, 0, FORECAST, 0)
+    clock.now += 2 * 60 * MINUTE
+    controller._restore_weather_cache()
+    assert controller.state.weather_forecast == as_loaded(FORECAST[1:])
@@ -0,0 +1,77 @@
+import asyncio
+import sys
+import time
+import types
+
+# wifi_manager.py holds non-ASCII bytes literals that only MicroPython accepts
+sys.modules.setdefault("wifi_manager", types.SimpleNamespace(reset_wifi_and_reboot=lambda: None))
+
+import app_controller
+from app_controller import AppController, WEATHER_MODE_COMBINED
+from app_state import AppState
+
+MINUTE_MS = 60 * 1000
+CURRENT = (21.5, "Clouds")
+DERIVED = (20.0, "Rain")
+FORECAST = [("01-01", 20.0, "Rain", 50.0)]
+
+class Clock:
+    def __init__(self):
+        self.now = 0
+
+    def ticks_ms(self):
+        return self.now
+
+def run_controller(monkeypatch, current_refresh_min, max_age_min, hours=4):
+    """Runs the weather task's update every 30 s; returns (endpoint, minute) per request."""
+    clock = Clock()
+    calls = []
+
+    async def fetch_current_weather(api_key, location, breaker=None):
+        calls.append(("current", clock.now // MINUTE_MS))
+        return CURRENT
+
+    async def fetch_weather_combined(api_key, location, days_limit=4, timezone_offset=8, breaker=None):
+        calls.append(("forecast", clock.now // MINUTE_MS))
+        return DERIVED, FORECAST
+
+    async def close_connection():
+        pass
+
+    monkeypatch.setattr(time, "ticks_ms", clock.ticks_ms)
+    monkeypatch.setattr(app_controller, "fetch_current_weather", fetch_current_weather)
+    monkeypatch.setattr(app_controller, "fetch_weather_combined", fetch_weather_combined)
+    monkeypatch.setattr(app_controller, "close_connection", close_connection)
+    monkeypatch.setattr(app_controller, "weather_cache", types.SimpleNamespace(save=lambda *a, **k: True))
+
+    controller = AppController(AppState(), None)
+    controller.weather_mode = WEATHER_MODE_COMBINED
+    controller.current_refresh_ms = current_refresh_min * MINUTE_MS
+    controller.weather_max_age_ms = max_age_min * MINUTE_MS
+    while clock.now <= hours * 60 * MINUTE_MS:
+        asyncio.run(controller._update_weather())
+        clock.now += 30 * 1000
+    return calls
+
+def assert_polled_every(minutes, interval_min, hours):
+    """Checks polls start at boot and follow each other within one 30 s check of the interval."""
+    assert minutes[0] == 0
+    gaps = [b - a for a, b in zip(minutes, minutes[1:])]
+    assert all(interval_min <= gap <= interval_min + 1 for gap in gaps), gaps
+    assert hours * 60 - minutes[-1] <= interval_min + 1
+
+def test_current_endpoint_polled_when_interval_exceeds_forecast_age(monkeypatch):
+    calls = run_controller(monkeypatch, current_refresh_min=60, max_age_min=30)
+    current = [minute for endpoint, minute in calls if endpoint == "current"]
+    assert_polled_every(current, 60, 4)
+    forecast = [minute for endpoint, minute in calls if endpoint == "forecast"]
+    assert_polled_every(forecast, 30, 4)
+
+def test_current_endpoint_polled_when_interval_below_forecast_age(monkeypatch):
+    calls = run_controller(monkeypatch, current_refresh_min=10, max_age_min=30, hours=1)
+    current = [minute for endpoint, minute in calls if endpoint == "current"]
+    assert_polled_every(current, 10, 1)
+
+def test_current_endpoint_not_polled_without_interval(monkeypatch):
+    calls = run_controller(monkeypatch, current_refresh_min=0, max_age_min=30, hours=1)
+    assert [endpoint for endpoint, _ in calls] == ["forecast"] * 2
@@ -0,0 +1,217 @@
+import json
+import os
+import re
+import time
+import types
+
+import pytest
+
+import config_manager as config_manager_module
+
+SCAN_S = 2.6  # Full scan of all channels
+SSID_SEARCH_S = 1.2  # Channel search inside a join without a known channel
+KNOWN_CHANNEL_S = 0.15  # Join on a given channel
+ASSOCIATE_S = 1.4  # Association, authentication and DHCP
+NONET_S = 3.0  # Until the driver reports the access point as not found
+
+STAT_CONNECTING = 1
+STAT_GOT_IP = 3
+STAT_WRONG_PASSWORD = -3
+STAT_NO_AP_FOUND = -2
+
+HOME_AP = (b"HomeNet", bytes.fromhex("a1b2c3d4e5f6"), 6, -55)
+NEW_AP = (b"HomeNet", bytes.fromhex("0a0b0c0d0e0f"), 11, -60)
+
+def load_wifi_manager():
+    """Imports wifi_manager under CPython.
+
+    Its HTML constants are bytes literals with UTF-8 text, which only
+    MicroPython accepts; they are rewritten as the equivalent encoded str.
+    """
+    path = os.path.join(os.path.dirname(__file__), "..", "src", "wifi_manager.py")
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    source = re.sub(r'^(\w+ = )b(".*")$',
+                    lambda m: m.group(1) + m.group(2) + ".encode()" if re.search(r"[^\x00-\x7f]", m.group(2)) else m.group(0),
+                    source, flags=re.M)
+    module = types.ModuleType("wifi_manager")
+    module.__file__ = path
+    exec(compile(source, path, "exec"), module.__dict__)
+    return module
+
+wifi = load_wifi_manager()
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def ticks_ms(self):
+        return int(self.now * 1000)
+
+    def sleep_ms(self, ms):
+        self.now += ms / 1000
+
+class FakeWLAN:
+    """Station interface with modelled join times on a virtual clock."""
+    def __init__(self, clock, aps, channel_arg=True, wrong_password=False, reports_nonet=True):
+        self.clock = clock
+        self.aps = aps
+        self.channel_arg = channel_arg
+        self.wrong_password = wrong_password
+        self.reports_nonet = reports_nonet
+        self.connects = []
+        self.scans = 0
+        self._ready_at = None
+        self._fail_at = None
+        self._fail_status = None
+
+    def active(self, *args):
+        return True
+
+    def scan(self):
+        self.scans += 1
+        self.clock.now += SCAN_S
+        return [(ssid, bssid, channel, rssi, 3, False) for ssid, bssid, channel, rssi in self.aps]
+
+    def connect(self, ssid, password, bssid=None, channel=None):
+        if channel is not None and not self.channel_arg:
+            raise TypeError("unexpected keyword argument 'channel'")
+        self.connects.append((ssid, bssid, channel))
+        self._ready_at = self._fail_at = None
+        ap = None
+        for candidate in self.aps:
+            if candidate[0].decode() == ssid and bssid in (None, candidate[1]):
+                ap = candidate
+        if ap is None:
+            if not self.reports_nonet:
+                return
+            self._fail_at = self.clock.now + NONET_S
+            self._fail_status = STAT_NO_AP_FOUND
+        elif self.wrong_password:
+            self._fail_at = self.clock.now + KNOWN_CHANNEL_S
+            self._fail_status = STAT_WRONG_PASSWORD
+        else:
+            search = KNOWN_CHANNEL_S if channel == ap[2] else SSID_SEARCH_S
+            self._ready_at = self.clock.now + search + ASSOCIATE_S
+
+    def isconnected(self):
+        return self._ready_at is not None and self.clock.now >= self._ready_at
+
+    def status(self):
+        if self.isconnected():
+            return STAT_GOT_IP
+        if self._fail_at is not None and self.clock.now >= self._fail_at:
+            return self._fail_status
+        return STAT_CONNECTING
+
+    def disconnect(self):
+        self._ready_at = self._fail_at = None
+
+    def ifconfig(self, *args):
+        return ("192.168.1.50", "255.255.255.0", "192.168.1.1", "192.168.1.1")
+
+def write_config(last_connection=None):
+    config = {
+        "global": {"ap_mode": {"ssid": "Pi_Clock_AP", "password": "12345678"}, "weather_api_key": ""},
+        "profiles": [
+            {"name": "Office", "wifi": {"ssid": "OfficeNet", "password": "office-pw"}},
+            {"name": "Home", "wifi": {"ssid": "HomeNet", "password": "home-pw"}},
+        ],
+        "active_profile": "Home",
+        "last_connected_profile": "Home",
+        "generation": 4,
+    }
+    if last_connection:
+        config["last_connection"] = last_connection
+    with open(config_manager_module.CONFIG_FILE, "w") as f:
+        json.dump(config, f)
+
+def record_for(ap):
+    return {"ssid": ap[0].decode(), "bssid": ap[1].hex(), "channel": ap[2]}
+
+@pytest.fixture
+def boot(monkeypatch, tmp_path):
+    """Returns a function that boots wifi_manager() once; it reports (seconds, station, manager)."""
+    monkeypatch.chdir(tmp_path)
+    clock = Clock()
+    monkeypatch.setattr(time, "ticks_ms", clock.ticks_ms)
+    monkeypatch.setattr(time, "sleep_ms", clock.sleep_ms)
+    monkeypatch.setattr(wifi, "_scan_cache", None)
+
+    def run(aps, **kwargs):
+        manager = config_manager_module.ConfigManager()
+        monkeypatch.setattr(wifi, "config_manager", manager)
+        sta = FakeWLAN(clock, aps, **kwargs)
+        monkeypatch.setattr(wifi.network, "WLAN", lambda interface: sta)
+        monkeypatch.setattr(wifi, "_scan_cache", None)
+        start = clock.now
+        assert wifi.wifi_manager() is sta
+        return clock.now - start, sta, manager
+    return run
+
+def test_same_access_point_skips_scan_and_flash_write(boot):
+    write_config(record_for(HOME_AP))
+    with open("config.json", "rb") as f:
+        before = f.read()
+    seconds, sta, manager = boot([HOME_AP])
+    assert sta.scans == 0
+    assert sta.connects == [("HomeNet", HOME_AP[1], 6)]
+    assert seconds <= KNOWN_CHANNEL_S + ASSOCIATE_S + 0.1
+    with open("config.json", "rb") as f:
+        assert f.read() == before
+    assert not os.path.exists("config.json.tmp")
+
+def test_first_boot_records_access_point(boot):
+    write_config()
+    seconds, sta, manager = boot([HOME_AP])
+    assert sta.scans == 1
+    assert seconds <= SCAN_S + SSID_SEARCH_S + ASSOCIATE_S + 0.1
+    assert manager.get_last_connection() == record_for(HOME_AP)
+    # The next boot takes the fast path
+    seconds, sta, _ = boot([HOME_AP])
+    assert sta.scans == 0
+    assert seconds <= KNOWN_CHANNEL_S + ASSOCIATE_S + 0.1
+
+def test_replaced_access_point_falls_back_to_scan(boot):
+    write_config(record_for(HOME_AP))
+    seconds, sta, manager = boot([NEW_AP])
+    assert sta.scans == 1
+    # The driver's NONET ends the direct join early; the cost is bounded
+    # by that plus a normal scan-and-join, well under the 8 s fast timeout
+    assert seconds <= NONET_S + SCAN_S + SSID_SEARCH_S + ASSOCIATE_S + 0.2
+    assert manager.get_last_connection() == record_for(NEW_AP)
+    seconds, sta, _ = boot([NEW_AP])
+    assert sta.scans == 0
+    assert seconds <= KNOWN_CHANNEL_S + ASSOCIATE_S + 0.1
+
+def test_replaced_access_point_without_failure_status(boot):
+    # Firmware that keeps reporting "connecting" costs the full fast timeout
+    write_config(record_for(HOME_AP))
+    seconds, sta, _ = boot([NEW_AP], reports_nonet=False)
+    assert sta.scans == 1
+    assert seconds <= wifi.FAST_CONNECT_TIMEOUT_MS / 1000 + SCAN_S + SSID_SEARCH_S + ASSOCIATE_S + 0.2
+
+def test_firmware_without_channel_argument(boot):
+    write_config(record_for(HOME_AP))
+    seconds, sta, _ = boot([HOME_AP], channel_arg=False)
+    assert sta.scans == 0
+    assert sta.connects == [("HomeNet", HOME_AP[1], None)]
+    assert seconds <= SSID_SEARCH_S + ASSOCIATE_S + 0.1
+
+def test_wait_stops_on_failure_status(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "ticks_ms", clock.ticks_ms)
+    monkeypatch.setattr(time, "sleep_ms", clock.sleep_ms)
+    sta = FakeWLAN(clock, [HOME_AP], wrong_password=True)
+    sta.connect("HomeNet", "bad")
+    assert not wifi._wait_for_connection(sta, wifi.CONNECT_TIMEOUT_MS)
+    assert clock.now <= KNOWN_CHANNEL_S + wifi.CONNECT_POLL_MS / 1000
+
+def test_wait_times_out(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "ticks_ms", clock.ticks_ms)
+    monkeypatch.setattr(time, "sleep_ms", clock.sleep_ms)
+    sta = FakeWLAN(clock, [], reports_nonet=False)
+    sta.connect("HomeNet", "pw")
+    assert not wifi._wait_for_connection(sta, wifi.FAST_CONNECT_TIMEOUT_MS)
+    assert wifi.FAST_CONNECT_TIMEOUT_MS / 1000 <= clock.now <= (wifi.FAST_CONNECT_TIMEOUT_MS + wifi.CONNECT_POLL_MS) / 1000
@@ -0,0 +1,58 @@
+#!/usr/bin/env micropython
+# -*- coding: utf-8 -*-
+
+"""
+Glyph Font Baker
+
+功能：
+  1. 以裝置相同的 8x8 內建字型渲染指定字元，並預先放大為 1~4 倍
+  2. 輸出 `src/font/glyphs.fnt`，上傳後由 `glyph_cache.py` 直接從 Flash 讀取字形
+  3. 預設烘焙數字、`:`、`/`、`%` 與 `o`（溫度符號），涵蓋每分鐘更新的所有文字
+
+注意：
+  - 需要 `framebuf` 模組，請使用 MicroPython unix port 在電腦上執行：
+      micropython tools/bake_font.py [輸出路徑]
+  - 也可用 `mpremote run tools/bake_font.py` 在 Pico 上直接產生 `/font/glyphs.fnt`
+"""
+
+import os
+import sys
+
+DEFAULT_CHARS = "0123456789:/%o"
+DEFAULT_SCALES = (1, 2, 3, 4)
+
+def main():
+    on_device = sys.platform == "rp2"
+    src_dir = ""
+    if not on_device:
+        tools_dir = __file__.rsplit("/", 1)[0] if "/" in __file__ else "."
+        src_dir = tools_dir + "/../src"
+        sys.path.append(src_dir)
+    try:
+        from glyph_cache import write_font_file, FONT_FILE
+    except ImportError as e:
+        print(f"Error: Could not load glyph_cache ({e}). Run this tool with the MicroPython unix port.")
+        return 1
+
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        path = src_dir + FONT_FILE
+
+    folder = path.rsplit("/", 1)[0]
+    if folder and folder != path:
+        try:
+            os.mkdir(folder)
+        except OSError:
+            pass
+
+    try:
+        write_font_file(path, DEFAULT_CHARS, DEFAULT_SCALES)
+    except OSError as e:
+        print(f"Error: Could not write font file {path}. Details: {e}")
+        return 1
+    print(f"Baked {len(DEFAULT_CHARS) * len(DEFAULT_SCALES)} glyphs into {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
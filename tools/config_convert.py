@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Config Converter
+
+功能：
+  1. 將裝置上的二進位設定檔 `config.bin` 匯出為 `config.json`，方便檢視與編輯
+  2. 將 `config.json` 轉換為 `config.bin`（會設定 `"storage": "binary"`）
+
+用法：
+  mpremote fs cp :config.bin .
+  python3 tools/config_convert.py config.bin config.json
+
+  python3 tools/config_convert.py config.json config.bin
+
+注意：
+  - 上傳 `config.json` 到裝置即為匯入：裝置開機時會優先載入它，
+    若其中 `"storage"` 為 `"binary"` 則自動轉存為 `config.bin` 並刪除 `config.json`
+"""
+
+import json
+import os
+import sys
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: config_convert.py <input config.bin|config.json> <output config.json|config.bin>")
+        return 1
+    src, dst = sys.argv[1], sys.argv[2]
+
+    tools_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.append(os.path.join(tools_dir, "..", "src"))
+    sys.modules.setdefault("ujson", json)
+    import config_store
+
+    if src.endswith(".bin"):
+        loaded = config_store.load(src)
+        if loaded is None:
+            print(f"Error: {src} is not a valid binary config file.")
+            return 1
+        config = loaded[1]
+        config["profiles"] = list(config["profiles"])
+        with open(dst, "w", encoding="utf-8") as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        print(f"Exported {len(config['profiles'])} profiles to {dst}")
+    else:
+        with open(src, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        config["storage"] = "binary"
+        config_store.save(config, dst)
+        print(f"Wrote {len(config.get('profiles', []))} profiles to {dst}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,8 @@
   2. 利用 Floyd–Steinberg 誤差擴散（dithering）轉換圖片成 1-bit 黑白圖
   3. 即時預覽轉換後的結果
   4. 儲存 .bin 檔案（僅包含 1-bit 像素資料，不含檔頭），可上傳至 Pico 後用 framebuf.MONO_HLSB 顯示
+  5. 勾選「4 階灰階」時改為輸出 framebuf.GS2_HMSB 資料（檔案大小為 1-bit 的兩倍），
+     並預先旋轉成面板直向方向，自訂圖片位置會以 4 階灰階全刷新顯示
 
 注意：
   - 此程式為桌面應用，請在 PC 上執行
@@ -21,6 +23,25 @@ from PIL import Image, ImageTk, ImageOps
 import numpy as np
 import os
 
+# 4 階灰階由暗到亮對應的 GS2 像素值（與 epaper.py 的 darkgray=0xaa、grayish=0x55 一致）
+GRAY4_LEVELS = (0x00, 0x02, 0x01, 0x03)
+
+def quantize_4gray(image):
+    """以 Floyd–Steinberg 誤差擴散將圖片量化為 4 階灰階（調色盤索引 0 最暗 ~ 3 最亮）"""
+    palette = Image.new("P", (1, 1))
+    palette.putpalette([0, 0, 0, 85, 85, 85, 170, 170, 170, 255, 255, 255] + [0, 0, 0] * 252)
+    return image.convert("RGB").quantize(palette=palette, dither=Image.Dither.FLOYDSTEINBERG)
+
+def pack_gray4(image):
+    """將 4 階灰階圖片旋轉 90 度至面板直向方向，並打包為 GS2_HMSB（每 byte 4 像素，最左像素在最低位）"""
+    rotated = image.transpose(Image.Transpose.ROTATE_90)
+    indices = np.array(rotated, dtype=np.uint8)
+    if indices.shape[1] % 4:
+        raise ValueError("旋轉後寬度（原圖高度）必須是 4 的倍數")
+    levels = np.array(GRAY4_LEVELS, dtype=np.uint8)[indices]
+    packed = levels[:, 0::4] | (levels[:, 1::4] << 2) | (levels[:, 2::4] << 4) | (levels[:, 3::4] << 6)
+    return packed.astype(np.uint8).tobytes()
+
 class DitheringConverterApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -30,7 +51,7 @@ class DitheringConverterApp(tk.Tk):
         # 儲存原始圖片及轉換結果
         self.original_image = None   # 載入的原始 PIL Image (RGB)
         self.resized_image = None    # 根據設定尺寸縮放後的圖片
-        self.converted_image = None  # 轉換後的 1-bit 圖片 (PIL, mode "1")
+        self.converted_image = None  # 轉換後的圖片 (PIL, 1-bit 為 mode "1"，4 階灰階為 mode "P")
         self.current_filename = None # 記錄當前載入的檔案名稱
         
         # 縮放相關變數
@@ -55,6 +76,9 @@ class DitheringConverterApp(tk.Tk):
         self.out_width = tk.IntVar(value=128)
         self.out_height = tk.IntVar(value=128)
         
+        # 輸出模式：False 為 1-bit 黑白，True 為 4 階灰階
+        self.gray_mode = tk.BooleanVar(value=False)
+        
         self.create_widgets()
     
     def create_widgets(self):
@@ -76,8 +100,11 @@ class DitheringConverterApp(tk.Tk):
         btn_update = tk.Button(frm_controls, text="更新預覽", command=self.update_preview)
         btn_update.grid(row=0, column=5, padx=5)
         
+        chk_gray = tk.Checkbutton(frm_controls, text="4 階灰階", variable=self.gray_mode, command=self.update_preview)
+        chk_gray.grid(row=0, column=6, padx=5)
+        
         btn_save = tk.Button(frm_controls, text="儲存 .bin 檔案", command=self.save_image)
-        btn_save.grid(row=0, column=6, padx=5)
+        btn_save.grid(row=0, column=7, padx=5)
         
         # 縮放控制區
         frm_zoom = tk.Frame(self)
@@ -356,8 +383,12 @@ class DitheringConverterApp(tk.Tk):
         # 將原始圖片縮放至指定尺寸，這樣處理速度會更快
         self.resized_image = self.original_image.copy().resize((w, h), Image.Resampling.LANCZOS)
         
-        # 使用 Floyd–Steinberg 誤差擴散轉換為 1-bit 圖片
-        im_bw = self.resized_image.convert("1", dither=Image.FLOYDSTEINBERG)
+        if self.gray_mode.get():
+            # 使用 Floyd–Steinberg 誤差擴散量化為 4 階灰階
+            im_bw = quantize_4gray(self.resized_image)
+        else:
+            # 使用 Floyd–Steinberg 誤差擴散轉換為 1-bit 圖片
+            im_bw = self.resized_image.convert("1", dither=Image.FLOYDSTEINBERG)
         self.converted_image = im_bw
         
         # 預覽：轉回 L 模式顯示，並縮放至預覽區大小
@@ -391,8 +422,12 @@ class DitheringConverterApp(tk.Tk):
                                             filetypes=[("Bin Files", "*.bin")])
         if path:
             try:
-                # 取得 1-bit 圖片的原始位元資料
-                data = self.converted_image.tobytes()
+                if self.converted_image.mode == "P":
+                    # 4 階灰階：旋轉並打包為 GS2_HMSB
+                    data = pack_gray4(self.converted_image)
+                else:
+                    # 取得 1-bit 圖片的原始位元資料
+                    data = self.converted_image.tobytes()
                 with open(path, "wb") as f:
                     f.write(data)
                 messagebox.showinfo("完成", f"檔案已儲存到 {path}")
@@ -7,12 +7,13 @@ import threading
 
 # --- Configuration ---
 SOURCE_DIR = "src"
-INCLUDE_EXTENSIONS = [".py", ".json"]
+INCLUDE_EXTENSIONS = [".py", ".json", ".fnt"]
 UPLOAD_IMAGES = True
 MPREMOTE_PORT = None
 ENABLE_CLEAN = True
 ENABLE_RECURSIVE_CLEAN = False  # 新增：是否遞迴清除所有檔案
 NO_CONFIG = False  # 新增：是否跳過 config.json
+CONFIG_FILES = ("config.json", "config.bin")  # 裝置上的設定檔（JSON 或二進位格式）
 
 
 # 用於停止讀取執行緒的事件
@@ -144,7 +145,7 @@ def collect_files():
 
     for root, dirs, files in os.walk(SOURCE_DIR):
         for file in files:
-            if NO_CONFIG and file == "config.json":
+            if NO_CONFIG and file in CONFIG_FILES:
                 continue
             if any(file.endswith(ext) for ext in INCLUDE_EXTENSIONS):
                 full_path = os.path.join(root, file).replace("\\", "/")
@@ -256,7 +257,7 @@ def clean_all_files():
                 
             else:
                 # 如果是檔案，直接刪除
-                if NO_CONFIG and item_name == "config.json":
+                if NO_CONFIG and item_name in CONFIG_FILES:
                     continue
                 current_command_text = f"刪除檔案: {full_path}"
                 print(f"\r{current_command_text.ljust(80)}", end="", flush=True)
@@ -309,7 +310,7 @@ def clean_all_files():
     
     # 先刪除根目錄下的所有檔案
     for f in root_files:
-        if NO_CONFIG and f == "config.json":
+        if NO_CONFIG and f in CONFIG_FILES:
             continue
         current_command_text = f"刪除根目錄檔案: {f}"
         print(f"\r{current_command_text.ljust(80)}", end="", flush=True)
@@ -367,7 +368,7 @@ def clean_specific_files():
 
         # 檢查檔案副檔名
         if any(file_name.endswith(ext) for ext in INCLUDE_EXTENSIONS):
-            if NO_CONFIG and file_name == "config.json":
+            if NO_CONFIG and file_name in CONFIG_FILES:
                 continue
             files_to_delete.append(file_name)
 
@@ -451,7 +452,7 @@ def parse_args():
     parser.add_argument("--no-images", action="store_false", dest="upload_images", default=True, help="Do not upload image files.")
     parser.add_argument("--recursive-clean", action="store_true", dest="recursive_clean", default=False, help="遞迴清除裝置上的所有檔案 (包含目錄)")
     parser.add_argument("--no-clean", action="store_false", dest="enable_clean", default=True, help="跳過清除檔案步驟")
-    parser.add_argument("--no-config", action="store_true", dest="no_config", default=False, help="不要上傳也不要刪除 config.json")
+    parser.add_argument("--no-config", action="store_true", dest="no_config", default=False, help="不要上傳也不要刪除設定檔 (config.json / config.bin)")
     return parser.parse_args()
 
 if __name__ == "__main__":